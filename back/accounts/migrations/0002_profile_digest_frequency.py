@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-19 02:31
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def start_digests_now(apps, schema_editor):
+    # Users who opt in later get what arrives from here on, not every unread notification they ever had
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    UserProfile.objects.filter(last_digest_at__isnull=True).update(last_digest_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='digest_frequency',
+            field=models.CharField(choices=[('off', 'Off'), ('daily', 'Daily'), ('weekly', 'Weekly')], default='off', max_length=10, verbose_name='Digest Frequency'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='last_digest_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Last Digest Sent'),
+        ),
+        migrations.RunPython(start_digests_now, migrations.RunPython.noop),
+    ]
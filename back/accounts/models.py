@@ -208,6 +208,15 @@ class UserProfile(models.Model):
     linkedin_url = models.URLField(blank=True, verbose_name=_('LinkedIn Profile'))
     github_url = models.URLField(blank=True, verbose_name=_('GitHub Profile'))
     website_url = models.URLField(blank=True, verbose_name=_('Personal Website'))
+    
+    # Notification digest emails
+    DIGEST_FREQUENCY_CHOICES = [
+        ('off', _('Off')),
+        ('daily', _('Daily')),
+        ('weekly', _('Weekly')),
+    ]
+    digest_frequency = models.CharField(max_length=10, choices=DIGEST_FREQUENCY_CHOICES, default='off', verbose_name=_('Digest Frequency'))
+    last_digest_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Last Digest Sent'))
 
     class Meta:
         verbose_name = _('User Profile')
@@ -98,6 +98,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
                 'learning_goals': obj.profile.learning_goals,
                 'preferred_language': obj.profile.preferred_language,
                 'time_zone': obj.profile.time_zone,
+                'digest_frequency': obj.profile.digest_frequency,
             }
         except UserProfile.DoesNotExist:
             return {}
@@ -159,27 +160,23 @@ class UserProfileUpdateSerializer(serializers.ModelSerializer):
     learning_goals = serializers.CharField(source='profile.learning_goals', required=False, allow_blank=True)
     preferred_language = serializers.CharField(source='profile.preferred_language', required=False)
     time_zone = serializers.CharField(source='profile.time_zone', required=False)
+    digest_frequency = serializers.ChoiceField(
+        source='profile.digest_frequency', choices=UserProfile.DIGEST_FREQUENCY_CHOICES, required=False
+    )
 
     class Meta:
         model = User
         fields = [
             'first_name', 'last_name', 'phone_number', 'date_of_birth', 'avatar',
             'bio', 'education_level', 'institution', 'field_of_study',
-            'learning_goals', 'preferred_language', 'time_zone',
+            'learning_goals', 'preferred_language', 'time_zone', 'digest_frequency',
         ]
 
     @transaction.atomic
     def update(self, instance, validated_data):
-        profile_data = {}
-        user_data = {}
-
-        # Separate user and profile data
-        for field_name, value in validated_data.items():
-            if 'profile.' in str(self.fields.get(field_name).source):
-                profile_field = self.fields.get(field_name).source.split('.')[-1]
-                profile_data[profile_field] = value
-            else:
-                user_data[field_name] = value
+        # Fields with source='profile.x' arrive nested under 'profile'
+        profile_data = validated_data.pop('profile', {})
+        user_data = validated_data
 
         # Update user fields
         for attr, value in user_data.items():
@@ -30,15 +30,15 @@ RATE_LIMITS = {
 def track_user_activity(user, activity_type, **kwargs):
     """Track user activity for security purposes"""
     try:
-        from core.models import UserActivity
+        from core.activity import record
         
-        UserActivity.objects.create(
-            user=user,
-            activity_type=activity_type,
-            ip_address=kwargs.get('ip_address'),
-            user_agent=kwargs.get('user_agent'),
-            metadata=kwargs.get('metadata', {})
-        )
+        record('user_activity', {
+            'user_id': user.id,
+            'activity_type': activity_type,
+            'ip_address': kwargs.get('ip_address'),
+            'user_agent': kwargs.get('user_agent'),
+            'metadata': kwargs.get('metadata', {}),
+        })
     except Exception as e:
         logger.error(f"Failed to track user activity: {str(e)}")
 
@@ -214,4 +214,21 @@ def send_password_reset_email(email: str, reset_code: str, context: Optional[Dic
         template_name='password_reset',
         context=ctx,
         action_type='reset'
-    )
\ No newline at end of file
+    )
+
+def send_certificate_email(email: str, user_name: str, course_title: str, certificate_url: str, certificate_number: str) -> None:
+    """Send certificate earned email."""
+    send_email(
+        to_email=email,
+        subject=f"Your Certificate for {course_title}",
+        template_name='certificate_earned',
+        context={
+            'user_name': user_name,
+            'course_title': course_title,
+            'certificate_url': certificate_url,
+            'certificate_number': certificate_number,
+        },
+        action_type='certificate',
+        check_limits=False,
+        fail_silently=True
+    )
@@ -355,6 +355,117 @@ LOGGING = {
 LOGS_DIR = BASE_DIR / 'logs'
 LOGS_DIR.mkdir(exist_ok=True)
 
+# Celery Beat Schedule
+CELERY_BEAT_SCHEDULE = {
+    'auto-submit-expired-quiz-attempts': {
+        'task': 'courses.tasks.auto_submit_expired_quiz_attempts',
+        'schedule': 60.0,
+    },
+    'rebuild-leaderboards': {
+        'task': 'courses.tasks.rebuild_leaderboards_task',
+        'schedule': 60.0 * 60 * 24,
+    },
+    'calibrate-adaptive-quizzes': {
+        'task': 'courses.tasks.calibrate_adaptive_quizzes',
+        'schedule': 60.0 * 60 * 24,
+    },
+    'send-deadline-reminders': {
+        'task': 'courses.tasks.send_deadline_reminders',
+        'schedule': 60.0 * 5,
+    },
+    'cleanup-expired-upload-sessions': {
+        'task': 'core.tasks.cleanup_expired_upload_sessions',
+        'schedule': 60.0 * 60,
+    },
+    'render-pending-certificates': {
+        'task': 'courses.tasks.render_pending_certificates',
+        'schedule': 60.0 * 5,
+    },
+    'send-notification-digests': {
+        'task': 'core.tasks.send_notification_digests',
+        'schedule': 60.0 * 60,
+    },
+    'purge-notifications': {
+        'task': 'core.tasks.purge_notifications',
+        'schedule': 60.0 * 60 * 24,
+    },
+    'relay-outbox': {
+        'task': 'core.tasks.relay_outbox',
+        'schedule': 30.0,
+    },
+    'purge-outbox': {
+        'task': 'core.tasks.purge_outbox',
+        'schedule': 60.0 * 60 * 24,
+    },
+    'flush-activity-buffer': {
+        'task': 'core.tasks.flush_activity_buffer',
+        'schedule': 10.0,
+    },
+    'maintain-activity-partitions': {
+        'task': 'core.tasks.maintain_activity_partitions',
+        'schedule': 60.0 * 60 * 24,
+    },
+    'reconcile-learning-analytics': {
+        'task': 'core.tasks.reconcile_learning_analytics',
+        'schedule': 60.0 * 60 * 24,
+    },
+}
+
+# Quiz Sessions
+QUIZ_SESSION_GRACE_SECONDS = int(os.getenv('QUIZ_SESSION_GRACE_SECONDS', 30))
+SHORT_ANSWER_MAX_EDIT_RATIO = 0.2  # typos tolerated for '~' answers, as a share of answer length
+IRT_MIN_RESPONSES_PER_ITEM = 30  # questions with fewer graded responses keep default parameters
+
+# Deadline Reminders
+DEADLINE_REMINDER_HOURS = [24, 1]
+
+# Submission Similarity
+SIMILARITY_MATCH_THRESHOLD = 0.5  # estimated Jaccard similarity reported to instructors
+
+# Certificates
+CERTIFICATE_FONT_DIR = os.getenv('CERTIFICATE_FONT_DIR', '/usr/share/fonts/truetype/dejavu')
+CERTIFICATE_UNICODE_FONTS = {  # TrueType fonts embedded for text outside Windows-1252 (Arabic, Cyrillic, ...)
+    'regular': os.path.join(CERTIFICATE_FONT_DIR, 'DejaVuSans.ttf'),
+    'bold': os.path.join(CERTIFICATE_FONT_DIR, 'DejaVuSans-Bold.ttf'),
+}
+
+# Resumable Uploads
+UPLOAD_SESSION_DIR = os.getenv('UPLOAD_SESSION_DIR', str(BASE_DIR / 'uploads_tmp'))
+UPLOAD_SESSION_TTL_HOURS = 24
+UPLOAD_MAX_CHUNK_SIZE = 16 * 1024 * 1024
+UPLOAD_MAX_SIZES = {
+    'assignment_submission': 500 * 1024 * 1024,
+    'lesson_attachment': 2 * 1024 * 1024 * 1024,
+    'media_content': 5 * 1024 * 1024 * 1024,
+}
+
+# Notification Retention
+NOTIFICATION_RETENTION = {  # days a read notification is kept, by type; None keeps it forever
+    'default': 90,
+    'system': 30,
+    'lesson_available': 30,
+    'certificate_ready': None,
+}
+NOTIFICATION_PURGE_BATCH_SIZE = 1000
+NOTIFICATION_ARCHIVE_DIR = os.getenv('NOTIFICATION_ARCHIVE_DIR', '')  # empty disables archiving
+
+# Transactional Outbox
+OUTBOX_BATCH_SIZE = 200
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETENTION_DAYS = 7  # delivered messages, and so their dedupe keys, are kept this long
+
+# Activity Ingestion
+ACTIVITY_BUFFER = os.getenv('ACTIVITY_BUFFER', 'auto')  # auto (redis when available, else memory), redis, memory or sync
+ACTIVITY_FLUSH_SIZE = 500
+ACTIVITY_FLUSH_SECONDS = 10
+ACTIVITY_BUFFER_MAX = 20000  # producers flush a batch themselves beyond this
+
+# Activity Partitions
+ACTIVITY_HOT_MONTHS = 12  # whole months kept in the database before a month is archived
+ACTIVITY_PARTITIONS_AHEAD = 3
+ACTIVITY_QUERY_WINDOW_DAYS = 90  # default created_at bound for list and analytics queries
+ACTIVITY_ARCHIVE_DIR = os.getenv('ACTIVITY_ARCHIVE_DIR', str(BASE_DIR / 'archive' / 'activity'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
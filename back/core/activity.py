@@ -0,0 +1,454 @@
+# back/core/activity.py
+"""
+Activity ingestion.
+
+track_activity and track_user_activity append events to a buffer instead of
+inserting a row per request, and a flusher bulk-creates them once the buffer
+holds ACTIVITY_FLUSH_SIZE events or ACTIVITY_FLUSH_SECONDS have passed.
+
+With a Redis cache every process appends to one shared list that a Celery
+task drains; otherwise each process keeps its own list and a daemon thread
+flushes it. A buffer at ACTIVITY_BUFFER_MAX makes the producer flush a batch
+itself, so a stalled flusher slows requests down rather than growing memory
+or dropping events. ACTIVITY_BUFFER = 'sync' writes each event immediately,
+for tests and management commands.
+
+Delivery is at least once: a flusher claims a batch, and the batch leaves
+the buffer only once it is written. A failed write puts the batch back at
+the head of the buffer. In Redis a claimed batch sits in its own list until
+acknowledged, so the batch of a flusher that died mid-write is requeued
+after CLAIM_TIMEOUT_SECONDS. A batch that fails MAX_ATTEMPTS times is
+dropped and logged.
+
+Every flush also folds its ActivityLog rows into DailyUserActivity, which
+backs the study streak, and into the per-course LearningAnalytics.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from collections import Counter
+from datetime import timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from .utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+MODELS = {
+    'activity': 'core.ActivityLog',
+    'user_activity': 'core.UserActivity',
+}
+REDIS_KEY = 'activity_buffer'
+KICK_KEY = 'activity_flush_kick'
+KICK_SECONDS = 5
+CLAIM_TIMEOUT_SECONDS = 60 * 5
+MAX_ATTEMPTS = 5
+STREAK_MAX_DAYS = 365
+
+
+def record(kind, fields):
+    """Buffer one event once the surrounding transaction commits"""
+    event = {'kind': kind, 'fields': fields, 'created_at': timezone.now().isoformat()}
+    transaction.on_commit(lambda: _append(event))
+
+
+def _append(event):
+    try:
+        get_buffer().append(event)
+    except Exception as e:
+        logger.warning(f"Activity buffer unavailable, writing directly: {e}")
+        write([event])
+
+
+def write(events):
+    """
+    Bulk insert buffered events, one insert per model, in one transaction so
+    a failed batch can be retried whole; returns the number written
+    """
+    grouped = {}
+    for event in events:
+        grouped.setdefault(event['kind'], []).append(event)
+
+    written = 0
+    with transaction.atomic():
+        for kind, group in grouped.items():
+            written += _write_kind(kind, group)
+    return written
+
+
+class _DanglingReference(Exception):
+    """A buffered event refers to a row deleted since it was recorded"""
+
+
+def _insert(model, rows):
+    with transaction.atomic():
+        model.objects.bulk_create(rows, batch_size=500)
+        # Foreign keys are checked at commit; check them now so only this insert rolls back
+        try:
+            connection.check_constraints(table_names=[model._meta.db_table])
+        except IntegrityError as e:
+            raise _DanglingReference(str(e)) from e
+
+
+def _resolvable(kind, model, rows):
+    """Rows whose related objects all still exist; the others are logged and dropped"""
+    for field in model._meta.concrete_fields:
+        if not field.is_relation:
+            continue
+        target = field.target_field.attname
+        ids = {getattr(row, field.attname) for row in rows} - {None}
+        found = set(field.related_model._base_manager.filter(
+            **{f"{target}__in": ids}
+        ).values_list(target, flat=True)) if ids else set()
+        kept = []
+        for row in rows:
+            value = getattr(row, field.attname)
+            if value is None or value in found:
+                kept.append(row)
+            else:
+                logger.warning(f"Dropped {kind} event for user {row.user_id}: {field.name} {value} is gone")
+        rows = kept
+    return rows
+
+
+def _write_kind(kind, group):
+    model = apps.get_model(MODELS[kind])
+    rows = [model(**event['fields'], created_at=parse_datetime(event['created_at'])) for event in group]
+    try:
+        _insert(model, rows)
+    except _DanglingReference:
+        # A course or lesson deleted since the event was buffered; keep the rest of the batch
+        rows = _resolvable(kind, model, rows)
+        _insert(model, rows)
+    _roll_up(kind, rows)
+    return len(rows)
+
+
+def _roll_up(kind, rows):
+    if kind == 'activity':
+        from core.learning_analytics import apply_events
+
+        roll_up_daily(rows)
+        apply_events(rows)
+
+
+def _retryable(events):
+    """Events to put back after a failed write, with one more attempt counted"""
+    retry = []
+    for event in events:
+        event['attempts'] = event.get('attempts', 0) + 1
+        if event['attempts'] < MAX_ATTEMPTS:
+            retry.append(event)
+        else:
+            logger.error(f"Dropped {event['kind']} event after {event['attempts']} failed writes: {event['fields']}")
+    return retry
+
+
+class SyncBuffer:
+    def append(self, event):
+        write([event])
+
+    def claim(self, count):
+        return None, []
+
+    def ack(self, claim):
+        pass
+
+    def release(self, claim, events):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class MemoryBuffer:
+    """Per-process list drained by a daemon thread"""
+
+    def __init__(self):
+        self._events = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+
+    def _ensure_flusher(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                self._events = []  # forked child: the parent still owns what it buffered
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='activity-flusher', daemon=True).start()
+            atexit.register(flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(settings.ACTIVITY_FLUSH_SECONDS)
+            self._wake.clear()
+            try:
+                flush()
+            except Exception as e:
+                logger.error(f"Activity flush failed: {e}")
+
+    def append(self, event):
+        self._ensure_flusher()
+        with self._lock:
+            self._events.append(event)
+            size = len(self._events)
+
+        if size >= settings.ACTIVITY_BUFFER_MAX:
+            _flush_overflow(self)
+        elif size >= settings.ACTIVITY_FLUSH_SIZE:
+            self._wake.set()
+
+    def claim(self, count):
+        # The process holds its own events, so a claimed batch only has to survive a failed write
+        with self._lock:
+            batch = self._events[:count]
+            del self._events[:count]
+        return None, batch
+
+    def ack(self, claim):
+        pass
+
+    def release(self, claim, events):
+        retry = _retryable(events)
+        with self._lock:
+            self._events[:0] = retry
+
+    def __len__(self):
+        return len(self._events)
+
+
+# Moves up to ARGV[1] events into the claim list KEYS[2] and records the claim time in KEYS[3]
+_CLAIM_SCRIPT = """
+local rows = redis.call('lrange', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #rows > 0 then
+    redis.call('ltrim', KEYS[1], #rows, -1)
+    redis.call('rpush', KEYS[2], unpack(rows))
+    redis.call('zadd', KEYS[3], ARGV[2], KEYS[2])
+end
+return rows
+"""
+# Moves the events of every claim older than ARGV[1] back onto the buffer KEYS[1]
+_REQUEUE_SCRIPT = """
+local moved = 0
+for _, claim in ipairs(redis.call('zrangebyscore', KEYS[2], '-inf', ARGV[1])) do
+    local rows = redis.call('lrange', claim, 0, -1)
+    if #rows > 0 then
+        redis.call('rpush', KEYS[1], unpack(rows))
+        moved = moved + #rows
+    end
+    redis.call('del', claim)
+    redis.call('zrem', KEYS[2], claim)
+end
+return moved
+"""
+
+
+class RedisBuffer:
+    """One list shared by every process, drained by flush_activity_buffer"""
+
+    def __init__(self, client):
+        self.client = client
+        self.key = cache.make_key(REDIS_KEY)
+        self.claims_key = f"{self.key}:claims"
+
+    def append(self, event):
+        size = self.client.rpush(self.key, json.dumps(event))
+        if size >= settings.ACTIVITY_BUFFER_MAX:
+            _flush_overflow(self)
+        elif size >= settings.ACTIVITY_FLUSH_SIZE and cache.add(KICK_KEY, True, KICK_SECONDS):
+            from core.tasks import flush_activity_buffer
+            flush_activity_buffer.delay()
+
+    def claim(self, count):
+        claim = f"{self.key}:claim:{uuid.uuid4().hex}"
+        rows = self.client.eval(_CLAIM_SCRIPT, 3, self.key, claim, self.claims_key, count, time.time())
+        return claim, [json.loads(row) for row in rows]
+
+    def ack(self, claim):
+        pipe = self.client.pipeline()
+        pipe.delete(claim)
+        pipe.zrem(self.claims_key, claim)
+        pipe.execute()
+
+    def release(self, claim, events):
+        retry = _retryable(events)
+        pipe = self.client.pipeline()
+        if retry:
+            # LPUSH prepends its arguments one by one, so push in reverse to keep the order
+            pipe.lpush(self.key, *[json.dumps(event) for event in reversed(retry)])
+        pipe.delete(claim)
+        pipe.zrem(self.claims_key, claim)
+        pipe.execute()
+
+    def requeue_stale(self):
+        """Put back the batches of flushers that claimed them and never acknowledged"""
+        moved = self.client.eval(
+            _REQUEUE_SCRIPT, 2, self.key, self.claims_key, time.time() - CLAIM_TIMEOUT_SECONDS
+        )
+        if moved:
+            logger.warning(f"Requeued {moved} activity events from abandoned flushes")
+        return moved
+
+    def __len__(self):
+        return self.client.llen(self.key)
+
+
+_buffer = None
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        mode = settings.ACTIVITY_BUFFER
+        client = get_redis_client() if mode in ('auto', 'redis') else None
+        if mode == 'sync':
+            _buffer = SyncBuffer()
+        elif client is not None:
+            _buffer = RedisBuffer(client)
+        else:
+            _buffer = MemoryBuffer()
+    return _buffer
+
+
+def _write_batch(buffer, count):
+    """Claim, write and acknowledge one batch; a failed write puts it back. Returns None once empty"""
+    claim, batch = buffer.claim(count)
+    if not batch:
+        return None
+    try:
+        written = write(batch)
+    except Exception:
+        buffer.release(claim, batch)
+        raise
+    buffer.ack(claim)
+    return written
+
+
+def _flush_overflow(buffer):
+    # The event is already buffered, so a failed write must not reach _append and be written twice
+    try:
+        _write_batch(buffer, settings.ACTIVITY_FLUSH_SIZE)
+    except Exception as e:
+        logger.error(f"Activity overflow flush failed: {e}")
+
+
+def flush(max_batches=None):
+    """Drain the buffer in ACTIVITY_FLUSH_SIZE batches; returns the number written"""
+    buffer = get_buffer()
+    if isinstance(buffer, RedisBuffer):
+        buffer.requeue_stale()
+    written = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        count = _write_batch(buffer, settings.ACTIVITY_FLUSH_SIZE)
+        if count is None:
+            break
+        written += count
+        batches += 1
+    return written
+
+
+# Daily rollups and streaks
+def _zone(name):
+    try:
+        return ZoneInfo(name or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError):
+        return dt_timezone.utc
+
+
+def _seconds(metadata):
+    try:
+        return max(0, int((metadata or {}).get('seconds') or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def roll_up_daily(rows):
+    """
+    Add freshly written ActivityLog rows to DailyUserActivity, bucketed by
+    each user's local day. Runs inside the transaction that wrote the rows.
+    """
+    from accounts.models import UserProfile
+    from core.models import DailyUserActivity
+
+    if not rows:
+        return
+
+    zones = {
+        user_id: _zone(name) for user_id, name in
+        UserProfile.objects.filter(user_id__in={row.user_id for row in rows}).values_list('user_id', 'time_zone')
+    }
+    totals = {}
+    for row in rows:
+        day = timezone.localtime(row.created_at, zones.get(row.user_id, dt_timezone.utc)).date()
+        events, counts, seconds = totals.get((row.user_id, day), (0, Counter(), 0))
+        counts[row.activity_type] += 1
+        totals[(row.user_id, day)] = (events + 1, counts, seconds + _seconds(row.metadata))
+
+    user_ids = {user_id for user_id, _ in totals}
+    days = {day for _, day in totals}
+
+    def locked():
+        return {
+            (daily.user_id, daily.date): daily for daily in
+            DailyUserActivity.objects.select_for_update().filter(user_id__in=user_ids, date__in=days)
+        }
+
+    existing = locked()
+    if set(totals) - set(existing):
+        # A concurrent flush may create the same day; ignore its row and add to it under the lock
+        DailyUserActivity.objects.bulk_create([
+            DailyUserActivity(user_id=user_id, date=day) for user_id, day in set(totals) - set(existing)
+        ], ignore_conflicts=True)
+        existing = locked()
+
+    now = timezone.now()
+    updated = []
+    for key, (events, counts, seconds) in totals.items():
+        daily = existing[key]
+        daily.events += events
+        daily.event_counts = dict(Counter(daily.event_counts) + counts)
+        daily.seconds_studied += seconds
+        daily.updated_at = now
+        updated.append(daily)
+
+    DailyUserActivity.objects.bulk_update(updated, ['events', 'event_counts', 'seconds_studied', 'updated_at'])
+
+
+def study_streak(user, max_days=STREAK_MAX_DAYS):
+    """
+    Consecutive active days ending today in the user's time zone, from one
+    query over DailyUserActivity. Gaps and islands: within the island that
+    ends today every day plus its row number (newest first) equals today.
+    """
+    from core.models import DailyUserActivity
+
+    # Fetch a day past UTC either side; the user's own "today" is only known from the joined profile
+    utc_today = timezone.now().date()
+    rows = list(DailyUserActivity.objects.filter(
+        user=user, date__gt=utc_today - timedelta(days=max_days + 1), date__lte=utc_today + timedelta(days=1)
+    ).order_by('-date').values_list('date', 'user__profile__time_zone'))
+    if not rows:
+        return 0
+
+    today = timezone.localtime(timezone.now(), _zone(rows[0][1])).date()
+    streak = 0
+    for row_number, day in enumerate(day for day, _ in rows if day <= today):
+        if row_number >= max_days or day + timedelta(days=row_number) != today:
+            break
+        streak += 1
+    return streak
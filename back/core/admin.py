@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
-    Forum, Discussion, Reply, Notification, LearningAnalytics, 
-    ActivityLog, MediaContent, Announcement, SupportTicket
+    Forum, Discussion, Reply, Notification, NotificationPreference, LearningAnalytics, 
+    ActivityLog, DailyUserActivity, ActivityArchive, MediaContent, Announcement, SupportTicket, UploadSession, OutboxMessage
 )
 
 # Inline classes
@@ -51,6 +51,13 @@ class NotificationAdmin(admin.ModelAdmin):
     raw_id_fields = ('recipient', 'course', 'lesson', 'discussion')
     readonly_fields = ('created_at', 'read_at', 'email_sent_at')
 
+@admin.register(NotificationPreference)
+class NotificationPreferenceAdmin(admin.ModelAdmin):
+    list_display = ('user', 'notification_type', 'in_app', 'websocket', 'email', 'digest', 'updated_at')
+    list_filter = ('notification_type', 'in_app', 'websocket', 'email', 'digest')
+    search_fields = ('user__email',)
+    raw_id_fields = ('user',)
+
 @admin.register(LearningAnalytics)
 class LearningAnalyticsAdmin(admin.ModelAdmin):
     list_display = ('user', 'course', 'progress_percentage', 'last_activity')
@@ -69,6 +76,20 @@ class ActivityLogAdmin(admin.ModelAdmin):
     search_fields = ('user__email', 'ip_address')
     readonly_fields = ('created_at',)
 
+@admin.register(DailyUserActivity)
+class DailyUserActivityAdmin(admin.ModelAdmin):
+    list_display = ('user', 'date', 'events', 'seconds_studied', 'updated_at')
+    list_filter = ('date',)
+    search_fields = ('user__email',)
+    raw_id_fields = ('user',)
+    readonly_fields = ('events', 'event_counts', 'seconds_studied', 'updated_at')
+
+@admin.register(ActivityArchive)
+class ActivityArchiveAdmin(admin.ModelAdmin):
+    list_display = ('table', 'month', 'rows', 'path', 'created_at')
+    list_filter = ('table',)
+    readonly_fields = ('table', 'month', 'rows', 'path', 'created_at')
+
 @admin.register(MediaContent)
 class MediaContentAdmin(admin.ModelAdmin):
     list_display = ('title', 'content_type', 'file_size', 'uploaded_by', 'created_at')
@@ -89,4 +110,19 @@ class SupportTicketAdmin(admin.ModelAdmin):
     list_filter = ('status', 'priority', 'assigned_to')
     search_fields = ('ticket_number', 'subject', 'description', 'user__email')
     raw_id_fields = ('user', 'assigned_to', 'course')
-    readonly_fields = ('ticket_number', 'created_at', 'updated_at', 'resolved_at')
\ No newline at end of file
+    readonly_fields = ('ticket_number', 'created_at', 'updated_at', 'resolved_at')
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'purpose', 'user', 'offset', 'total_size', 'status', 'created_at')
+    list_filter = ('purpose', 'status')
+    search_fields = ('filename', 'user__email')
+    raw_id_fields = ('user',)
+    readonly_fields = ('offset', 'checksum', 'created_at', 'updated_at', 'completed_at')
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('channel', 'dedupe_key', 'status', 'attempts', 'available_at', 'created_at', 'delivered_at')
+    list_filter = ('channel', 'status')
+    search_fields = ('dedupe_key', 'uuid')
+    readonly_fields = ('uuid', 'payload', 'attempts', 'last_error', 'created_at', 'delivered_at')
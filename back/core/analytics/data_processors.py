@@ -3,7 +3,9 @@ from django.utils import timezone
 from datetime import timedelta, date
 from typing import Dict, List, Any
 from courses.models import Course, Enrollment, Quiz, QuizAttempt, Lesson, LessonProgress
-from core.models import ActivityLog, Discussion
+from core.models import ActivityLog
+from core.utils import get_study_streak
+from core.analytics.teacher import get_teacher_analytics
 from accounts.models import CustomUser as User
 
 class ELearningAnalytics:
@@ -28,18 +30,7 @@ class ELearningAnalytics:
             })
         
         # Learning streak (days with activity)
-        today = timezone.now().date()
-        streak_days = 0
-        for i in range(30):  # Check last 30 days
-            check_date = today - timedelta(days=i)
-            has_activity = ActivityLog.objects.filter(
-                user=user,
-                created_at__date=check_date
-            ).exists()
-            if has_activity:
-                streak_days += 1
-            else:
-                break
+        streak_days = get_study_streak(user, max_days=30)
         
         # Study time analysis
         study_time_data = ELearningAnalytics._get_study_time_breakdown(user)
@@ -111,43 +102,31 @@ class ELearningAnalytics:
     @staticmethod
     def get_teacher_course_analytics(teacher: User) -> Dict[str, Any]:
         """Get comprehensive teacher analytics"""
-        courses = Course.objects.filter(instructor=teacher)
-        
-        # Course performance overview
-        course_stats = []
-        for course in courses:
-            enrollments = course.enrollments.filter(is_active=True)
-            
-            course_stats.append({
-                'course_id': str(course.uuid),
-                'title': course.title,
-                'total_students': enrollments.count(),
-                'completed_students': enrollments.filter(status='completed').count(),
-                'avg_progress': enrollments.aggregate(avg=Avg('progress_percentage'))['avg'] or 0,
-                'avg_rating': course.reviews.aggregate(avg=Avg('rating'))['avg'] or 0,
-                'total_reviews': course.reviews.count(),
-                'engagement_score': ELearningAnalytics._calculate_engagement_score(course)
-            })
-        
-        # Student activity analysis
-        student_activity = ELearningAnalytics._get_teacher_student_activity(teacher)
-        
-        # Discussion engagement
-        discussion_stats = Discussion.objects.filter(
-            forum__course__instructor=teacher
-        ).aggregate(
-            total_discussions=Count('id'),
-            resolved_questions=Count('id', filter=Q(discussion_type='question', is_resolved=True)),
-            total_questions=Count('id', filter=Q(discussion_type='question'))
-        )
+        analytics = get_teacher_analytics(teacher)
+        summary = analytics['summary']
+        
+        course_stats = [{
+            'course_id': course['uuid'],
+            'title': course['title'],
+            'total_students': course['students'],
+            'completed_students': course['completed_students'],
+            'avg_progress': course['avg_progress'],
+            'avg_rating': course['rating'],
+            'total_reviews': course['reviews'],
+            'engagement_score': course['engagement_score']
+        } for course in analytics['courses']]
         
         return {
             'course_performance': course_stats,
-            'student_activity': student_activity,
+            'student_activity': {
+                'total_students': summary['total_enrollments'],
+                'active_students_7d': summary['active_students_7d'],
+                'progress_distribution': summary['progress_distribution']
+            },
             'discussion_engagement': {
-                'total_discussions': discussion_stats['total_discussions'],
+                'total_discussions': summary['total_discussions'],
                 'question_resolution_rate': round(
-                    (discussion_stats['resolved_questions'] / max(discussion_stats['total_questions'], 1)) * 100, 1
+                    (summary['resolved_questions'] / max(summary['total_questions'], 1)) * 100, 1
                 )
             }
         }
@@ -244,57 +223,3 @@ class ELearningAnalytics:
             'weekly_average': round(weekly_avg, 1),
             'total_hours_30d': round(total_minutes / 60, 1)
         }
-    
-    @staticmethod
-    def _calculate_engagement_score(course: Course) -> float:
-        """Calculate course engagement score (0-100)"""
-        enrollments = course.enrollments.filter(is_active=True)
-        if not enrollments.exists():
-            return 0
-        
-        # Factors: completion rate, avg progress, forum activity, quiz participation
-        completion_rate = enrollments.filter(status='completed').count() / enrollments.count()
-        avg_progress = enrollments.aggregate(avg=Avg('progress_percentage'))['avg'] or 0
-        
-        forum_activity = Discussion.objects.filter(forum__course=course).count()
-        quiz_participation = QuizAttempt.objects.filter(quiz__course=course).count()
-        
-        # Weighted score
-        engagement = (
-            completion_rate * 40 +  # 40% weight on completion
-            (avg_progress / 100) * 30 +  # 30% weight on progress
-            min(forum_activity / enrollments.count(), 1) * 20 +  # 20% weight on discussions
-            min(quiz_participation / enrollments.count(), 1) * 10  # 10% weight on quiz participation
-        )
-        
-        return round(engagement * 100, 1)
-    
-    @staticmethod
-    def _get_teacher_student_activity(teacher: User) -> Dict[str, Any]:
-        """Get student activity data for teacher's courses"""
-        enrollments = Enrollment.objects.filter(
-            course__instructor=teacher,
-            is_active=True
-        )
-        
-        # Active students (last 7 days)
-        week_ago = timezone.now() - timedelta(days=7)
-        active_students = enrollments.filter(
-            last_accessed__gte=week_ago
-        ).count()
-        
-        # Students by progress level
-        progress_distribution = {
-            'not_started': enrollments.filter(progress_percentage=0).count(),
-            'in_progress': enrollments.filter(
-                progress_percentage__gt=0, 
-                progress_percentage__lt=100
-            ).count(),
-            'completed': enrollments.filter(progress_percentage=100).count()
-        }
-        
-        return {
-            'total_students': enrollments.count(),
-            'active_students_7d': active_students,
-            'progress_distribution': progress_distribution
-        }
\ No newline at end of file
@@ -1,7 +1,5 @@
 # Simple data processing utilities
 from django.db.models import Count, Avg, Sum, Q
-from django.utils import timezone
-from datetime import timedelta
 from typing import Dict, List, Any
 
 class LearningMetrics:
@@ -22,21 +20,6 @@ class LearningMetrics:
     @staticmethod
     def get_study_streak(user) -> int:
         """Get user's current study streak in days"""
-        from core.models import ActivityLog
+        from core.activity import study_streak
         
-        today = timezone.now().date()
-        streak = 0
-        
-        for i in range(365):  # Check up to 1 year
-            check_date = today - timedelta(days=i)
-            has_activity = ActivityLog.objects.filter(
-                user=user,
-                created_at__date=check_date
-            ).exists()
-            
-            if has_activity:
-                streak += 1
-            else:
-                break
-                
-        return streak
\ No newline at end of file
+        return study_streak(user)
\ No newline at end of file
@@ -0,0 +1,183 @@
+# Teacher analytics engine
+"""
+Every per-course metric of an instructor in two queries: the courses with
+review, quiz, enrollment and discussion aggregates as correlated subqueries
+(the conditional enrollment and discussion aggregates come back as one JSON
+object each), and the distinct student counts across all their courses.
+Results are cached per instructor; core.signals drops the entry when one of
+their courses, enrollments, reviews, discussions or quiz attempts changes.
+"""
+from django.core.cache import cache
+from django.db.models import Avg, Count, JSONField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, JSONObject
+from django.utils import timezone
+from datetime import timedelta
+from typing import Any, Dict, List
+
+CACHE_KEY = 'teacher_analytics_{}'
+CACHE_SECONDS = 60 * 15  # bounds staleness from bulk updates, which send no signals
+INSTRUCTOR_CACHE_KEY = 'course_instructor_{}'
+
+
+def _per_course(queryset, path, **aggregate):
+    """Correlated subquery computing one aggregate of queryset for the outer course"""
+    (name, _), = aggregate.items()
+    return Subquery(
+        queryset.filter(**{path: OuterRef('pk')}).order_by().values(path).annotate(**aggregate).values(name)[:1]
+    )
+
+
+def _stats_per_course(queryset, path, **aggregates):
+    """Correlated subquery returning several aggregates of queryset for the outer course as one JSON object"""
+    return Subquery(
+        queryset.filter(**{path: OuterRef('pk')}).order_by().values(path).annotate(
+            stats=JSONObject(**aggregates)
+        ).values('stats')[:1],
+        output_field=JSONField(),
+    )
+
+
+def _courses(teacher_id):
+    from courses.models import Course, CourseReview, Enrollment, QuizAttempt
+    from core.models import Discussion
+
+    week_ago = timezone.now() - timedelta(days=7)
+    active = Q(is_active=True)
+    question = Q(discussion_type='question')
+    reviews = CourseReview.objects.all()
+    return list(Course.objects.filter(instructor_id=teacher_id).annotate(
+        avg_rating=_per_course(reviews, 'course', avg_rating=Avg('rating')),
+        review_count=Coalesce(_per_course(reviews, 'course', review_count=Count('id')), 0),
+        attempt_count=Coalesce(_per_course(QuizAttempt.objects.all(), 'quiz__course', attempt_count=Count('id')), 0),
+        enrollment_stats=_stats_per_course(
+            Enrollment.objects.all(), 'course',
+            students=Count('id', filter=active),
+            completed=Count('id', filter=active & Q(status='completed')),
+            avg_progress=Avg('progress_percentage', filter=active),
+            not_started=Count('id', filter=active & Q(progress_percentage=0)),
+            in_progress=Count('id', filter=active & Q(progress_percentage__gt=0, progress_percentage__lt=100)),
+            progress_complete=Count('id', filter=active & Q(progress_percentage=100)),
+            active_7d=Count('id', filter=active & Q(last_accessed__gte=week_ago)),
+        ),
+        discussion_stats=_stats_per_course(
+            Discussion.objects.all(), 'forum__course',
+            discussions=Count('id'),
+            questions=Count('id', filter=question),
+            resolved_questions=Count('id', filter=question & Q(is_resolved=True)),
+            pending_questions=Count('id', filter=question & Q(is_resolved=False)),
+        ),
+    ).order_by('-created_at', 'id').values(
+        'id', 'uuid', 'title', 'status', 'avg_rating', 'review_count', 'attempt_count',
+        'enrollment_stats', 'discussion_stats'
+    ))
+
+
+def _students(teacher_id):
+    """Distinct active students across the instructor's courses, overall and in the last 7 days"""
+    from courses.models import Enrollment
+
+    week_ago = timezone.now() - timedelta(days=7)
+    return Enrollment.objects.filter(course__instructor_id=teacher_id, is_active=True).aggregate(
+        total=Count('student', distinct=True),
+        active_7d=Count('student', distinct=True, filter=Q(last_accessed__gte=week_ago)),
+    )
+
+
+def engagement_score(students, completed, avg_progress, discussions, quiz_attempts) -> float:
+    """Course engagement score (0-100) from completion, progress, forum and quiz activity"""
+    if not students:
+        return 0
+    engagement = (
+        completed / students * 40 +
+        avg_progress / 100 * 30 +
+        min(discussions / students, 1) * 20 +
+        min(quiz_attempts / students, 1) * 10
+    )
+    return round(engagement, 1)
+
+
+def compute(teacher_id) -> Dict[str, Any]:
+    """Summary and per-course metrics for an instructor, uncached"""
+    courses: List[Dict[str, Any]] = []
+    for course in _courses(teacher_id):
+        enrolled = course['enrollment_stats'] or {}
+        discussed = course['discussion_stats'] or {}
+        students = enrolled.get('students', 0)
+        avg_progress = float(enrolled.get('avg_progress') or 0)
+        courses.append({
+            'id': course['id'],
+            'uuid': str(course['uuid']),
+            'title': course['title'],
+            'status': course['status'],
+            'students': students,
+            'completed_students': enrolled.get('completed', 0),
+            'avg_progress': avg_progress,
+            'rating': float(course['avg_rating'] or 0),
+            'reviews': course['review_count'],
+            'quiz_attempts': course['attempt_count'],
+            'discussions': discussed.get('discussions', 0),
+            'questions': discussed.get('questions', 0),
+            'resolved_questions': discussed.get('resolved_questions', 0),
+            'pending_questions': discussed.get('pending_questions', 0),
+            'progress_distribution': {
+                'not_started': enrolled.get('not_started', 0),
+                'in_progress': enrolled.get('in_progress', 0),
+                'completed': enrolled.get('progress_complete', 0),
+            },
+            'active_students_7d': enrolled.get('active_7d', 0),
+            'engagement_score': engagement_score(
+                students, enrolled.get('completed', 0), avg_progress,
+                discussed.get('discussions', 0), course['attempt_count']
+            ),
+        })
+
+    reviews = sum(course['reviews'] for course in courses)
+    students = _students(teacher_id)
+    return {
+        'summary': {
+            'total_courses': len(courses),
+            'published_courses': sum(course['status'] == 'published' for course in courses),
+            'total_students': students['total'],
+            'total_enrollments': sum(course['students'] for course in courses),
+            'avg_course_rating': sum(course['rating'] * course['reviews'] for course in courses) / reviews if reviews else 0,
+            'total_discussions': sum(course['discussions'] for course in courses),
+            'total_questions': sum(course['questions'] for course in courses),
+            'resolved_questions': sum(course['resolved_questions'] for course in courses),
+            'pending_questions': sum(course['pending_questions'] for course in courses),
+            'active_students_7d': students['active_7d'],
+            'progress_distribution': {
+                level: sum(course['progress_distribution'][level] for course in courses)
+                for level in ('not_started', 'in_progress', 'completed')
+            },
+        },
+        'courses': courses,
+    }
+
+
+def get_teacher_analytics(teacher) -> Dict[str, Any]:
+    """Cached compute() for an instructor"""
+    key = CACHE_KEY.format(teacher.id)
+    data = cache.get(key)
+    if data is None:
+        data = compute(teacher.id)
+        cache.set(key, data, CACHE_SECONDS)
+    return data
+
+
+def invalidate(teacher_id):
+    if teacher_id:
+        cache.delete(CACHE_KEY.format(teacher_id))
+
+
+def instructor_of(course_id):
+    """Instructor id of a course, cached since it rarely changes"""
+    from courses.models import Course
+
+    if not course_id:
+        return None
+    key = INSTRUCTOR_CACHE_KEY.format(course_id)
+    instructor_id = cache.get(key)
+    if instructor_id is None:
+        instructor_id = Course.objects.filter(pk=course_id).values_list('instructor_id', flat=True).first()
+        cache.set(key, instructor_id, 60 * 60)
+    return instructor_id
@@ -2,7 +2,8 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
-from django.utils import timezone
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,8 +29,9 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         
         await self.accept()
         
-        # Send pending notifications
+        # Send pending notifications and the current unread count
         await self.send_pending_notifications()
+        await self.send_unread_count(await self.get_unread_count())
     
     async def disconnect(self, close_code):
         if hasattr(self, 'user_group'):
@@ -54,41 +56,53 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             'notification': event['notification']
         }))
     
-    @database_sync_to_async
-    def send_pending_notifications(self):
-        from core.models import Notification
-        notifications = Notification.objects.filter(
-            recipient=self.user,
-            is_read=False
-        ).order_by('-created_at')[:10]
+    async def notification_unread(self, event):
+        """Push the user's new unread count"""
+        await self.send_unread_count(event['unread_count'])
+    
+    async def send_unread_count(self, count):
+        await self.send(text_data=json.dumps({
+            'type': 'unread_count',
+            'unread_count': count
+        }))
+    
+    async def send_pending_notifications(self):
+        """Replay what the client missed since the cursor it connected with"""
+        from core.notifications import replay_frames
         
-        for notification in notifications:
-            self.send(text_data=json.dumps({
-                'type': 'notification',
-                'notification': {
-                    'id': str(notification.uuid),
-                    'type': notification.notification_type,
-                    'title': notification.title,
-                    'message': notification.message,
-                    'created_at': notification.created_at.isoformat(),
-                }
-            }))
+        notifications, has_more = await self.get_pending_notifications()
+        for frame in replay_frames(notifications, has_more):
+            await self.send(text_data=json.dumps(frame))
+    
+    def connect_cursor(self):
+        from urllib.parse import parse_qs
+        from core.notifications import parse_cursor
+        
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        return parse_cursor(query.get('cursor', [None])[0])
+    
+    @database_sync_to_async
+    def get_pending_notifications(self):
+        from core.notifications import replay_notifications
+        return replay_notifications(self.user.id, self.connect_cursor())
+    
+    @database_sync_to_async
+    def get_unread_count(self):
+        from core.notifications import unread_count
+        return unread_count(self.user.id)
     
     @database_sync_to_async
     def mark_notification_read(self, notification_id):
-        from core.models import Notification
-        Notification.objects.filter(
-            uuid=notification_id,
-            recipient=self.user
-        ).update(is_read=True, read_at=timezone.now())
+        from core.notifications import mark_read
+        try:
+            mark_read(self.user, notification_id)
+        except ValidationError:
+            logger.warning(f"Invalid notification id from {self.user.uuid}: {notification_id}")
     
     @database_sync_to_async
     def mark_all_read(self):
-        from core.models import Notification
-        Notification.objects.filter(
-            recipient=self.user,
-            is_read=False
-        ).update(is_read=True, read_at=timezone.now())
+        from core.notifications import mark_all_read
+        mark_all_read(self.user)
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
@@ -301,4 +315,47 @@ class LiveLessonConsumer(AsyncWebsocketConsumer):
             return False
     
     @database_sync_to_async
-    def track_att
\ No newline at end of file
+    def track_attendance(self, joined):
+        """Keep the set of connected attendees in the cache and return its size"""
+        key = f"live_lesson_attendees_{self.lesson_id}"
+        attendees = cache.get(key) or set()
+        if joined:
+            attendees.add(str(self.user.uuid))
+        else:
+            attendees.discard(str(self.user.uuid))
+        cache.set(key, attendees, 60 * 60 * 12)
+        return len(attendees)
+    
+    async def handle_question(self, data):
+        """Relay a student question to everyone in the lesson"""
+        await self.channel_layer.group_send(
+            self.lesson_group,
+            {
+                'type': 'lesson_question',
+                'question': {
+                    'content': data.get('content', ''),
+                    'author': {
+                        'id': str(self.user.uuid),
+                        'name': self.user.get_full_name(),
+                    },
+                }
+            }
+        )
+    
+    async def handle_poll_response(self, data):
+        """Relay a poll answer; clients show the tally to instructors only"""
+        await self.channel_layer.group_send(
+            self.lesson_group,
+            {
+                'type': 'poll_response',
+                'poll_id': data.get('poll_id'),
+                'option': data.get('option'),
+                'user_id': str(self.user.uuid),
+            }
+        )
+    
+    async def lesson_question(self, event):
+        await self.send(text_data=json.dumps(event))
+    
+    async def poll_response(self, event):
+        await self.send(text_data=json.dumps(event))
@@ -0,0 +1,150 @@
+# back/core/digests.py
+"""Periodic email digests of unread notifications."""
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F, OuterRef, Q
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.html import strip_tags
+from datetime import timedelta
+from itertools import groupby
+import logging
+
+from .utils import acquire_lock, release_lock
+
+logger = logging.getLogger(__name__)
+
+DIGEST_PERIODS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(days=7),
+}
+DIGEST_TEMPLATE = 'emails/notification_digest.html'
+SEND_BATCH_SIZE = 100
+MAX_ITEMS_PER_EMAIL = 25
+TICK_LOCK_KEY = 'notification_digest_tick_lock'
+TICK_LOCK_SECONDS = 60 * 30
+
+_template = None
+
+
+def digest_template():
+    """Compiled once per process; every digest in a run renders from the same template"""
+    global _template
+    if _template is None:
+        _template = get_template(DIGEST_TEMPLATE)
+    return _template
+
+
+def _due_filter(now):
+    """Recipients whose cadence has elapsed since their last digest"""
+    due = Q()
+    for frequency, period in DIGEST_PERIODS.items():
+        due |= Q(recipient__profile__digest_frequency=frequency) & (
+            Q(recipient__profile__last_digest_at__isnull=True) |
+            Q(recipient__profile__last_digest_at__lte=now - period)
+        )
+    return due
+
+
+def pending_notifications(now):
+    """
+    Unread, un-emailed notifications of every due recipient, in one query
+    ordered by recipient so the rows can be grouped while streaming. Types a
+    recipient left out of digests are skipped.
+    """
+    from core.models import Notification
+    from core.notifications import muted
+
+    return Notification.objects.filter(
+        _due_filter(now),
+        is_read=False,
+        email_sent=False,
+        recipient__is_active=True,
+    ).exclude(
+        muted('digest', 'recipient_id', OuterRef('notification_type'))
+    ).filter(
+        Q(recipient__profile__last_digest_at__isnull=True) |
+        Q(created_at__gt=F('recipient__profile__last_digest_at'))
+    ).select_related('recipient__profile', 'course').order_by('recipient_id', '-created_at')
+
+
+def _render(user, notifications, frequency):
+    shown = notifications[:MAX_ITEMS_PER_EMAIL]
+    company_name = getattr(settings, 'COMPANY_NAME', '244SCHOOL')
+    context = {
+        'user_name': user.get_full_name() or user.email,
+        'notifications': shown,
+        'remaining': len(notifications) - len(shown),
+        'total': len(notifications),
+        'frequency': frequency,
+        'company_name': company_name,
+        'frontend_url': getattr(settings, 'FRONTEND_URL', '').rstrip('/'),
+        'current_year': timezone.now().year,
+    }
+    html = digest_template().render(context)
+
+    subject = f"[{company_name}] You have {len(notifications)} unread notification{'s' if len(notifications) != 1 else ''}"
+    message = EmailMultiAlternatives(
+        subject=subject,
+        body=strip_tags(html),
+        from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None),
+        to=[user.email],
+    )
+    message.attach_alternative(html, 'text/html')
+    return message
+
+
+def _flush(connection, batch, now):
+    """Send one batch over the open connection and mark what went out"""
+    from accounts.models import UserProfile
+    from core.models import Notification
+
+    try:
+        connection.send_messages([message for message, _, _ in batch])
+    except Exception as e:
+        logger.error(f"Failed to send digest batch of {len(batch)}: {e}")
+        return 0
+
+    sent = [n for _, _, notifications in batch for n in notifications]
+    for notification in sent:
+        notification.email_sent = True
+        notification.email_sent_at = now
+    Notification.objects.bulk_update(sent, ['email_sent', 'email_sent_at'], batch_size=500)
+
+    profiles = [UserProfile(user_id=user.id, last_digest_at=now) for _, user, _ in batch]
+    UserProfile.objects.bulk_update(profiles, ['last_digest_at'])
+    return len(batch)
+
+
+def send_digests(now=None):
+    """One digest tick: email every due user a summary of what they have not read"""
+    token = acquire_lock(TICK_LOCK_KEY, TICK_LOCK_SECONDS)
+    if token is None:
+        logger.info("Notification digest tick already running")
+        return 0
+
+    try:
+        now = now or timezone.now()
+        sent = 0
+        connection = get_connection()
+        connection.open()
+        try:
+            batch = []
+            rows = pending_notifications(now).iterator(chunk_size=2000)
+            for _, group in groupby(rows, key=lambda n: n.recipient_id):
+                notifications = list(group)
+                user = notifications[0].recipient
+                batch.append((_render(user, notifications, user.profile.digest_frequency), user, notifications))
+                if len(batch) == SEND_BATCH_SIZE:
+                    sent += _flush(connection, batch, now)
+                    batch = []
+            if batch:
+                sent += _flush(connection, batch, now)
+        finally:
+            connection.close()
+
+        if sent:
+            logger.info(f"Sent {sent} notification digests")
+        return sent
+    finally:
+        release_lock(TICK_LOCK_KEY, token)
@@ -56,7 +56,12 @@ class ActivityLogFilter(django_filters.FilterSet):
     course = UUIDFilter(field_name='course__uuid')  # Use custom UUID filter
     date_from = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='gte')
     date_to = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='lte')
+    window_days = django_filters.NumberFilter(method='filter_window_days', min_value=1)
     
     class Meta:
         model = ActivityLog
-        fields = ['user', 'activity_type', 'course']
\ No newline at end of file
+        fields = ['user', 'activity_type', 'course']
+
+    def filter_window_days(self, queryset, name, value):
+        # Only the partitions of the last N days are scanned
+        return queryset.recent(int(value))
\ No newline at end of file
@@ -0,0 +1,265 @@
+# back/core/learning_analytics.py
+"""
+Incremental LearningAnalytics.
+
+Every flush of the activity buffer folds its course events (lesson
+completions, quiz submissions, assignments, forum posts and replies,
+resource access) into LearningAnalytics as counter deltas: one locking read
+and one bulk update per batch. Missing rows are inserted first with
+ignore_conflicts, so two flushes racing on a new row both add to it. Events
+from users who are not enrolled in the course, such as an instructor
+answering in the forum, are skipped.
+
+A nightly reconcile rebuilds every row from the source tables, so a lost
+buffer or a deleted discussion is corrected within a day. The activity log
+is the only record of resource access, so resources_accessed keeps its
+counted value.
+"""
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.utils import timezone
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+import logging
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = {
+    'lesson_complete': 'lessons_completed',
+    'quiz_submit': 'quizzes_attempted',
+    'assignment_submit': 'assignments_submitted',
+    'forum_post': 'forum_posts',
+    'forum_reply': 'forum_replies',
+    'resource_download': 'resources_accessed',
+}
+UPDATE_FIELDS = [
+    'total_time_spent_seconds', 'lessons_completed', 'quizzes_attempted', 'quizzes_passed',
+    'assignments_submitted', 'average_quiz_score', 'highest_quiz_score', 'forum_posts',
+    'forum_replies', 'resources_accessed', 'learning_path_data', 'last_activity', 'updated_at',
+]
+RECONCILE_BATCH_SIZE = 500
+SCORE_PLACES = Decimal('0.01')
+
+
+def _score(value):
+    try:
+        return Decimal(str(value)) if value is not None else None
+    except InvalidOperation:
+        return None
+
+
+class _Delta:
+    """What one batch adds to a single (user, course) row"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.seconds = 0
+        self.passed = 0
+        self.scores = []
+        self.lessons = []
+        self.last_activity = None
+
+    def add(self, row, seconds):
+        metadata = row.metadata or {}
+        field = COUNTERS.get(row.activity_type)
+        if field:
+            self.counts[field] += 1
+        self.seconds += seconds
+        if row.activity_type == 'quiz_submit':
+            self.passed += bool(metadata.get('passed'))
+            score = _score(metadata.get('score'))
+            if score is not None:
+                self.scores.append(score)
+        elif row.activity_type == 'lesson_complete' and row.lesson_id:
+            self.lessons.append(row.lesson_id)
+        if self.last_activity is None or row.created_at > self.last_activity:
+            self.last_activity = row.created_at
+
+    def apply(self, analytics, now):
+        for field, count in self.counts.items():
+            setattr(analytics, field, getattr(analytics, field) + count)
+        analytics.total_time_spent_seconds += self.seconds
+        analytics.quizzes_passed += self.passed
+
+        path = analytics.learning_path_data
+        if self.scores:
+            scored = path.get('scored_quizzes', 0)
+            total = (analytics.average_quiz_score or 0) * scored + sum(self.scores)
+            path['scored_quizzes'] = scored + len(self.scores)
+            analytics.average_quiz_score = (total / path['scored_quizzes']).quantize(SCORE_PLACES)
+            analytics.highest_quiz_score = max(self.scores + [analytics.highest_quiz_score or Decimal(0)])
+        if self.lessons:
+            lessons = path.setdefault('lessons', [])
+            lessons.extend(lesson_id for lesson_id in self.lessons if lesson_id not in lessons)
+
+        analytics.last_activity = max(filter(None, [analytics.last_activity, self.last_activity]))
+        analytics.updated_at = now
+
+
+def apply_events(rows):
+    """
+    Fold freshly written ActivityLog rows into LearningAnalytics. Runs inside
+    the transaction that wrote the rows.
+    """
+    from courses.models import Enrollment
+    from core.activity import _seconds
+    from core.models import LearningAnalytics
+
+    deltas = {}
+    for row in rows:
+        seconds = _seconds(row.metadata)
+        if row.course_id is None or (row.activity_type not in COUNTERS and not seconds):
+            continue
+        deltas.setdefault((row.user_id, row.course_id), _Delta()).add(row, seconds)
+    if not deltas:
+        return
+
+    user_ids = {user_id for user_id, _ in deltas}
+    course_ids = {course_id for _, course_id in deltas}
+    enrollments = {
+        (student_id, course_id): enrollment_id for enrollment_id, student_id, course_id in
+        Enrollment.objects.filter(student_id__in=user_ids, course_id__in=course_ids).values_list(
+            'id', 'student_id', 'course_id'
+        )
+    }
+    def locked():
+        return {
+            (analytics.user_id, analytics.course_id): analytics for analytics in
+            LearningAnalytics.objects.select_for_update().filter(user_id__in=user_ids, course_id__in=course_ids)
+        }
+
+    existing = locked()
+    missing = [key for key in deltas if key not in existing and key in enrollments]
+    if missing:
+        # A concurrent flush or the reconcile may create the same row; ignore its row and add to it under the lock
+        LearningAnalytics.objects.bulk_create([
+            LearningAnalytics(user_id=user_id, course_id=course_id, enrollment_id=enrollments[(user_id, course_id)])
+            for user_id, course_id in missing
+        ], ignore_conflicts=True)
+        existing = locked()
+
+    now = timezone.now()
+    updated = []
+    for key, delta in deltas.items():
+        analytics = existing.get(key)
+        if analytics is None:
+            continue
+        delta.apply(analytics, now)
+        updated.append(analytics)
+
+    LearningAnalytics.objects.bulk_update(updated, UPDATE_FIELDS)
+
+
+# Nightly reconcile
+def _grouped(queryset, keys, **aggregates):
+    """{key tuple: aggregate dict} from one grouped query"""
+    return {
+        tuple(row[key] for key in keys): row
+        for row in queryset.values(*keys).annotate(**aggregates).order_by()
+    }
+
+
+def _rebuild(enrollments):
+    """Recompute the analytics of a batch of enrollments with one grouped query per source"""
+    from courses.models import AssignmentSubmission, LessonProgress, QuizAttempt
+    from core.models import Discussion, LearningAnalytics, Reply
+
+    ids = [enrollment.id for enrollment in enrollments]
+    user_ids = {enrollment.student_id for enrollment in enrollments}
+    course_ids = {enrollment.course_id for enrollment in enrollments}
+
+    lessons = _grouped(
+        LessonProgress.objects.filter(enrollment_id__in=ids), ['enrollment_id'],
+        # Lesson time is counted when the lesson completes, as the lesson_complete event does
+        completed=Count('id', filter=Q(is_completed=True)),
+        seconds=Sum('time_spent_seconds', filter=Q(is_completed=True)),
+    )
+    completed_lessons = {}
+    for enrollment_id, lesson_id in LessonProgress.objects.filter(
+        enrollment_id__in=ids, is_completed=True
+    ).order_by('completed_at', 'id').values_list('enrollment_id', 'lesson_id'):
+        completed_lessons.setdefault(enrollment_id, []).append(lesson_id)
+    quizzes = _grouped(
+        QuizAttempt.objects.filter(enrollment_id__in=ids, completed_at__isnull=False), ['enrollment_id'],
+        attempted=Count('id'), passed=Count('id', filter=Q(passed=True)), scored=Count('score'),
+        average=Avg('score'), highest=Max('score'), seconds=Sum('time_taken_seconds'),
+        last=Max('completed_at'),
+    )
+    assignments = _grouped(
+        AssignmentSubmission.objects.filter(enrollment_id__in=ids), ['enrollment_id'], submitted=Count('id'),
+    )
+    posts = _grouped(
+        Discussion.objects.filter(author_id__in=user_ids, forum__course_id__in=course_ids),
+        ['author_id', 'forum__course_id'], count=Count('id'),
+    )
+    replies = _grouped(
+        Reply.objects.filter(author_id__in=user_ids, discussion__forum__course_id__in=course_ids),
+        ['author_id', 'discussion__forum__course_id'], count=Count('id'),
+    )
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {
+            analytics.enrollment_id: analytics for analytics in
+            LearningAnalytics.objects.select_for_update().filter(user_id__in=user_ids, course_id__in=course_ids)
+        }
+        created, updated = [], []
+        for enrollment in enrollments:
+            key = (enrollment.student_id, enrollment.course_id)
+            lesson = lessons.get((enrollment.id,), {})
+            quiz = quizzes.get((enrollment.id,), {})
+            analytics = existing.get(enrollment.id)
+            if analytics is None:
+                analytics = LearningAnalytics(
+                    user_id=enrollment.student_id, course_id=enrollment.course_id, enrollment_id=enrollment.id
+                )
+                created.append(analytics)
+            else:
+                updated.append(analytics)
+
+            analytics.lessons_completed = lesson.get('completed') or 0
+            analytics.total_time_spent_seconds = (lesson.get('seconds') or 0) + (quiz.get('seconds') or 0)
+            analytics.quizzes_attempted = quiz.get('attempted') or 0
+            analytics.quizzes_passed = quiz.get('passed') or 0
+            average = quiz.get('average')
+            analytics.average_quiz_score = _score(average).quantize(SCORE_PLACES) if average is not None else None
+            analytics.highest_quiz_score = quiz.get('highest')
+            analytics.assignments_submitted = assignments.get((enrollment.id,), {}).get('submitted') or 0
+            analytics.forum_posts = posts.get(key, {}).get('count') or 0
+            analytics.forum_replies = replies.get(key, {}).get('count') or 0
+            analytics.learning_path_data = {
+                **analytics.learning_path_data,
+                'lessons': completed_lessons.get(enrollment.id, []),
+                'scored_quizzes': quiz.get('scored') or 0,
+            }
+            analytics.last_activity = max(filter(None, [
+                analytics.last_activity, enrollment.last_accessed, quiz.get('last'), enrollment.enrolled_at,
+            ]))
+            analytics.updated_at = now
+
+        LearningAnalytics.objects.bulk_update(updated, UPDATE_FIELDS)
+        LearningAnalytics.objects.bulk_create(created)
+    return len(created) + len(updated)
+
+
+def reconcile(batch_size=RECONCILE_BATCH_SIZE):
+    """Rebuild LearningAnalytics from the source tables, one batch of enrollments at a time"""
+    from courses.models import Enrollment
+    from core.activity import flush
+
+    # Events still buffered would otherwise be counted again on top of the rebuilt rows
+    flush()
+
+    rebuilt = 0
+    last_id = 0
+    while True:
+        enrollments = list(Enrollment.objects.filter(id__gt=last_id).order_by('id').only(
+            'id', 'student_id', 'course_id', 'last_accessed', 'enrolled_at'
+        )[:batch_size])
+        if not enrollments:
+            break
+        rebuilt += _rebuild(enrollments)
+        last_id = enrollments[-1].id
+
+    logger.info(f"Reconciled {rebuilt} learning analytics rows")
+    return rebuilt
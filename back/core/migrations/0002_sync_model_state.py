@@ -0,0 +1,73 @@
+# Generated by Django 5.2 on 2026-10-19 02:07
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='activitylog',
+            options={'ordering': ['-created_at', 'id'], 'verbose_name': 'Activity Log', 'verbose_name_plural': 'Activity Logs'},
+        ),
+        migrations.AlterModelOptions(
+            name='announcement',
+            options={'ordering': ['-is_pinned', '-created_at', 'id'], 'verbose_name': 'Announcement', 'verbose_name_plural': 'Announcements'},
+        ),
+        migrations.AlterModelOptions(
+            name='discussion',
+            options={'ordering': ['-is_pinned', '-created_at', 'id'], 'verbose_name': 'Discussion', 'verbose_name_plural': 'Discussions'},
+        ),
+        migrations.AlterModelOptions(
+            name='forum',
+            options={'ordering': ['-created_at', 'id'], 'verbose_name': 'Forum', 'verbose_name_plural': 'Forums'},
+        ),
+        migrations.AlterModelOptions(
+            name='mediacontent',
+            options={'ordering': ['-created_at', 'id'], 'verbose_name': 'Media Content', 'verbose_name_plural': 'Media Contents'},
+        ),
+        migrations.AlterModelOptions(
+            name='notification',
+            options={'ordering': ['-created_at', 'id'], 'verbose_name': 'Notification', 'verbose_name_plural': 'Notifications'},
+        ),
+        migrations.AlterModelOptions(
+            name='reply',
+            options={'ordering': ['created_at', 'id'], 'verbose_name': 'Reply', 'verbose_name_plural': 'Replies'},
+        ),
+        migrations.AlterModelOptions(
+            name='supportticket',
+            options={'ordering': ['-created_at', 'id'], 'verbose_name': 'Support Ticket', 'verbose_name_plural': 'Support Tickets'},
+        ),
+        migrations.AlterField(
+            model_name='activitylog',
+            name='user_agent',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='UserActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('activity_type', models.CharField(choices=[('login', 'User Login'), ('login_success', 'Successful Login'), ('login_failed', 'Failed Login'), ('logout', 'User Logout'), ('profile_update', 'Profile Update'), ('password_change', 'Password Change'), ('email_verification', 'Email Verification'), ('password_reset', 'Password Reset')], max_length=30)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('user_agent', models.TextField(blank=True, null=True)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activities', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Activity',
+                'verbose_name_plural': 'User Activities',
+                'ordering': ['-created_at', 'id'],
+                'indexes': [models.Index(fields=['user', 'created_at'], name='core_userac_user_id_b9a062_idx'), models.Index(fields=['activity_type', 'created_at'], name='core_userac_activit_470d16_idx')],
+            },
+        ),
+    ]
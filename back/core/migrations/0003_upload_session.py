@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-19 02:15
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_sync_model_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('purpose', models.CharField(choices=[('assignment_submission', 'Assignment Submission'), ('lesson_attachment', 'Lesson Attachment'), ('media_content', 'Media Content')], max_length=30)),
+                ('target_uuid', models.UUIDField(blank=True, help_text='Assignment, lesson or course the file belongs to', null=True)),
+                ('filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('total_size', models.PositiveBigIntegerField(verbose_name='Total Size (bytes)')),
+                ('offset', models.PositiveBigIntegerField(default=0, verbose_name='Bytes Received')),
+                ('status', models.CharField(choices=[('active', 'Active'), ('completed', 'Completed'), ('aborted', 'Aborted')], default='active', max_length=20)),
+                ('checksum', models.CharField(blank=True, help_text='SHA-256 of the assembled file', max_length=64)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Upload Session',
+                'verbose_name_plural': 'Upload Sessions',
+                'ordering': ['-created_at', 'id'],
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='core_upload_status_ee95ef_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-19 02:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_notification_retention_indexes'),
+        ('courses', '0007_certificate_verification_url_length'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'id'], name='core_notifi_recipie_33f8d8_idx'),
+        ),
+    ]
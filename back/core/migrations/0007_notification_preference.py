@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-19 02:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_outbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationPreference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(choices=[('enrollment', 'New Enrollment'), ('course_update', 'Course Update'), ('lesson_available', 'New Lesson Available'), ('assignment_due', 'Assignment Due'), ('quiz_result', 'Quiz Result'), ('certificate_ready', 'Certificate Ready'), ('forum_reply', 'Forum Reply'), ('announcement', 'Announcement'), ('system', 'System Notification')], max_length=30)),
+                ('in_app', models.BooleanField(default=True, help_text='Store the notification in the inbox')),
+                ('websocket', models.BooleanField(default=True, help_text='Push it live to open sessions')),
+                ('email', models.BooleanField(default=True, help_text='Send an immediate email where one exists')),
+                ('digest', models.BooleanField(default=True, help_text='Include it in digest emails')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_preferences', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Notification Preference',
+                'verbose_name_plural': 'Notification Preferences',
+                'unique_together': {('user', 'notification_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2 on 2026-10-19 02:44
+
+import django.db.models.deletion
+from collections import Counter
+from datetime import timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_activity(apps, schema_editor):
+    """Roll existing ActivityLog rows up by each user's local day, one grouped query per time zone"""
+    ActivityLog = apps.get_model('core', 'ActivityLog')
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    DailyUserActivity = apps.get_model('core', 'DailyUserActivity')
+
+    groups = [(None, ActivityLog.objects.filter(user__profile__isnull=True))]
+    for name in UserProfile.objects.values_list('time_zone', flat=True).distinct():
+        groups.append((name, ActivityLog.objects.filter(user__profile__time_zone=name)))
+
+    totals = {}
+    for name, logs in groups:
+        try:
+            zone = ZoneInfo(name or 'UTC')
+        except (ZoneInfoNotFoundError, ValueError):
+            zone = dt_timezone.utc
+        rows = logs.annotate(day=TruncDate('created_at', tzinfo=zone)).values(
+            'user_id', 'day', 'activity_type'
+        ).annotate(n=Count('id')).order_by()
+        for row in rows:
+            totals.setdefault((row['user_id'], row['day']), Counter())[row['activity_type']] += row['n']
+
+    DailyUserActivity.objects.bulk_create([
+        DailyUserActivity(user_id=user_id, date=day, events=sum(counts.values()), event_counts=dict(counts))
+        for (user_id, day), counts in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_activity_ingestion'),
+        ('accounts', '0002_profile_digest_frequency'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyUserActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text="Day in the user's time zone")),
+                ('events', models.PositiveIntegerField(default=0)),
+                ('event_counts', models.JSONField(blank=True, default=dict, help_text='Events per activity type')),
+                ('seconds_studied', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Daily User Activity',
+                'verbose_name_plural': 'Daily User Activity',
+                'ordering': ['-date', 'id'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_activity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-19 02:47
+
+from django.db import migrations, models
+
+
+def partition_activity_tables(apps, schema_editor):
+    """Monthly partitions exist on PostgreSQL only; other databases keep plain tables"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    from core.partitions import partition_table
+
+    for name in ['ActivityLog', 'UserActivity']:
+        partition_table(schema_editor, apps.get_model('core', name))
+
+
+class Migration(migrations.Migration):
+    # partition_table builds indexes concurrently and commits its own swap
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_daily_user_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=63)),
+                ('month', models.DateField()),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('path', models.CharField(max_length=500)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Activity Archive',
+                'verbose_name_plural': 'Activity Archives',
+                'ordering': ['-month', 'table'],
+                'unique_together': {('table', 'month')},
+            },
+        ),
+        migrations.RunPython(partition_activity_tables, migrations.RunPython.noop),
+    ]
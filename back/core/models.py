@@ -1,8 +1,9 @@
 # back/core/models.py - Fixed imports
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import FileExtensionValidator
+from django.utils import timezone
 import uuid
 
 # Fix for JSONField import based on Django version
@@ -146,13 +147,52 @@ class Notification(models.Model):
         ordering = ['-created_at', 'id']  # Add explicit tiebreaker
         indexes = [
             models.Index(fields=['recipient', 'is_read']),
+            models.Index(fields=['recipient', 'id']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['expires_at']),
+            models.Index(fields=['notification_type', 'is_read', 'created_at']),
         ]
 
 
     def __str__(self):
         return f"{self.notification_type} - {self.recipient.email} - {self.title}"
 
+class NotificationPreference(models.Model):
+    """Per-type delivery channels; a missing row means every channel is on"""
+    CHANNELS = ['in_app', 'websocket', 'email', 'digest']
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_preferences')
+    notification_type = models.CharField(max_length=30, choices=Notification.NOTIFICATION_TYPE_CHOICES)
+    
+    in_app = models.BooleanField(default=True, help_text=_('Store the notification in the inbox'))
+    websocket = models.BooleanField(default=True, help_text=_('Push it live to open sessions'))
+    email = models.BooleanField(default=True, help_text=_('Send an immediate email where one exists'))
+    digest = models.BooleanField(default=True, help_text=_('Include it in digest emails'))
+    
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Notification Preference')
+        verbose_name_plural = _('Notification Preferences')
+        unique_together = ['user', 'notification_type']
+
+    def __str__(self):
+        return f"{self.user.email} - {self.notification_type}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        
+        # The send path reads a per-user cached copy
+        from core.notifications import invalidate_preferences
+        transaction.on_commit(lambda: invalidate_preferences(self.user_id))
+
+    def delete(self, *args, **kwargs):
+        user_id = self.user_id
+        result = super().delete(*args, **kwargs)
+        from core.notifications import invalidate_preferences
+        transaction.on_commit(lambda: invalidate_preferences(user_id))
+        return result
+
 # Analytics
 class LearningAnalytics(models.Model):
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
@@ -193,6 +233,24 @@ class LearningAnalytics(models.Model):
     def __str__(self):
         return f"Analytics: {self.user.email} - {self.course.title}"
 
+class ActivityQuerySet(models.QuerySet):
+    """Bounds on created_at let PostgreSQL prune the monthly partitions"""
+
+    def window(self, start=None, end=None):
+        queryset = self
+        if start is not None:
+            queryset = queryset.filter(created_at__gte=start)
+        if end is not None:
+            queryset = queryset.filter(created_at__lt=end)
+        return queryset
+
+    def recent(self, days=None):
+        from datetime import timedelta
+        from django.conf import settings
+        if days is None:
+            days = getattr(settings, 'ACTIVITY_QUERY_WINDOW_DAYS', 90)
+        return self.window(start=timezone.now() - timedelta(days=days))
+
 class ActivityLog(models.Model):
     ACTIVITY_TYPE_CHOICES = [
         ('course_view', _('Course Viewed')),
@@ -223,7 +281,9 @@ class ActivityLog(models.Model):
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(null=True, blank=True) 
     
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = ActivityQuerySet.as_manager()
 
     class Meta:
         verbose_name = _('Activity Log')
@@ -237,6 +297,43 @@ class ActivityLog(models.Model):
     def __str__(self):
         return f"{self.user.email} - {self.activity_type} - {self.created_at}"
 
+class DailyUserActivity(models.Model):
+    """ActivityLog rolled up per user and local calendar day as events are ingested"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_activity')
+    date = models.DateField(help_text=_("Day in the user's time zone"))
+    
+    events = models.PositiveIntegerField(default=0)
+    event_counts = models.JSONField(default=dict, blank=True, help_text=_('Events per activity type'))
+    seconds_studied = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Daily User Activity')
+        verbose_name_plural = _('Daily User Activity')
+        ordering = ['-date', 'id']
+        unique_together = ['user', 'date']
+
+    def __str__(self):
+        return f"{self.user.email} - {self.date}: {self.events}"
+
+class ActivityArchive(models.Model):
+    """A month of activity rows moved out of the database into a compressed export"""
+    table = models.CharField(max_length=63)
+    month = models.DateField()
+    rows = models.PositiveIntegerField(default=0)
+    path = models.CharField(max_length=500)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Activity Archive')
+        verbose_name_plural = _('Activity Archives')
+        ordering = ['-month', 'table']
+        unique_together = ['table', 'month']
+
+    def __str__(self):
+        return f"{self.table} {self.month:%Y-%m} ({self.rows} rows)"
+
 # Content Management
 class MediaContent(models.Model):
     CONTENT_TYPE_CHOICES = [
@@ -410,7 +507,9 @@ class UserActivity(models.Model):
     # Additional data
     metadata = models.JSONField(default=dict, blank=True)
     
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = ActivityQuerySet.as_manager()
 
     class Meta:
         verbose_name = _('User Activity')
@@ -422,4 +521,92 @@ class UserActivity(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.user.email} - {self.activity_type} - {self.created_at}"
\ No newline at end of file
+        return f"{self.user.email} - {self.activity_type} - {self.created_at}"
+
+
+# Resumable Uploads
+class UploadSession(models.Model):
+    PURPOSE_CHOICES = [
+        ('assignment_submission', _('Assignment Submission')),
+        ('lesson_attachment', _('Lesson Attachment')),
+        ('media_content', _('Media Content')),
+    ]
+
+    STATUS_CHOICES = [
+        ('active', _('Active')),
+        ('completed', _('Completed')),
+        ('aborted', _('Aborted')),
+    ]
+
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    
+    purpose = models.CharField(max_length=30, choices=PURPOSE_CHOICES)
+    target_uuid = models.UUIDField(null=True, blank=True, help_text=_('Assignment, lesson or course the file belongs to'))
+    
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    total_size = models.PositiveBigIntegerField(verbose_name=_('Total Size (bytes)'))
+    offset = models.PositiveBigIntegerField(default=0, verbose_name=_('Bytes Received'))
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    checksum = models.CharField(max_length=64, blank=True, help_text=_('SHA-256 of the assembled file'))
+    metadata = models.JSONField(default=dict, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = _('Upload Session')
+        verbose_name_plural = _('Upload Sessions')
+        ordering = ['-created_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.total_size})"
+
+    @property
+    def is_complete(self):
+        return self.offset >= self.total_size
+
+# Outbox
+class OutboxMessage(models.Model):
+    CHANNEL_CHOICES = [
+        ('websocket', _('WebSocket Push')),
+        ('email', _('Email')),
+        ('task', _('Celery Task')),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', _('Pending')),
+        ('delivered', _('Delivered')),
+        ('failed', _('Failed')),
+    ]
+
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES)
+    payload = models.JSONField(default=dict)
+    dedupe_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('Outbox Message')
+        verbose_name_plural = _('Outbox Messages')
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} {self.dedupe_key or self.uuid} ({self.status})"
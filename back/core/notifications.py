@@ -0,0 +1,408 @@
+# back/core/notifications.py
+"""Batched notification delivery: one bulk insert and one push pass per batch."""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from asgiref.sync import async_to_sync
+from collections import Counter
+import asyncio
+import logging
+import uuid
+
+from .utils import channel_layer
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+FAN_OUT_JOB_KEY = 'notification_fan_out_{}'
+FAN_OUT_JOB_TIMEOUT = 60 * 60 * 24
+UNREAD_KEY = 'notification_unread_{}'
+UNREAD_TIMEOUT = 60 * 60 * 24
+PREFERENCES_KEY = 'notification_prefs_{}'
+PREFERENCES_TIMEOUT = 60 * 60
+REPLAY_LIMIT = 500
+REPLAY_FRAME_SIZE = 50
+REPLAY_WITHOUT_CURSOR = 10
+
+
+async def _group_send_all(messages):
+    results = await asyncio.gather(
+        *(channel_layer.group_send(group, message) for group, message in messages),
+        return_exceptions=True
+    )
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        logger.warning(f"Failed to send {len(failures)} WebSocket notifications: {failures[0]}")
+
+
+def notification_payload(notification):
+    """
+    WebSocket representation of a notification. The cursor orders a user's
+    notifications; clients hand back the last one they saw on reconnect.
+    """
+    return {
+        "id": str(notification.uuid),
+        "cursor": str(notification.id),
+        "type": notification.notification_type,
+        "title": notification.title,
+        "message": notification.message,
+        "created_at": notification.created_at.isoformat(),
+    }
+
+
+def _push(notifications, user_uuids):
+    """One event-loop round trip per batch instead of one per notification"""
+    if not channel_layer:
+        return
+
+    messages = [
+        (f"user_{user_uuids[n.recipient_id]}", {
+            "type": "notification.send",
+            "notification": notification_payload(n),
+        }) for n in notifications if n.recipient_id in user_uuids
+    ]
+    if messages:
+        try:
+            async_to_sync(_group_send_all)(messages)
+        except Exception as e:
+            logger.warning(f"Failed to send WebSocket notifications: {e}")
+
+
+def send_bulk_notifications(items, apply_preferences=True):
+    """
+    Create many notifications at once.
+
+    items are dicts with recipient_id, notification_type, title and message, plus
+    optional course_id, lesson_id and action_url. Recipients who muted a type
+    are dropped with one preference query per batch; callers that already
+    filtered in their own query pass apply_preferences=False and may set
+    'push' on each item. Returns the number created.
+    """
+    from core.models import Notification
+
+    User = get_user_model()
+    created = 0
+
+    for start in range(0, len(items), BATCH_SIZE):
+        batch = items[start:start + BATCH_SIZE]
+        if apply_preferences:
+            batch = _apply_preferences(batch)
+        if not batch:
+            continue
+
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                recipient_id=item['recipient_id'],
+                notification_type=item['notification_type'],
+                title=item['title'],
+                message=item['message'],
+                course_id=item.get('course_id'),
+                lesson_id=item.get('lesson_id'),
+                action_url=item.get('action_url', ''),
+            ) for item in batch
+        ])
+
+        user_uuids = dict(
+            User.objects.filter(id__in={n.recipient_id for n in notifications}).values_list('id', 'uuid')
+        )
+        _push([n for n, item in zip(notifications, batch) if item.get('push', True)], user_uuids)
+        adjust_unread_counts(Counter(n.recipient_id for n in notifications), user_uuids)
+        created += len(notifications)
+
+    return created
+
+
+# Preferences
+def user_preferences(user_id):
+    """{notification_type: {channel: enabled}} for the types a user changed, cached per user"""
+    from core.models import NotificationPreference
+
+    key = PREFERENCES_KEY.format(user_id)
+    preferences = cache.get(key)
+    if preferences is None:
+        preferences = {
+            row['notification_type']: {channel: row[channel] for channel in NotificationPreference.CHANNELS}
+            for row in NotificationPreference.objects.filter(user_id=user_id).values(
+                'notification_type', *NotificationPreference.CHANNELS
+            )
+        }
+        cache.set(key, preferences, PREFERENCES_TIMEOUT)
+    return preferences
+
+
+def channel_enabled(user_id, notification_type, channel):
+    return user_preferences(user_id).get(notification_type, {}).get(channel, True)
+
+
+def preference_list(user_id):
+    """Every notification type with its channels, defaults filled in"""
+    from core.models import Notification, NotificationPreference
+
+    preferences = user_preferences(user_id)
+    return [{
+        'notification_type': notification_type,
+        'label': str(label),
+        **{channel: preferences.get(notification_type, {}).get(channel, True) for channel in NotificationPreference.CHANNELS},
+    } for notification_type, label in Notification.NOTIFICATION_TYPE_CHOICES]
+
+
+def update_preferences(user, items):
+    """Save channel settings for the given types; saving drops the cached copy"""
+    from core.models import NotificationPreference
+
+    with transaction.atomic():
+        for item in items:
+            NotificationPreference.objects.update_or_create(
+                user=user, notification_type=item['notification_type'],
+                defaults={channel: item[channel] for channel in NotificationPreference.CHANNELS if channel in item}
+            )
+
+
+def invalidate_preferences(user_id):
+    cache.delete(PREFERENCES_KEY.format(user_id))
+
+
+def muted(channel, user_ref, notification_type):
+    """
+    Exists() over the preference table: true where the user referenced by
+    user_ref turned channel off for notification_type (a value or OuterRef).
+    """
+    from core.models import NotificationPreference
+
+    return Exists(NotificationPreference.objects.filter(
+        user_id=OuterRef(user_ref), notification_type=notification_type, **{channel: False}
+    ))
+
+
+def _apply_preferences(batch):
+    from core.models import NotificationPreference
+
+    muted_rows = NotificationPreference.objects.filter(
+        user_id__in={item['recipient_id'] for item in batch},
+        notification_type__in={item['notification_type'] for item in batch},
+    ).filter(Q(in_app=False) | Q(websocket=False)).values_list('user_id', 'notification_type', 'in_app', 'websocket')
+    if not muted_rows:
+        return batch
+
+    channels = {(user_id, notification_type): (in_app, websocket) for user_id, notification_type, in_app, websocket in muted_rows}
+    kept = []
+    for item in batch:
+        in_app, websocket = channels.get((item['recipient_id'], item['notification_type']), (True, True))
+        if in_app:
+            kept.append({**item, 'push': item.get('push', True) and websocket})
+    return kept
+
+
+# Unread counters
+def unread_count(user_id):
+    """Cached unread count, rebuilt with one COUNT on a miss"""
+    from core.models import Notification
+
+    key = UNREAD_KEY.format(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+        cache.add(key, count, UNREAD_TIMEOUT)
+    return count
+
+
+def _apply_delta(user_id, delta):
+    key = UNREAD_KEY.format(user_id)
+    try:
+        count = cache.incr(key, delta)
+    except ValueError:
+        return unread_count(user_id)  # not cached; the rebuild already includes this change
+    if count < 0:
+        cache.delete(key)
+        return unread_count(user_id)
+    return count
+
+
+def adjust_unread_counts(deltas, user_uuids=None):
+    """
+    Apply {user_id: delta} to the counters once the surrounding transaction
+    commits, then push each new count to the user's notification sockets.
+    """
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    def apply():
+        counts = {user_id: _apply_delta(user_id, delta) for user_id, delta in deltas.items()}
+        _push_unread_counts(counts, user_uuids)
+
+    transaction.on_commit(apply)
+
+
+def _push_unread_counts(counts, user_uuids=None):
+    if not channel_layer:
+        return
+
+    user_uuids = user_uuids or {}
+    missing = [user_id for user_id in counts if user_id not in user_uuids]
+    if missing:
+        user_uuids = {**user_uuids, **dict(
+            get_user_model().objects.filter(id__in=missing).values_list('id', 'uuid')
+        )}
+
+    messages = [
+        (f"user_{user_uuids[user_id]}", {"type": "notification.unread", "unread_count": count})
+        for user_id, count in counts.items() if user_id in user_uuids
+    ]
+    if messages:
+        try:
+            async_to_sync(_group_send_all)(messages)
+        except Exception as e:
+            logger.warning(f"Failed to push unread counts: {e}")
+
+
+def mark_read(user, notification_uuid):
+    """Mark one notification read; returns True if it was unread"""
+    from core.models import Notification
+
+    updated = Notification.objects.filter(
+        uuid=notification_uuid, recipient=user, is_read=False
+    ).update(is_read=True, read_at=timezone.now())
+    adjust_unread_counts({user.id: -updated}, {user.id: user.uuid})
+    return bool(updated)
+
+
+def mark_all_read(user):
+    """Mark every notification of a user read; returns how many changed"""
+    from core.models import Notification
+
+    updated = Notification.objects.filter(
+        recipient=user, is_read=False
+    ).update(is_read=True, read_at=timezone.now())
+    adjust_unread_counts({user.id: -updated}, {user.id: user.uuid})
+    return updated
+
+
+# Reconnect replay
+def parse_cursor(value):
+    try:
+        cursor = int(value)
+    except (TypeError, ValueError):
+        return None
+    return cursor if cursor >= 0 else None
+
+
+def replay_notifications(user_id, cursor=None):
+    """
+    Notifications a reconnecting client missed, oldest first, and whether more
+    than REPLAY_LIMIT were waiting. With a cursor this is one keyset query on
+    (recipient, id); without one it is the latest few unread, as before.
+    """
+    from core.models import Notification
+
+    notifications = Notification.objects.filter(recipient_id=user_id)
+    if cursor is None:
+        latest = list(notifications.filter(is_read=False).order_by('-id')[:REPLAY_WITHOUT_CURSOR])
+        return [notification_payload(n) for n in reversed(latest)], False
+
+    missed = list(notifications.filter(id__gt=cursor).order_by('id')[:REPLAY_LIMIT + 1])
+    return [notification_payload(n) for n in missed[:REPLAY_LIMIT]], len(missed) > REPLAY_LIMIT
+
+
+def replay_frames(notifications, has_more=False):
+    """Split a replay into a few frames; the last carries the resume cursor"""
+    chunks = [
+        notifications[start:start + REPLAY_FRAME_SIZE]
+        for start in range(0, len(notifications), REPLAY_FRAME_SIZE)
+    ] or [[]]
+    for index, chunk in enumerate(chunks):
+        last = index == len(chunks) - 1
+        yield {
+            'type': 'notifications',
+            'replay': True,
+            'notifications': chunk,
+            'cursor': chunk[-1]['cursor'] if chunk else None,
+            'complete': last,
+            'has_more': has_more and last,
+        }
+
+
+# Course-wide fan-out
+def queue_course_notification(course, notification_type, title, message, action_url=''):
+    """Queue a notification to every active student of a course; returns the job id"""
+    from core.tasks import fan_out_course_notification_task
+
+    job_id = uuid.uuid4().hex
+    _set_fan_out_status(job_id, 'queued', course_id=course.id, sent=0)
+    transaction.on_commit(lambda: fan_out_course_notification_task.delay(
+        job_id, course.id, notification_type, title, message, action_url
+    ))
+    return job_id
+
+
+def fan_out_course_notification(job_id, course_id, notification_type, title, message, action_url=''):
+    """
+    Stream enrolled students and deliver in BATCH_SIZE chunks. Students who
+    muted the type are excluded, and live pushes decided, in the same query.
+
+    Each chunk is one bulk insert, and progress (the last enrollment id
+    delivered) is recorded right after it, so a retried job resumes where it
+    stopped. Delivery is at least once: a worker that dies between an insert
+    and its progress write re-sends that one chunk on retry.
+    """
+    from courses.models import Enrollment
+
+    status = get_fan_out_status(job_id) or {}
+    sent = status.get('sent', 0)
+    last_id = status.get('last_enrollment_id', 0)
+
+    enrollments = Enrollment.objects.filter(
+        course_id=course_id, is_active=True, id__gt=last_id
+    ).exclude(
+        muted('in_app', 'student_id', notification_type)
+    ).annotate(
+        push=~muted('websocket', 'student_id', notification_type)
+    ).order_by('id').values_list('id', 'student_id', 'push')
+
+    batch = []
+    _set_fan_out_status(job_id, 'running', course_id=course_id, sent=sent, last_enrollment_id=last_id)
+    for row in enrollments.iterator(chunk_size=BATCH_SIZE):
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            sent += _send_to(batch, notification_type, title, message, course_id, action_url)
+            _set_fan_out_status(job_id, 'running', course_id=course_id, sent=sent, last_enrollment_id=batch[-1][0])
+            batch = []
+    if batch:
+        sent += _send_to(batch, notification_type, title, message, course_id, action_url)
+        last_id = batch[-1][0]
+
+    _set_fan_out_status(job_id, 'completed', course_id=course_id, sent=sent, last_enrollment_id=last_id)
+    return sent
+
+
+def _send_to(enrollments, notification_type, title, message, course_id, action_url):
+    return send_bulk_notifications([{
+        'recipient_id': student_id,
+        'notification_type': notification_type,
+        'title': title,
+        'message': message,
+        'course_id': course_id,
+        'action_url': action_url,
+        'push': push,
+    } for _, student_id, push in enrollments], apply_preferences=False)
+
+
+def _set_fan_out_status(job_id, status, **extra):
+    cache.set(
+        FAN_OUT_JOB_KEY.format(job_id),
+        {'id': job_id, 'status': status, 'updated_at': timezone.now().isoformat(), **extra},
+        FAN_OUT_JOB_TIMEOUT
+    )
+
+
+def get_fan_out_status(job_id):
+    return cache.get(FAN_OUT_JOB_KEY.format(job_id))
+
+
+def mark_fan_out_failed(job_id, error):
+    """Final status once retries are exhausted, keeping the progress already made"""
+    status = get_fan_out_status(job_id) or {}
+    progress = {key: value for key, value in status.items() if key not in ('id', 'status', 'updated_at')}
+    _set_fan_out_status(job_id, 'failed', **progress, error=error)
@@ -0,0 +1,210 @@
+# back/core/outbox.py
+"""
+Transactional outbox for side effects.
+
+Producers write an OutboxMessage in the same transaction as the domain change,
+so a rolled-back request leaves nothing behind. A relay drains pending
+messages in batches to their channel: WebSocket pushes, email and Celery
+tasks. Delivery is at least once; a message is marked
+delivered only after its channel accepted it, and failures are retried with
+backoff. dedupe_key stops the same side effect from being queued twice, and
+is passed on (as the Celery task id, or the notification id in pushes) so
+consumers can drop redeliveries.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from asgiref.sync import async_to_sync
+from datetime import timedelta
+import asyncio
+import logging
+
+from .utils import acquire_lock, channel_layer, release_lock
+
+logger = logging.getLogger(__name__)
+
+RELAY_LOCK_KEY = 'outbox_relay_lock'
+RELAY_LOCK_SECONDS = 60 * 5
+KICK_KEY = 'outbox_relay_kick'
+KICK_SECONDS = 2
+BACKOFF_SECONDS = 15
+
+
+def enqueue(channel, payload, dedupe_key=None):
+    """
+    Record a side effect in the current transaction and wake the relay once
+    it commits. Returns the message, or None if dedupe_key was already queued.
+    """
+    from core.models import OutboxMessage
+
+    try:
+        with transaction.atomic():
+            message = OutboxMessage.objects.create(channel=channel, payload=payload, dedupe_key=dedupe_key)
+    except IntegrityError:
+        if dedupe_key is None:
+            raise
+        logger.info(f"Outbox message {dedupe_key} already queued")
+        return None
+
+    transaction.on_commit(kick_relay)
+    return message
+
+
+def enqueue_push(group, message, dedupe_key=None):
+    return enqueue('websocket', {'group': group, 'message': message}, dedupe_key)
+
+
+def enqueue_email(to_email, subject, template_name, context, action_type='default', dedupe_key=None):
+    return enqueue('email', {
+        'to_email': to_email,
+        'subject': subject,
+        'template_name': template_name,
+        'context': context,
+        'action_type': action_type,
+    }, dedupe_key)
+
+
+def enqueue_task(name, args=None, kwargs=None, dedupe_key=None):
+    return enqueue('task', {'task': name, 'args': args or [], 'kwargs': kwargs or {}}, dedupe_key)
+
+
+def kick_relay():
+    """Start a relay run soon, coalescing kicks from a burst of commits"""
+    from core.tasks import relay_outbox
+
+    if cache.add(KICK_KEY, True, KICK_SECONDS):
+        try:
+            relay_outbox.delay()
+        except Exception as e:
+            logger.warning(f"Could not queue outbox relay, the periodic run will pick it up: {e}")
+
+
+# Channel handlers: each takes a list of messages and returns {message_id: error} for failures
+async def _group_send_each(messages):
+    results = await asyncio.gather(
+        *(channel_layer.group_send(m.payload['group'], m.payload['message']) for m in messages),
+        return_exceptions=True
+    )
+    return {m.id: str(r) for m, r in zip(messages, results) if isinstance(r, Exception)}
+
+
+def _deliver_websocket(messages):
+    if not channel_layer:
+        return {}  # nothing is listening; dropping is the same as delivering
+    return async_to_sync(_group_send_each)(messages)
+
+
+def _deliver_email(messages):
+    from accounts.utils import send_email
+
+    failed = {}
+    for message in messages:
+        try:
+            send_email(**message.payload, check_limits=False, fail_silently=False)
+        except Exception as e:
+            failed[message.id] = str(e)
+    return failed
+
+
+def _deliver_task(messages):
+    failed = {}
+    for message in messages:
+        payload = message.payload
+        try:
+            import_string(payload['task']).apply_async(
+                args=payload['args'], kwargs=payload['kwargs'], task_id=message.dedupe_key or str(message.uuid)
+            )
+        except Exception as e:
+            failed[message.id] = str(e)
+    return failed
+
+
+HANDLERS = {
+    'websocket': _deliver_websocket,
+    'email': _deliver_email,
+    'task': _deliver_task,
+}
+
+
+def _deliver(messages):
+    failed = {}
+    by_channel = {}
+    for message in messages:
+        by_channel.setdefault(message.channel, []).append(message)
+
+    for channel, group in by_channel.items():
+        handler = HANDLERS.get(channel)
+        if handler is None:
+            failed.update({m.id: f"Unknown outbox channel {channel}" for m in group})
+            continue
+        try:
+            failed.update(handler(group))
+        except Exception as e:
+            failed.update({m.id: str(e) for m in group})
+    return failed
+
+
+def _record(messages, failed, now):
+    from core.models import OutboxMessage
+
+    for message in messages:
+        if message.id in failed:
+            message.attempts += 1
+            message.last_error = failed[message.id][:1000]
+            if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                message.status = 'failed'
+                logger.error(f"Outbox message {message.uuid} ({message.channel}) gave up: {message.last_error}")
+            else:
+                message.available_at = now + timedelta(seconds=BACKOFF_SECONDS * 2 ** message.attempts)
+        else:
+            message.status = 'delivered'
+            message.delivered_at = now
+
+    OutboxMessage.objects.bulk_update(
+        messages, ['status', 'attempts', 'last_error', 'available_at', 'delivered_at']
+    )
+
+
+def relay(batch_size=None, max_batches=None):
+    """Drain due messages in id order, one batch at a time; returns the number delivered"""
+    from core.models import OutboxMessage
+
+    token = acquire_lock(RELAY_LOCK_KEY, RELAY_LOCK_SECONDS)
+    if token is None:
+        return 0
+
+    try:
+        batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        delivered = 0
+        last_id = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            now = timezone.now()
+            messages = list(OutboxMessage.objects.filter(
+                status='pending', available_at__lte=now, id__gt=last_id
+            ).order_by('id')[:batch_size])
+            if not messages:
+                break
+
+            failed = _deliver(messages)
+            _record(messages, failed, now)
+            delivered += len(messages) - len(failed)
+            last_id = messages[-1].id
+            batches += 1
+
+        if delivered:
+            logger.info(f"Outbox relay delivered {delivered} messages")
+        return delivered
+    finally:
+        release_lock(RELAY_LOCK_KEY, token)
+
+
+def purge_delivered(days=None):
+    """Drop delivered messages once they are past the dedupe window"""
+    from core.models import OutboxMessage
+
+    cutoff = timezone.now() - timedelta(days=days or settings.OUTBOX_RETENTION_DAYS)
+    deleted, _ = OutboxMessage.objects.filter(status='delivered', delivered_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,337 @@
+# back/core/partitions.py
+"""
+Monthly partitions for the append-only activity tables.
+
+On PostgreSQL ActivityLog and UserActivity are range-partitioned by
+created_at, one partition per month plus a default. Partitions are created
+ACTIVITY_PARTITIONS_AHEAD months in advance, and once a month falls out of
+the hot tier (ACTIVITY_HOT_MONTHS) its partition is detached, exported to a
+gzipped JSONL file in ACTIVITY_ARCHIVE_DIR and dropped. Other databases keep
+a plain table and simulate the same tiers: an expired month is exported and
+deleted in id-ordered chunks. Either way the export is recorded as an
+ActivityArchive.
+
+The table that existed before partitioning is not copied: it becomes one
+partition holding every row before the first monthly partition, and is
+archived month by month and dropped once all of it is cold.
+
+Queries are pruned when they bound created_at; ActivityQuerySet.window()
+and recent() do that for callers that ask for a range.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+from datetime import date, datetime, time, timezone as dt_timezone
+import gzip
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_MODELS = ['core.ActivityLog', 'core.UserActivity']
+PARTITION_KEY = 'created_at'
+EXPORT_CHUNK_SIZE = 2000
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bounds(month):
+    """[start, end) of a month as aware UTC datetimes"""
+    start = datetime.combine(month, time.min, tzinfo=dt_timezone.utc)
+    end = datetime.combine(add_months(month, 1), time.min, tzinfo=dt_timezone.utc)
+    return start, end
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y%m}"
+
+
+def legacy_partition_name(table, end):
+    """The pre-partitioning table, holding every row before month end"""
+    return f"{table}_to{end:%Y%m}"
+
+
+def hot_cutoff(now=None):
+    """First month still kept in the database"""
+    return add_months(month_start(now or timezone.now()), -settings.ACTIVITY_HOT_MONTHS)
+
+
+def is_native(conn=None):
+    return (conn or connection).vendor == 'postgresql'
+
+
+# PostgreSQL
+def partition_table(schema_editor, model, months_ahead=None):
+    """
+    Turn a plain table into a monthly range-partitioned one by attaching it
+    as the partition of everything before the month after next. The primary
+    key and the uuid unique constraint gain created_at, as PostgreSQL
+    requires of every unique index on a partitioned table.
+
+    Must run outside a transaction. The full scans, validating the bound as
+    a CHECK constraint and building the new unique indexes concurrently,
+    take no lock that blocks writes; the swap that follows only changes the
+    catalog, and the table's existing indexes and foreign keys are adopted
+    by the parent's rather than rebuilt.
+    """
+    table = model._meta.db_table
+    qn = schema_editor.quote_name
+    months_ahead = settings.ACTIVITY_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+    # Writes keep landing in the old table until the swap, so its bound leaves a month of slack
+    first = add_months(month_start(timezone.now()), 2)
+    legacy = legacy_partition_name(table, first)
+    bound, _ = month_bounds(first)
+    check = f"{legacy}_bound"
+    pk_index, uuid_index = f"{legacy}_pkey", f"{legacy}_uuid_uniq"
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [table])
+        row = cursor.fetchone()
+        if row and row[0] == 'p':
+            return
+
+        # Prepared while the table still takes writes
+        cursor.execute(f"ALTER TABLE {qn(table)} DROP CONSTRAINT IF EXISTS {qn(check)}")
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(check)} CHECK ({qn(PARTITION_KEY)} < %s) NOT VALID", [bound]
+        )
+        cursor.execute(f"ALTER TABLE {qn(table)} VALIDATE CONSTRAINT {qn(check)}")
+        for index, columns in [(pk_index, 'id'), (uuid_index, 'uuid')]:
+            # A build interrupted by an earlier run leaves an invalid index behind
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {qn(index)}")
+            cursor.execute(
+                f"CREATE UNIQUE INDEX CONCURRENTLY {qn(index)} ON {qn(table)} ({qn(columns)}, {qn(PARTITION_KEY)})"
+            )
+
+    with transaction.atomic(using=schema_editor.connection.alias):
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}")
+
+            # Free the names the parent's constraints and indexes are created with
+            cursor.execute(
+                "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype IN ('p', 'u')", [legacy]
+            )
+            for name, in cursor.fetchall():
+                cursor.execute(f"ALTER TABLE {qn(legacy)} DROP CONSTRAINT {qn(name)}")
+            cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s ORDER BY indexname", [legacy])
+            for position, (name,) in enumerate(cursor.fetchall()):
+                if name not in (pk_index, uuid_index):
+                    cursor.execute(f"ALTER INDEX {qn(name)} RENAME TO {qn(f'{legacy}_idx{position}')}")
+            cursor.execute(f"ALTER TABLE {qn(legacy)} ADD CONSTRAINT {qn(pk_index)} PRIMARY KEY USING INDEX {qn(pk_index)}")
+            cursor.execute(f"ALTER TABLE {qn(legacy)} ADD CONSTRAINT {qn(uuid_index)} UNIQUE USING INDEX {qn(uuid_index)}")
+
+            cursor.execute(
+                f"CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS INCLUDING IDENTITY) "
+                f"PARTITION BY RANGE ({qn(PARTITION_KEY)})"
+            )
+            cursor.execute(f"ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, {qn(PARTITION_KEY)})")
+            cursor.execute(
+                f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + '_uuid_month_uniq')} UNIQUE (uuid, {qn(PARTITION_KEY)})"
+            )
+            # The parent's identity now numbers every insert
+            cursor.execute(f"ALTER TABLE {qn(legacy)} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+            # The validated CHECK proves the bound, so attaching skips the scan
+            cursor.execute(
+                f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(legacy)} FOR VALUES FROM (MINVALUE) TO (%s)", [bound]
+            )
+            cursor.execute(f"ALTER TABLE {qn(legacy)} DROP CONSTRAINT {qn(check)}")
+
+            month, last = first, add_months(month_start(timezone.now()), months_ahead)
+            while month <= last:
+                _create_partition(cursor, table, month)
+                month = add_months(month, 1)
+            cursor.execute(f"CREATE TABLE {qn(table + '_default')} PARTITION OF {qn(table)} DEFAULT")
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 1)) FROM {qn(table)}", [table]
+            )
+
+        # Declared on the parent, these cascade to every partition; the old table's matching ones are attached
+        for field in model._meta.local_fields:
+            if field.remote_field and field.db_constraint:
+                schema_editor.execute(schema_editor._create_fk_sql(model, field, '_fk_%(to_table)s_%(to_column)s'))
+            if field.db_index and not field.unique:
+                schema_editor.execute(schema_editor._create_index_sql(model, fields=[field]))
+        for index in model._meta.indexes:
+            schema_editor.add_index(model, index)
+
+
+def _create_partition(cursor, table, month):
+    qn = connection.ops.quote_name
+    start, end = month_bounds(month)
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {qn(partition_name(table, month))} PARTITION OF {qn(table)} "
+        f"FOR VALUES FROM (%s) TO (%s)", [start, end]
+    )
+
+
+def _partitions(cursor, table, prefix='p'):
+    """{month: attached} for every monthly partition table that still exists"""
+    cursor.execute("""
+        SELECT c.relname, i.inhparent IS NOT NULL
+        FROM pg_class c
+        LEFT JOIN pg_inherits i ON i.inhrelid = c.oid AND i.inhparent = %s::regclass
+        WHERE c.relkind = 'r' AND c.relname LIKE %s
+    """, [table, f"{table}_{prefix}%"])
+    found = {}
+    for name, attached in cursor.fetchall():
+        suffix = name[len(table) + len(prefix) + 1:]
+        if len(suffix) == 6 and suffix.isdigit():
+            found[date(int(suffix[:4]), int(suffix[4:]), 1)] = attached
+    return found
+
+
+def _legacy_partition(cursor, table):
+    """(end month, attached) of the pre-partitioning table, or None once it is archived"""
+    return next(iter(_partitions(cursor, table, prefix='to').items()), None)
+
+
+def ensure_partitions(months_ahead=None):
+    """Create next months' partitions before rows arrive for them"""
+    if not is_native():
+        return 0
+
+    months_ahead = settings.ACTIVITY_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+    current = month_start(timezone.now())
+    created = 0
+    for label in PARTITIONED_MODELS:
+        table = apps.get_model(label)._meta.db_table
+        with connection.cursor() as cursor:
+            existing = _partitions(cursor, table)
+            legacy = _legacy_partition(cursor, table)
+            for offset in range(months_ahead + 1):
+                month = add_months(current, offset)
+                if month in existing or (legacy and month < legacy[0]):
+                    continue
+                try:
+                    with transaction.atomic():
+                        _create_partition(cursor, table, month)
+                    created += 1
+                except DatabaseError as e:
+                    # Rows for this month already landed in the default partition
+                    logger.error(f"Could not create partition {partition_name(table, month)}: {e}")
+    return created
+
+
+# Export
+def _export(cursor, query, params, path):
+    """Stream a query's rows to gzipped JSONL; returns the row count"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cursor.execute(query, params)
+    columns = [column[0] for column in cursor.description]
+    count = 0
+    with gzip.open(path, 'wt', encoding='utf-8') as out:
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not rows:
+                return count
+            for row in rows:
+                out.write(json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n')
+            count += len(rows)
+
+
+def _archive_path(table, month):
+    return os.path.join(settings.ACTIVITY_ARCHIVE_DIR, f"{table}-{month:%Y-%m}.jsonl.gz")
+
+
+def _archive_native(model, cutoff):
+    table = model._meta.db_table
+    qn = connection.ops.quote_name
+    archived = []
+    with connection.cursor() as cursor:
+        legacy = _legacy_partition(cursor, table)
+        if legacy and legacy[0] <= cutoff:
+            archived += _archive_legacy(cursor, table, *legacy)
+        for month, attached in sorted(_partitions(cursor, table).items()):
+            if month >= cutoff:
+                continue
+            name = partition_name(table, month)
+            if attached:
+                cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}")
+            path = _archive_path(table, month)
+            rows = _export(cursor, f"SELECT * FROM {qn(name)} ORDER BY id", [], path)
+            _record(table, month, rows, path)
+            cursor.execute(f"DROP TABLE {qn(name)}")
+            archived.append((month, rows))
+    return archived
+
+
+def _archive_legacy(cursor, table, end, attached):
+    """Export the pre-partitioning table one month per file, then drop it"""
+    qn = connection.ops.quote_name
+    name = legacy_partition_name(table, end)
+    if attached:
+        cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}")
+    cursor.execute(f"SELECT MIN({qn(PARTITION_KEY)}) FROM {qn(name)}")
+    oldest = cursor.fetchone()[0]
+    archived = []
+    month = month_start(oldest) if oldest else end
+    while month < end:
+        start, stop = month_bounds(month)
+        in_month = f"FROM {qn(name)} WHERE {qn(PARTITION_KEY)} >= %s AND {qn(PARTITION_KEY)} < %s"
+        cursor.execute(f"SELECT EXISTS (SELECT 1 {in_month})", [start, stop])
+        if cursor.fetchone()[0]:
+            path = _archive_path(table, month)
+            rows = _export(cursor, f"SELECT * {in_month} ORDER BY id", [start, stop], path)
+            _record(table, month, rows, path)
+            archived.append((month, rows))
+        month = add_months(month, 1)
+    cursor.execute(f"DROP TABLE {qn(name)}")
+    return archived
+
+
+def _archive_simulated(model, cutoff):
+    table = model._meta.db_table
+    qn = connection.ops.quote_name
+    oldest = model.objects.order_by(PARTITION_KEY).values_list(PARTITION_KEY, flat=True).first()
+    archived = []
+    month = month_start(oldest) if oldest else cutoff
+    while month < cutoff:
+        start, end = month_bounds(month)
+        rows_in_month = model.objects.filter(created_at__gte=start, created_at__lt=end)
+        if rows_in_month.exists():
+            path = _archive_path(table, month)
+            with connection.cursor() as cursor:
+                rows = _export(
+                    cursor,
+                    f"SELECT * FROM {qn(table)} WHERE {qn(PARTITION_KEY)} >= %s AND {qn(PARTITION_KEY)} < %s ORDER BY id",
+                    [connection.ops.adapt_datetimefield_value(start), connection.ops.adapt_datetimefield_value(end)],
+                    path
+                )
+            _record(table, month, rows, path)
+            while True:
+                ids = list(rows_in_month.order_by('id').values_list('id', flat=True)[:EXPORT_CHUNK_SIZE])
+                if not ids:
+                    break
+                model.objects.filter(id__in=ids).delete()
+            archived.append((month, rows))
+        month = add_months(month, 1)
+    return archived
+
+
+def _record(table, month, rows, path):
+    from core.models import ActivityArchive
+
+    ActivityArchive.objects.update_or_create(table=table, month=month, defaults={'rows': rows, 'path': path})
+
+
+def archive_cold_partitions(now=None):
+    """Move every month older than the hot tier out of the database; returns {table: rows archived}"""
+    cutoff = hot_cutoff(now)
+    report = {}
+    for label in PARTITIONED_MODELS:
+        model = apps.get_model(label)
+        archived = _archive_native(model, cutoff) if is_native() else _archive_simulated(model, cutoff)
+        if archived:
+            report[model._meta.db_table] = sum(rows for _, rows in archived)
+            logger.info(f"Archived {model._meta.db_table} months {[f'{m:%Y-%m}' for m, _ in archived]}")
+    return report
@@ -0,0 +1,150 @@
+# back/core/retention.py
+"""
+Notification retention.
+
+Expired notifications, and read ones older than their type's retention
+window, are deleted in small id-ordered chunks so no single statement holds
+locks on a large range. Each chunk can be appended to a gzipped JSONL archive
+before it is removed.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from collections import Counter
+from datetime import timedelta
+import gzip
+import json
+import logging
+import os
+import time
+
+from .notifications import adjust_unread_counts
+from .utils import acquire_lock, release_lock
+
+logger = logging.getLogger(__name__)
+
+PURGE_LOCK_KEY = 'notification_purge_lock'
+PURGE_LOCK_SECONDS = 60 * 60
+LAST_RUN_KEY = 'notification_purge_last_run'
+ARCHIVE_FIELDS = [
+    'id', 'uuid', 'recipient_id', 'notification_type', 'title', 'message',
+    'course_id', 'lesson_id', 'discussion_id', 'action_url', 'is_read', 'read_at',
+    'email_sent', 'email_sent_at', 'created_at', 'expires_at',
+]
+
+
+def retention_days(notification_type):
+    """Days a read notification of this type is kept; None keeps it forever"""
+    policy = getattr(settings, 'NOTIFICATION_RETENTION', {})
+    return policy.get(notification_type, policy.get('default'))
+
+
+def purge_querysets(now):
+    """(label, queryset) pairs for everything that is due for deletion"""
+    from core.models import Notification
+
+    yield 'expired', Notification.objects.filter(expires_at__lt=now)
+
+    for notification_type, _ in Notification.NOTIFICATION_TYPE_CHOICES:
+        days = retention_days(notification_type)
+        if days is None:
+            continue
+        yield notification_type, Notification.objects.filter(
+            notification_type=notification_type,
+            is_read=True,
+            created_at__lt=now - timedelta(days=days),
+        )
+
+
+class _Archive:
+    """Lazily opened gzipped JSONL file, one per purge run"""
+
+    def __init__(self, directory, now):
+        self.path = os.path.join(directory, f"notifications-{now:%Y%m%d-%H%M%S}.jsonl.gz")
+        self._file = None
+
+    def write(self, rows):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = gzip.open(self.path, 'at', encoding='utf-8')
+        for row in rows:
+            self._file.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def _purge_chunks(queryset, batch_size, archive=None):
+    """Delete queryset in id-ordered chunks; returns the number of rows removed"""
+    from core.models import Notification
+
+    fields = ARCHIVE_FIELDS if archive else ['id', 'recipient_id', 'is_read']
+    purged = 0
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by('id').values(*fields)[:batch_size])
+        if not rows:
+            return purged
+
+        if archive:
+            archive.write(rows)
+
+        ids = [row['id'] for row in rows]
+        with transaction.atomic():
+            deleted, _ = Notification.objects.filter(id__in=ids).delete()
+            unread = Counter(row['recipient_id'] for row in rows if not row['is_read'])
+            adjust_unread_counts({user_id: -count for user_id, count in unread.items()})
+
+        purged += deleted
+        last_id = ids[-1]
+        if len(rows) < batch_size:
+            return purged
+
+
+def purge_notifications(now=None, archive_dir=None, batch_size=None):
+    """
+    One retention run. Returns, and caches under LAST_RUN_KEY, the number of
+    rows purged in total and per label ('expired' or a notification type).
+    """
+    token = acquire_lock(PURGE_LOCK_KEY, PURGE_LOCK_SECONDS)
+    if token is None:
+        logger.info("Notification purge already running")
+        return None
+
+    try:
+        now = now or timezone.now()
+        batch_size = batch_size or settings.NOTIFICATION_PURGE_BATCH_SIZE
+        archive_dir = archive_dir if archive_dir is not None else settings.NOTIFICATION_ARCHIVE_DIR
+        archive = _Archive(archive_dir, now) if archive_dir else None
+        started = time.monotonic()
+
+        by_label = {}
+        try:
+            for label, queryset in purge_querysets(now):
+                purged = _purge_chunks(queryset, batch_size, archive)
+                if purged:
+                    by_label[label] = purged
+        finally:
+            if archive:
+                archive.close()
+
+        stats = {
+            'purged': sum(by_label.values()),
+            'by_label': by_label,
+            'seconds': round(time.monotonic() - started, 3),
+            'archive': archive.path if archive and archive._file else None,
+            'finished_at': timezone.now().isoformat(),
+        }
+        cache.set(LAST_RUN_KEY, stats, None)
+        logger.info(f"Purged {stats['purged']} notifications in {stats['seconds']}s: {by_label}")
+        return stats
+    finally:
+        release_lock(PURGE_LOCK_KEY, token)
+
+
+def last_purge_stats():
+    return cache.get(LAST_RUN_KEY)
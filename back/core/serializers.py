@@ -3,8 +3,8 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
 from .models import (
-    Forum, Discussion, Reply, Notification, LearningAnalytics,
-    ActivityLog, MediaContent, Announcement, SupportTicket
+    Forum, Discussion, Reply, Notification, NotificationPreference, LearningAnalytics,
+    ActivityLog, MediaContent, Announcement, SupportTicket, UploadSession
 )
 
 User = get_user_model()
@@ -101,6 +101,12 @@ class NotificationSerializer(serializers.ModelSerializer):
             'email_sent_at': {'read_only': True},
         }
 
+class NotificationPreferenceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = NotificationPreference
+        fields = ['notification_type', 'in_app', 'websocket', 'email', 'digest']
+        extra_kwargs = {channel: {'required': False} for channel in NotificationPreference.CHANNELS}
+
 # Learning Analytics Serializer
 class LearningAnalyticsSerializer(serializers.ModelSerializer):
     # Computed fields
@@ -206,4 +212,28 @@ class SupportTicketSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+# Upload Session Serializers
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = [
+            'uuid', 'purpose', 'target_uuid', 'filename', 'content_type',
+            'total_size', 'offset', 'status', 'checksum', 'created_at', 'expires_at', 'completed_at'
+        ]
+        read_only_fields = fields
+
+class UploadSessionCreateSerializer(serializers.Serializer):
+    purpose = serializers.ChoiceField(choices=UploadSession.PURPOSE_CHOICES)
+    target = serializers.UUIDField(required=False, allow_null=True)
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+    content_type = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    title = serializers.CharField(max_length=200, required=False, allow_blank=True)
+    description = serializers.CharField(required=False, allow_blank=True)
+
+    def validate(self, attrs):
+        if attrs['purpose'] != 'media_content' and not attrs.get('target'):
+            raise serializers.ValidationError({'target': _('This upload purpose requires a target')})
+        return attrs
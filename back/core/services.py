@@ -2,8 +2,9 @@ from django.db.models import Count, Avg, Sum, Q
 from django.utils import timezone
 from datetime import timedelta
 from django.contrib.auth import get_user_model
-from courses.models import Course, Enrollment, LessonProgress, QuizAttempt
+from courses.models import Course, Enrollment, QuizAttempt
 from core.models import ActivityLog, Discussion, SupportTicket
+from core.utils import get_study_streak
 
 User = get_user_model()
 
@@ -76,39 +77,29 @@ class AnalyticsService:
         enrollments = Enrollment.objects.filter(student=user, is_active=True)
         
         # Study streak calculation
-        today = timezone.now().date()
-        streak_days = 0
-        for i in range(30):
-            check_date = today - timedelta(days=i)
-            has_activity = ActivityLog.objects.filter(
-                user=user, created_at__date=check_date
-            ).exists()
-            if has_activity:
-                streak_days += 1
-            else:
-                break
+        streak_days = get_study_streak(user, max_days=30)
         
         # Recent quiz performance
         recent_quizzes = QuizAttempt.objects.filter(
             student=user, completed_at__isnull=False
         ).order_by('-completed_at')[:10]
         
-        # Progress by course
+        # Progress by course, from the incrementally maintained LearningAnalytics
         course_progress = []
-        for enrollment in enrollments.select_related('course'):
-            completed_lessons = LessonProgress.objects.filter(
-                enrollment=enrollment, is_completed=True
-            ).count()
-            total_lessons = enrollment.course.modules.aggregate(
-                total=Count('lessons', filter=Q(lessons__is_published=True))
-            )['total'] or 0
+        for enrollment in enrollments.select_related('course').prefetch_related('analytics').annotate(
+            total_lessons=Count(
+                'course__modules__lessons', filter=Q(course__modules__lessons__is_published=True), distinct=True
+            )
+        ):
+            analytics = next(iter(enrollment.analytics.all()), None)
             
             course_progress.append({
                 'course_title': enrollment.course.title,
                 'course_uuid': str(enrollment.course.uuid),
                 'progress_percentage': enrollment.progress_percentage,
-                'completed_lessons': completed_lessons,
-                'total_lessons': total_lessons,
+                'completed_lessons': analytics.lessons_completed if analytics else 0,
+                'total_lessons': enrollment.total_lessons,
+                'time_spent_seconds': analytics.total_time_spent_seconds if analytics else 0,
                 'last_accessed': enrollment.last_accessed
             })
         
@@ -122,7 +113,7 @@ class AnalyticsService:
                 'avg_quiz_score': float(recent_quizzes.aggregate(avg=Avg('score'))['avg'] or 0)
             },
             'course_progress': course_progress,
-            'recent_activity': list(ActivityLog.objects.filter(
+            'recent_activity': list(ActivityLog.objects.recent().filter(
                 user=user
             ).order_by('-created_at')[:5].values(
                 'activity_type', 'created_at', 'course__title'
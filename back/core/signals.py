@@ -0,0 +1,46 @@
+# back/core/signals.py
+"""Drop cached teacher analytics when the data behind them changes."""
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from courses.models import Course, CourseReview, Enrollment, QuizAttempt
+from core.analytics.teacher import INSTRUCTOR_CACHE_KEY, instructor_of, invalidate
+from core.models import Discussion
+
+
+def _course_id(instance, relation):
+    """Course of a forum or quiz; None once a cascading course delete has removed it"""
+    try:
+        return getattr(instance, relation).course_id
+    except ObjectDoesNotExist:
+        return None
+
+
+def _invalidate_course(course_id):
+    instructor_id = instructor_of(course_id)
+    transaction.on_commit(lambda: invalidate(instructor_id))
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_changed(sender, instance, **kwargs):
+    cache.delete(INSTRUCTOR_CACHE_KEY.format(instance.pk))
+    transaction.on_commit(lambda: invalidate(instance.instructor_id))
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+@receiver([post_save, post_delete], sender=CourseReview)
+def enrollment_or_review_changed(sender, instance, **kwargs):
+    _invalidate_course(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=Discussion)
+def discussion_changed(sender, instance, **kwargs):
+    _invalidate_course(_course_id(instance, 'forum'))
+
+
+@receiver([post_save, post_delete], sender=QuizAttempt)
+def quiz_attempt_changed(sender, instance, **kwargs):
+    _invalidate_course(_course_id(instance, 'quiz'))
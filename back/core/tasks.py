@@ -0,0 +1,122 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def cleanup_expired_upload_sessions():
+    """Abort stale resumable uploads and delete their partial files"""
+    from core.uploads import cleanup_expired_sessions
+
+    try:
+        removed = cleanup_expired_sessions()
+        if removed:
+            logger.info(f"Cleaned up {removed} expired upload sessions")
+        return removed
+    except Exception as e:
+        logger.error(f"Error cleaning up upload sessions: {e}")
+
+@shared_task
+def send_notification_digests():
+    """Email each due user a digest of their unread notifications"""
+    from core.digests import send_digests
+
+    try:
+        return send_digests()
+    except Exception as e:
+        logger.error(f"Error sending notification digests: {e}")
+
+@shared_task
+def flush_activity_buffer():
+    """Bulk insert buffered activity events"""
+    from core.activity import flush
+
+    try:
+        return flush()
+    except Exception as e:
+        logger.error(f"Error flushing activity buffer: {e}")
+
+@shared_task
+def maintain_activity_partitions():
+    """Create upcoming activity partitions and archive months past the hot tier"""
+    from core.partitions import archive_cold_partitions, ensure_partitions
+
+    try:
+        created = ensure_partitions()
+        archived = archive_cold_partitions()
+        return {'created': created, 'archived': archived}
+    except Exception as e:
+        logger.error(f"Error maintaining activity partitions: {e}")
+
+@shared_task
+def reconcile_learning_analytics():
+    """Rebuild LearningAnalytics from the source tables"""
+    from core.learning_analytics import reconcile
+
+    try:
+        return reconcile()
+    except Exception as e:
+        logger.error(f"Error reconciling learning analytics: {e}")
+
+@shared_task
+def relay_outbox():
+    """Deliver pending outbox messages to WebSocket, email and Celery"""
+    from core.outbox import relay
+
+    try:
+        return relay()
+    except Exception as e:
+        logger.error(f"Error relaying outbox: {e}")
+
+@shared_task
+def purge_outbox():
+    """Remove delivered outbox messages past the dedupe window"""
+    from core.outbox import purge_delivered
+
+    try:
+        removed = purge_delivered()
+        if removed:
+            logger.info(f"Purged {removed} delivered outbox messages")
+        return removed
+    except Exception as e:
+        logger.error(f"Error purging outbox: {e}")
+
+@shared_task
+def purge_notifications():
+    """Delete expired and old read notifications per the retention policy"""
+    from core.retention import purge_notifications as purge
+
+    try:
+        stats = purge()
+        return stats and stats['purged']
+    except Exception as e:
+        logger.error(f"Error purging notifications: {e}")
+
+@shared_task
+def send_bulk_notifications_task(items):
+    """Deliver a batch of notifications built by one bulk action"""
+    from core.notifications import send_bulk_notifications
+
+    try:
+        created = send_bulk_notifications(items)
+        logger.info(f"Sent {created} batched notifications")
+        return created
+    except Exception as e:
+        logger.error(f"Error sending batched notifications: {e}")
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def fan_out_course_notification_task(self, job_id, course_id, notification_type, title, message, action_url=''):
+    """Deliver one notification to every active student of a course"""
+    from core.notifications import fan_out_course_notification, mark_fan_out_failed
+
+    try:
+        sent = fan_out_course_notification(job_id, course_id, notification_type, title, message, action_url)
+        logger.info(f"Fan-out {job_id} delivered {sent} notifications for course {course_id}")
+        return sent
+    except Exception as e:
+        logger.error(f"Notification fan-out {job_id} failed: {e}")
+        if self.request.retries >= self.max_retries:
+            mark_fan_out_failed(job_id, str(e))
+            raise
+        raise self.retry(exc=e)
@@ -0,0 +1,46 @@
+# back/core/testing.py
+"""Fixtures shared by the test suites of the core and courses apps."""
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+import uuid
+
+
+def make_user(role='student', **kwargs):
+    from accounts.models import CustomUser
+
+    return CustomUser.objects.create_user(
+        email=f"{uuid.uuid4().hex[:10]}@example.com", password='pass12345678',
+        first_name='Test', last_name='User', role=role, is_verified=True, **kwargs
+    )
+
+
+def make_course(instructor=None, **kwargs):
+    from courses.models import Course
+
+    slug = uuid.uuid4().hex[:10]
+    defaults = {
+        'title': f"Course {slug}", 'slug': slug, 'description': 'd' * 60, 'short_description': 's',
+        'instructor': instructor or make_user('teacher'), 'learning_outcomes': 'x', 'status': 'published',
+    }
+    defaults.update(kwargs)
+    return Course.objects.create(**defaults)
+
+
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+class EnrollmentTestCase(TestCase):
+    """A published course with its teacher and one enrolled student, on a clean cache"""
+
+    def setUp(self):
+        from courses.models import Enrollment
+
+        cache.clear()
+        self.teacher = make_user('teacher')
+        self.course = make_course(self.teacher)
+        self.student = make_user()
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course)
@@ -1,3 +1,655 @@
-from django.test import TestCase
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError, transaction
+from django.test import override_settings
+from django.utils import timezone
+import base64
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from accounts.models import UserProfile
+from courses.models import Course, CourseReview, Enrollment, Lesson, Module, Quiz, QuizAttempt
+from . import activity, digests, notifications, outbox, partitions, retention, tasks, uploads
+from .analytics import teacher
+from .utils import acquire_lock, release_lock
+from .views import ActivityLogListView
+from .testing import EnrollmentTestCase, api_client, make_course, make_user
+from .models import (
+    ActivityArchive, ActivityLog, DailyUserActivity, Discussion, Forum, Notification, NotificationPreference,
+    OutboxMessage, UploadSession
+)
+
+
+# Resumable uploads
+class UploadTests(EnrollmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        settings = override_settings(
+            UPLOAD_SESSION_DIR=os.path.join(self.tmp, 'partial'), MEDIA_ROOT=os.path.join(self.tmp, 'media')
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = api_client(self.teacher)
+
+    def create(self, client=None, **data):
+        return (client or self.client).post('/api/core/uploads/', data, format='json')
+
+    def patch(self, session_uuid, body, offset, **headers):
+        return self.client.generic(
+            'PATCH', f'/api/core/uploads/{session_uuid}/', body,
+            content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset), **headers
+        )
+
+    def test_media_upload_into_course_requires_instructor(self):
+        other_teacher = api_client(make_user('teacher'))
+        data = {'purpose': 'media_content', 'filename': 'clip.mp4', 'size': 10, 'target': str(self.course.uuid)}
+        self.assertEqual(self.create(other_teacher, **data).status_code, 403)
+        self.assertEqual(self.create(**data).status_code, 201)
+
+        session = UploadSession.objects.get(user=self.teacher)
+        session.user = make_user('teacher')
+        session.save()
+        with self.assertRaises(PermissionDenied):
+            uploads._attach_media_content(session, None)
+
+    def test_chunks_append_at_offset_and_finalize(self):
+        module = Module.objects.create(course=self.course, title='Module')
+        lesson = Lesson.objects.create(module=module, title='Lesson', slug='lesson')
+        session_uuid = self.create(
+            purpose='lesson_attachment', filename='notes.txt', size=10, target=str(lesson.uuid)
+        ).json()['data']['uuid']
+
+        self.assertEqual(self.patch(session_uuid, b'hello', 0).status_code, 204)
+        self.assertEqual(self.patch(session_uuid, b'world', 0).status_code, 409)
+
+        bad_checksum = 'sha256 ' + base64.b64encode(hashlib.sha256(b'other').digest()).decode()
+        self.assertEqual(self.patch(session_uuid, b'world', 5, HTTP_UPLOAD_CHECKSUM=bad_checksum).status_code, 460)
+        self.assertEqual(UploadSession.objects.get(uuid=session_uuid).offset, 5)
+
+        good_checksum = 'sha256 ' + base64.b64encode(hashlib.sha256(b'world').digest()).decode()
+        self.assertEqual(self.patch(session_uuid, b'world', 5, HTTP_UPLOAD_CHECKSUM=good_checksum).status_code, 204)
+        self.assertEqual(os.listdir(os.path.join(self.tmp, 'partial')), [f'{session_uuid}.part'])
+
+        response = self.client.post(f'/api/core/uploads/{session_uuid}/finalize/')
+        self.assertEqual(response.status_code, 200)
+        lesson.refresh_from_db()
+        with lesson.file_attachment.open('rb') as attached:
+            self.assertEqual(attached.read(), b'helloworld')
+
+
+# Course-wide notification fan-out
+class FanOutTests(EnrollmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.others = [make_user() for _ in range(2)]
+        for student in self.others:
+            Enrollment.objects.create(student=student, course=self.course)
+
+    def fan_out(self, job_id):
+        return notifications.fan_out_course_notification(job_id, self.course.id, 'course_update', 'Title', 'Message')
+
+    def test_delivers_in_chunks_and_resumes(self):
+        job_id = 'job-resume'
+        first = Enrollment.objects.filter(course=self.course).order_by('id').first()
+        notifications._set_fan_out_status(job_id, 'running', course_id=self.course.id, sent=1, last_enrollment_id=first.id)
+
+        with mock.patch.object(notifications, 'BATCH_SIZE', 1):
+            self.assertEqual(self.fan_out(job_id), 3)
+
+        self.assertFalse(Notification.objects.filter(recipient=first.student).exists())
+        self.assertEqual(Notification.objects.filter(course=self.course).count(), 2)
+        status = notifications.get_fan_out_status(job_id)
+        self.assertEqual((status['status'], status['sent']), ('completed', 3))
+
+    def test_job_fails_once_retries_are_exhausted(self):
+        job_id = notifications.queue_course_notification(self.course, 'course_update', 'Title', 'Message')
+        with mock.patch.object(notifications, 'send_bulk_notifications', side_effect=RuntimeError('db down')):
+            result = tasks.fan_out_course_notification_task.apply(
+                args=[job_id, self.course.id, 'course_update', 'Title', 'Message']
+            )
+        self.assertIsInstance(result.result, RuntimeError)
+        status = notifications.get_fan_out_status(job_id)
+        self.assertEqual((status['status'], status['error'], status['sent']), ('failed', 'db down', 0))
+
+
+# Notification digests
+class DigestTests(EnrollmentTestCase):
+    def notify(self, user, **kwargs):
+        return Notification.objects.create(
+            recipient=user, notification_type='course_update', title='Update', message='Message', **kwargs
+        )
+
+    def test_digests_are_opt_in(self):
+        self.notify(self.student)
+        profile, _ = UserProfile.objects.get_or_create(user=self.student)
+        self.assertEqual(profile.digest_frequency, 'off')
+        self.assertEqual(digests.send_digests(), 0)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_sends_only_what_arrived_since_the_last_digest(self):
+        now = timezone.now()
+        UserProfile.objects.update_or_create(
+            user=self.student, defaults={'digest_frequency': 'daily', 'last_digest_at': now - timedelta(days=2)}
+        )
+        old = self.notify(self.student)
+        Notification.objects.filter(pk=old.pk).update(created_at=now - timedelta(days=3))
+        fresh = self.notify(self.student)
+
+        self.assertEqual(digests.send_digests(now), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.student.email])
+        self.assertIn('1 unread notification', mail.outbox[0].subject)
+        fresh.refresh_from_db()
+        old.refresh_from_db()
+        self.assertTrue(fresh.email_sent)
+        self.assertFalse(old.email_sent)
+
+        # Not due again until a day has passed
+        self.notify(self.student)
+        self.assertEqual(digests.send_digests(now + timedelta(hours=1)), 0)
+        self.assertEqual(digests.send_digests(now + timedelta(days=1, minutes=1)), 1)
+
+    def test_skips_tick_while_another_runs(self):
+        UserProfile.objects.update_or_create(user=self.student, defaults={'digest_frequency': 'daily'})
+        self.notify(self.student)
+        token = digests.acquire_lock(digests.TICK_LOCK_KEY, 60)
+        self.assertEqual(digests.send_digests(), 0)
+        digests.release_lock(digests.TICK_LOCK_KEY, token)
+        self.assertEqual(digests.send_digests(), 1)
+
+
+# Activity buffer
+class ActivityBufferTests(EnrollmentTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(activity.MemoryBuffer, '_ensure_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.buffer = activity.MemoryBuffer()
+        buffer = mock.patch.object(activity, '_buffer', self.buffer)
+        buffer.start()
+        self.addCleanup(buffer.stop)
+
+    def event(self, activity_type='login'):
+        return {
+            'kind': 'activity', 'created_at': timezone.now().isoformat(),
+            'fields': {'user_id': self.student.id, 'activity_type': activity_type, 'metadata': {}},
+        }
+
+    def test_failed_write_keeps_the_batch(self):
+        self.buffer.append(self.event('login'))
+        self.buffer.append(self.event('logout'))
+        with mock.patch.object(ActivityLog.objects, 'bulk_create', side_effect=RuntimeError('db down')):
+            with self.assertRaises(RuntimeError):
+                activity.flush()
+        self.assertEqual(len(self.buffer), 2)
+
+        self.assertEqual(activity.flush(), 2)
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(
+            list(ActivityLog.objects.filter(user=self.student).order_by('created_at').values_list('activity_type', flat=True)),
+            ['login', 'logout']
+        )
+
+    def test_batch_is_dropped_after_max_attempts(self):
+        self.buffer.append(self.event())
+        with mock.patch.object(activity, 'write', side_effect=RuntimeError('bad event')):
+            for _ in range(activity.MAX_ATTEMPTS):
+                with self.assertRaises(RuntimeError):
+                    activity.flush()
+        self.assertEqual(len(self.buffer), 0)
+        self.assertFalse(ActivityLog.objects.exists())
+
+    def test_overflow_failure_does_not_write_the_event_twice(self):
+        with self.settings(ACTIVITY_BUFFER_MAX=1), \
+                mock.patch.object(activity, 'write', side_effect=RuntimeError('db down')) as write:
+            activity._append(self.event())
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(len(self.buffer), 1)
+
+
+    def test_event_for_a_deleted_course_is_dropped_alone(self):
+        gone = make_course(self.teacher)
+        stale = self.event('course_view')
+        stale['fields']['course_id'] = gone.id
+        Course.objects.filter(pk=gone.pk).delete()
+
+        self.assertEqual(activity.write([self.event('login'), stale]), 1)
+        self.assertEqual(list(ActivityLog.objects.values_list('activity_type', flat=True)), ['login'])
+        self.assertEqual(DailyUserActivity.objects.get(user=self.student).events, 1)
+
+    def test_rollup_conflicts_are_not_mistaken_for_deleted_rows(self):
+        with mock.patch.object(activity, 'roll_up_daily', side_effect=IntegrityError('duplicate key')), \
+                self.assertRaises(IntegrityError):
+            activity.write([self.event()])
+        self.assertFalse(ActivityLog.objects.exists())
+
+    def test_rollup_adds_to_a_day_created_concurrently(self):
+        day = timezone.localtime(timezone.now(), ZoneInfo('UTC')).date()
+        DailyUserActivity.objects.create(user=self.student, date=day, events=2, event_counts={'login': 2})
+        real = DailyUserActivity.objects.select_for_update
+        calls = []
+
+        def first_read_misses(*args, **kwargs):
+            # The first locking read runs before the concurrent insert lands
+            calls.append(1)
+            queryset = real(*args, **kwargs)
+            return queryset.none() if len(calls) == 1 else queryset
+
+        with mock.patch.object(DailyUserActivity.objects, 'select_for_update', side_effect=first_read_misses):
+            activity.write([self.event()])
+        daily = DailyUserActivity.objects.get(user=self.student)
+        self.assertEqual((daily.events, daily.event_counts), (3, {'login': 3}))
+
+# Activity windows and archiving
+class ActivityHistoryTests(EnrollmentTestCase):
+    def log(self, days_ago, activity_type='login'):
+        return ActivityLog.objects.create(
+            user=self.student, activity_type=activity_type, created_at=timezone.now() - timedelta(days=days_ago)
+        )
+
+    def test_default_queryset_is_bounded_on_created_at(self):
+        view = ActivityLogListView()
+        view.request = mock.Mock(user=self.student, query_params={})
+        where = view.get_queryset().query.where
+        self.assertIn('created_at', str(where))
+
+        view.request = mock.Mock(user=self.student, query_params={'window_days': '365'})
+        self.assertNotIn('created_at', str(view.get_queryset().query.where))
+
+    def test_list_defaults_to_recent_window_and_can_be_widened(self):
+        self.log(1)
+        self.log(200)
+        client = api_client(self.student)
+        with self.settings(ACTIVITY_QUERY_WINDOW_DAYS=90):
+            self.assertEqual(client.get('/api/core/activities/').json()['count'], 1)
+            self.assertEqual(client.get('/api/core/activities/?window_days=365').json()['count'], 2)
+            date_from = (timezone.now() - timedelta(days=365)).strftime('%Y-%m-%dT%H:%M:%S')
+            self.assertEqual(client.get('/api/core/activities/', {'date_from': date_from}).json()['count'], 2)
+        self.assertEqual(client.get('/api/core/activities/?window_days=0').status_code, 400)
+
+    def test_cold_months_are_exported_and_deleted(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        now = timezone.now()
+        old = self.log(0)
+        ActivityLog.objects.filter(pk=old.pk).update(created_at=now - timedelta(days=500))
+        kept = self.log(1)
+
+        with self.settings(ACTIVITY_ARCHIVE_DIR=tmp, ACTIVITY_HOT_MONTHS=12):
+            report = partitions.archive_cold_partitions(now)
+
+        self.assertEqual(report, {ActivityLog._meta.db_table: 1})
+        self.assertEqual(list(ActivityLog.objects.values_list('id', flat=True)), [kept.id])
+        archive = ActivityArchive.objects.get(table=ActivityLog._meta.db_table)
+        with gzip.open(archive.path, 'rt') as exported:
+            self.assertEqual(len(exported.read().splitlines()), 1)
+
+
+# Unread counters
+class UnreadCountTests(EnrollmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = api_client(self.student)
+
+    def unread(self):
+        return self.client.get('/api/core/notifications/unread-count/').json()['data']['unread_count']
+
+    def send(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            notifications.send_bulk_notifications([
+                {'recipient_id': self.student.id, 'notification_type': 'system', 'title': 'T', 'message': 'M'}
+            ] * count)
+
+    def test_counter_follows_creates_and_reads(self):
+        self.assertEqual(self.unread(), 0)
+        self.send(3)
+        self.assertEqual(cache.get(notifications.UNREAD_KEY.format(self.student.id)), 3)
+
+        notification = Notification.objects.filter(recipient=self.student).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/core/notifications/{notification.uuid}/', {'is_read': True}, format='json')
+        self.assertEqual(self.unread(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/core/notifications/mark-all-read/')
+        self.assertEqual(self.unread(), 0)
+
+    def test_uncached_or_negative_counter_is_rebuilt(self):
+        self.send(2)
+        cache.delete(notifications.UNREAD_KEY.format(self.student.id))
+        self.send(1)
+        self.assertEqual(self.unread(), 3)
+
+        cache.set(notifications.UNREAD_KEY.format(self.student.id), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            notifications.mark_read(self.student, Notification.objects.filter(recipient=self.student).first().uuid)
+        self.assertEqual(self.unread(), 2)
+
+    def test_counter_changes_only_after_commit(self):
+        self.assertEqual(self.unread(), 0)
+        with self.captureOnCommitCallbacks(execute=False):
+            notifications.send_bulk_notifications([
+                {'recipient_id': self.student.id, 'notification_type': 'system', 'title': 'T', 'message': 'M'}
+            ])
+        self.assertEqual(cache.get(notifications.UNREAD_KEY.format(self.student.id)), 0)
+
+
+# Reconnect replay
+class ReplayTests(EnrollmentTestCase):
+    def notify(self, count, **kwargs):
+        return [Notification.objects.create(
+            recipient=self.student, notification_type='system', title=f'N{i}', message='M', **kwargs
+        ) for i in range(count)]
+
+    def test_replays_everything_after_the_cursor_in_order(self):
+        sent = self.notify(4)
+        Notification.objects.create(recipient=self.teacher, notification_type='system', title='Other', message='M')
+
+        missed, has_more = notifications.replay_notifications(self.student.id, sent[1].id)
+        self.assertEqual([n['title'] for n in missed], ['N2', 'N3'])
+        self.assertFalse(has_more)
+        self.assertEqual(missed[-1]['cursor'], str(sent[3].id))
+
+    def test_limit_and_frames(self):
+        sent = self.notify(5)
+        with mock.patch.object(notifications, 'REPLAY_LIMIT', 3), mock.patch.object(notifications, 'REPLAY_FRAME_SIZE', 2):
+            missed, has_more = notifications.replay_notifications(self.student.id, 0)
+            frames = list(notifications.replay_frames(missed, has_more))
+
+        self.assertTrue(has_more)
+        self.assertEqual([len(frame['notifications']) for frame in frames], [2, 1])
+        self.assertEqual([(frame['complete'], frame['has_more']) for frame in frames], [(False, False), (True, True)])
+        self.assertEqual(frames[-1]['cursor'], str(sent[2].id))
+
+    def test_without_cursor_replays_latest_unread(self):
+        self.notify(2, is_read=True)
+        self.notify(2)
+        missed, has_more = notifications.replay_notifications(self.student.id, None)
+        self.assertEqual([n['title'] for n in missed], ['N0', 'N1'])
+        self.assertEqual(list(notifications.replay_frames([])), [{
+            'type': 'notifications', 'replay': True, 'notifications': [], 'cursor': None, 'complete': True, 'has_more': False,
+        }])
+
+    def test_cursor_parsing(self):
+        self.assertEqual(notifications.parse_cursor('42'), 42)
+        for value in (None, '', 'abc', '-1'):
+            self.assertIsNone(notifications.parse_cursor(value), value)
+
+
+# Notification preferences
+class PreferenceTests(EnrollmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = make_user()
+        Enrollment.objects.create(student=self.other, course=self.course)
+
+    def set_preferences(self, user, *items):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = api_client(user).put('/api/core/notifications/preferences/', list(items), format='json')
+        self.assertEqual(response.status_code, 200)
+        return {row['notification_type']: row for row in response.json()['data']}
+
+    def test_preferences_default_on_and_update_per_type(self):
+        preferences = self.set_preferences(self.student, {'notification_type': 'course_update', 'websocket': False})
+        self.assertEqual(len(preferences), len(Notification.NOTIFICATION_TYPE_CHOICES))
+        self.assertEqual(
+            {channel: preferences['course_update'][channel] for channel in NotificationPreference.CHANNELS},
+            {'in_app': True, 'websocket': False, 'email': True, 'digest': True}
+        )
+        self.assertTrue(all(preferences['system'][channel] for channel in NotificationPreference.CHANNELS))
+
+    def test_fan_out_skips_muted_and_unpushed_recipients(self):
+        notifications.user_preferences(self.student.id)  # cached copy must be dropped by the update
+        self.set_preferences(self.student, {'notification_type': 'course_update', 'in_app': False})
+        self.set_preferences(self.other, {'notification_type': 'course_update', 'websocket': False})
+        self.assertFalse(notifications.channel_enabled(self.student.id, 'course_update', 'in_app'))
+
+        with mock.patch.object(notifications, '_push') as push:
+            sent = notifications.fan_out_course_notification('job-prefs', self.course.id, 'course_update', 'T', 'M')
+        self.assertEqual(sent, 1)
+        self.assertEqual(list(Notification.objects.values_list('recipient', flat=True)), [self.other.id])
+        self.assertEqual(push.call_args.args[0], [])
+
+    def test_bulk_send_and_digest_apply_preferences(self):
+        self.set_preferences(self.student, {'notification_type': 'system', 'in_app': False})
+        self.set_preferences(self.other, {'notification_type': 'system', 'digest': False})
+        created = notifications.send_bulk_notifications([
+            {'recipient_id': user.id, 'notification_type': 'system', 'title': 'T', 'message': 'M'}
+            for user in (self.student, self.other)
+        ])
+        self.assertEqual(created, 1)
+
+        UserProfile.objects.update_or_create(user=self.other, defaults={'digest_frequency': 'daily'})
+        self.assertFalse(digests.pending_notifications(timezone.now()).exists())
+
+
+# Daily rollups and streaks
+class StreakTests(EnrollmentTestCase):
+    def event(self, created_at, activity_type='lesson_complete', **metadata):
+        return {
+            'kind': 'activity', 'created_at': created_at.isoformat(),
+            'fields': {'user_id': self.student.id, 'activity_type': activity_type, 'metadata': metadata},
+        }
+
+    def active_days(self, *days_ago):
+        today = timezone.now().date()
+        DailyUserActivity.objects.bulk_create([
+            DailyUserActivity(user=self.student, date=today - timedelta(days=days), events=1) for days in days_ago
+        ])
+
+    def test_rollup_buckets_by_local_day_and_accumulates(self):
+        UserProfile.objects.update_or_create(user=self.student, defaults={'time_zone': 'America/New_York'})
+        late_evening = timezone.now().replace(hour=3, minute=0, second=0, microsecond=0)  # 03:00 UTC is the day before in New York
+        activity.write([self.event(late_evening, seconds=60), self.event(late_evening, 'quiz_submit', seconds='30')])
+        activity.write([self.event(late_evening, seconds='bad')])
+
+        daily = DailyUserActivity.objects.get(user=self.student)
+        self.assertEqual(daily.date, late_evening.date() - timedelta(days=1))
+        self.assertEqual((daily.events, daily.seconds_studied), (3, 90))
+        self.assertEqual(daily.event_counts, {'lesson_complete': 2, 'quiz_submit': 1})
+
+    def test_streak_counts_consecutive_days_ending_today(self):
+        self.assertEqual(activity.study_streak(self.student), 0)
+        self.active_days(0, 1, 2, 4, 5)
+        self.assertEqual(activity.study_streak(self.student), 3)
+        self.assertEqual(activity.study_streak(self.student, max_days=2), 2)
+
+    def test_streak_is_zero_without_activity_today(self):
+        self.active_days(1, 2)
+        self.assertEqual(activity.study_streak(self.student), 0)
+
+    def test_today_follows_the_users_time_zone(self):
+        UserProfile.objects.update_or_create(user=self.student, defaults={'time_zone': 'Pacific/Kiritimati'})
+        local_today = timezone.localtime(timezone.now(), ZoneInfo('Pacific/Kiritimati')).date()
+        DailyUserActivity.objects.bulk_create([
+            DailyUserActivity(user=self.student, date=local_today - timedelta(days=days), events=1) for days in (0, 1)
+        ])
+        self.assertEqual(activity.study_streak(self.student), 2)
+
+
+# Teacher analytics
+class TeacherAnalyticsTests(EnrollmentTestCase):
+    def populate(self, course):
+        finished = make_user()
+        Enrollment.objects.create(student=finished, course=course, status='completed', progress_percentage=100)
+        Enrollment.objects.create(student=make_user(), course=course, progress_percentage=50, is_active=False)
+        CourseReview.objects.create(course=course, student=finished, rating=4, comment='Good')
+        forum, _ = Forum.objects.get_or_create(course=course, defaults={'name': 'Forum'})
+        Discussion.objects.create(forum=forum, author=finished, title='Q', content='?', discussion_type='question')
+        Discussion.objects.create(
+            forum=forum, author=finished, title='R', content='!', discussion_type='question', is_resolved=True
+        )
+        quiz = Quiz.objects.create(course=course, title='Quiz')
+        QuizAttempt.objects.create(quiz=quiz, student=finished, enrollment=Enrollment.objects.get(student=finished))
+
+    def test_per_course_metrics(self):
+        self.populate(self.course)
+        course, = teacher.compute(self.teacher.id)['courses']
+        self.assertEqual(
+            {key: course[key] for key in (
+                'students', 'completed_students', 'avg_progress', 'rating', 'reviews', 'quiz_attempts',
+                'questions', 'resolved_questions', 'pending_questions',
+            )},
+            {
+                'students': 2, 'completed_students': 1, 'avg_progress': 50.0, 'rating': 4.0, 'reviews': 1,
+                'quiz_attempts': 1, 'questions': 2, 'resolved_questions': 1, 'pending_questions': 1,
+            }
+        )
+        self.assertEqual(course['progress_distribution'], {'not_started': 1, 'in_progress': 0, 'completed': 1})
+        self.assertEqual(course['engagement_score'], teacher.engagement_score(2, 1, 50.0, 2, 1))
+
+    def test_query_count_does_not_grow_with_courses(self):
+        self.populate(self.course)
+        with self.assertNumQueries(2):
+            teacher.compute(self.teacher.id)
+        for _ in range(3):
+            self.populate(make_course(self.teacher))
+        with self.assertNumQueries(2):
+            summary = teacher.compute(self.teacher.id)['summary']
+        self.assertEqual((summary['total_courses'], summary['total_students']), (4, 5))
+
+    def test_active_students_are_counted_once_across_courses(self):
+        other = make_course(self.teacher)
+        Enrollment.objects.create(student=self.student, course=other)
+        Enrollment.objects.filter(student=self.student).update(last_accessed=timezone.now())
+        data = teacher.compute(self.teacher.id)
+        self.assertEqual([course['active_students_7d'] for course in data['courses']], [1, 1])
+        self.assertEqual(data['summary']['active_students_7d'], 1)
+
+    def test_cache_is_dropped_when_an_enrollment_changes(self):
+        client = api_client(self.teacher)
+        url = '/api/core/teacher-analytics/'
+        self.assertEqual(client.get(url).json()['data']['summary']['total_students'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(student=make_user(), course=self.course)
+        self.assertEqual(client.get(url).json()['data']['summary']['total_students'], 2)
+        self.assertEqual(api_client(self.student).get(url).status_code, 403)
+
+
+# Notification retention
+@override_settings(NOTIFICATION_RETENTION={'default': 30, 'system': None})
+class RetentionTests(EnrollmentTestCase):
+    def notify(self, days_ago, notification_type='course_update', **kwargs):
+        notification = Notification.objects.create(
+            recipient=self.student, notification_type=notification_type, title='T', message='M', **kwargs
+        )
+        Notification.objects.filter(pk=notification.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return notification
+
+    def test_purges_expired_and_old_read_notifications_in_chunks(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        now = timezone.now()
+        for _ in range(3):
+            self.notify(40, is_read=True)
+        kept = [
+            self.notify(40),
+            self.notify(40, 'system', is_read=True),
+            self.notify(10, is_read=True),
+        ]
+        self.notify(1, expires_at=now - timedelta(hours=1))
+        self.assertEqual(notifications.unread_count(self.student.id), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = retention.purge_notifications(now, archive_dir=tmp, batch_size=2)
+
+        self.assertEqual((stats['purged'], stats['by_label']), (4, {'expired': 1, 'course_update': 3}))
+        self.assertEqual(set(Notification.objects.values_list('id', flat=True)), {n.id for n in kept})
+        self.assertEqual(notifications.unread_count(self.student.id), 1)
+        with gzip.open(stats['archive'], 'rt') as archived:
+            self.assertEqual(len(archived.read().splitlines()), 4)
+        self.assertEqual(retention.last_purge_stats()['purged'], 4)
+
+    def test_skips_run_while_another_holds_the_lock(self):
+        token = acquire_lock(retention.PURGE_LOCK_KEY, 60)
+        self.assertIsNone(retention.purge_notifications(archive_dir=''))
+        release_lock(retention.PURGE_LOCK_KEY, token)
+        self.assertIsNotNone(retention.purge_notifications(archive_dir=''))
+
+    def test_lock_is_only_released_by_its_owner(self):
+        token = acquire_lock('test_lock', 60)
+        self.assertIsNone(acquire_lock('test_lock', 60))
+        cache.set('test_lock', token + 1)  # expired and taken by a later run
+        release_lock('test_lock', token)
+        self.assertEqual(cache.get('test_lock'), token + 1)
+
+
+# Transactional outbox
+class OutboxTests(EnrollmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.delivered = []
+        self.failing = set()
+        handlers = mock.patch.dict(outbox.HANDLERS, {'task': self.deliver})
+        handlers.start()
+        self.addCleanup(handlers.stop)
+
+    def deliver(self, messages):
+        self.delivered.extend(m.payload['task'] for m in messages)
+        return {m.id: 'broker down' for m in messages if m.payload['task'] in self.failing}
+
+    def test_enqueue_is_transactional_and_deduplicated(self):
+        with mock.patch.object(outbox, 'kick_relay') as kick, self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNotNone(outbox.enqueue_task('a', dedupe_key='once'))
+            self.assertIsNone(outbox.enqueue_task('a', dedupe_key='once'))
+        self.assertTrue(kick.called)
+
+        try:
+            with transaction.atomic():
+                outbox.enqueue_task('rolled-back')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(list(OutboxMessage.objects.values_list('payload__task', flat=True)), ['a'])
+
+    def test_relay_delivers_in_order_and_backs_off_failures(self):
+        for name in ('a', 'b', 'c'):
+            outbox.enqueue_task(name)
+        OutboxMessage.objects.create(channel='sms', payload={})
+        self.failing.add('b')
+
+        self.assertEqual(outbox.relay(batch_size=2), 2)
+        self.assertEqual(self.delivered, ['a', 'b', 'c'])
+        failed = OutboxMessage.objects.get(payload__task='b')
+        self.assertEqual((failed.status, failed.attempts, failed.last_error), ('pending', 1, 'broker down'))
+        self.assertGreater(failed.available_at, timezone.now())
+        self.assertEqual(OutboxMessage.objects.get(channel='sms').last_error, 'Unknown outbox channel sms')
+
+        # Not due again until its backoff has passed
+        self.assertEqual(outbox.relay(), 0)
+        self.assertEqual(self.delivered, ['a', 'b', 'c'])
+
+    def test_gives_up_after_max_attempts(self):
+        outbox.enqueue_task('b')
+        self.failing.add('b')
+        with self.settings(OUTBOX_MAX_ATTEMPTS=2):
+            for _ in range(2):
+                OutboxMessage.objects.update(available_at=timezone.now())
+                outbox.relay()
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('failed', 2))
+
+    def test_relay_skips_while_another_run_holds_the_lock(self):
+        outbox.enqueue_task('a')
+        token = acquire_lock(outbox.RELAY_LOCK_KEY, 60)
+        self.assertEqual(outbox.relay(), 0)
+        release_lock(outbox.RELAY_LOCK_KEY, token)
+        self.assertEqual(outbox.relay(), 1)
+
+    def test_purges_delivered_messages_past_retention(self):
+        outbox.enqueue_task('a')
+        outbox.enqueue_task('b')
+        outbox.relay()
+        OutboxMessage.objects.filter(payload__task='a').update(delivered_at=timezone.now() - timedelta(days=30))
+        self.assertEqual(outbox.purge_delivered(days=7), 1)
+        self.assertEqual(list(OutboxMessage.objects.values_list('payload__task', flat=True)), ['b'])
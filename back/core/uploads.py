@@ -0,0 +1,346 @@
+# back/core/uploads.py
+"""
+Resumable chunked uploads (a subset of the tus protocol).
+
+A session is created with the final size, chunks are PATCHed at the current
+offset and appended to a partial file on disk, and finalize hands the file to
+the storage backend for its target (assignment submission, lesson attachment
+or media content). Nothing is ever held in memory beyond one read buffer.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError, PermissionDenied
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+import base64
+import hashlib
+import logging
+import mimetypes
+import os
+import shutil
+import uuid
+
+from .utils import is_course_instructor
+
+logger = logging.getLogger(__name__)
+
+READ_BUFFER_SIZE = 64 * 1024
+
+MEDIA_EXTENSIONS = {
+    'video': ['mp4', 'avi', 'mov', 'wmv', 'flv', 'webm'],
+    'audio': ['mp3', 'wav', 'ogg', 'm4a'],
+    'image': ['jpg', 'jpeg', 'png', 'gif', 'svg', 'webp'],
+    'document': ['pdf', 'doc', 'docx', 'txt', 'odt'],
+    'presentation': ['ppt', 'pptx', 'odp'],
+    'archive': ['zip', 'rar', '7z', 'tar', 'gz'],
+}
+
+
+class ChecksumMismatch(Exception):
+    pass
+
+
+class OffsetMismatch(Exception):
+    pass
+
+
+def _extension(filename):
+    return filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+
+
+def partial_path(session):
+    return os.path.join(settings.UPLOAD_SESSION_DIR, f"{session.uuid}.part")
+
+
+def max_upload_size(purpose):
+    return settings.UPLOAD_MAX_SIZES.get(purpose, 0)
+
+
+# Targets: each resolves and authorizes the object on create, and attaches the file on finalize
+def _get_assignment(user, target_uuid):
+    from courses.models import Assignment, Enrollment
+
+    assignment = Assignment.objects.select_related('lesson__module__course').filter(uuid=target_uuid).first()
+    if not assignment:
+        raise ValidationError('Assignment not found')
+
+    enrollment = Enrollment.objects.filter(
+        student=user, course=assignment.lesson.module.course, is_active=True
+    ).first()
+    if not enrollment:
+        raise PermissionDenied('You are not enrolled in this course')
+    return assignment, enrollment
+
+
+def _check_assignment_upload(user, target_uuid, filename):
+    assignment, _ = _get_assignment(user, target_uuid)
+    allowed = [e.strip().lower().lstrip('.') for e in assignment.allowed_file_extensions.split(',') if e.strip()]
+    if allowed and _extension(filename) not in allowed:
+        raise ValidationError(f"File type not allowed. Allowed types: {', '.join(allowed)}")
+
+
+def _attach_assignment_submission(session, file):
+    from courses.models import AssignmentSubmission
+
+    assignment, enrollment = _get_assignment(session.user, session.target_uuid)
+    submission, created = AssignmentSubmission.objects.select_for_update().get_or_create(
+        assignment=assignment, student=session.user,
+        defaults={'enrollment': enrollment}
+    )
+
+    if timezone.now() > assignment.due_date:
+        submission.status = 'late'
+    else:
+        submission.status = 'submitted' if created else 'resubmitted'
+
+    old_file = submission.file.name if submission.file else None
+    submission.file.save(session.filename, file, save=False)
+    submission.save()
+    if old_file and old_file != submission.file.name:
+        submission.file.storage.delete(old_file)
+
+    from courses.tasks import index_submission_similarity_task
+    transaction.on_commit(lambda: index_submission_similarity_task.delay(submission.id))
+    return submission
+
+
+def _get_instructed_lesson(user, target_uuid):
+    from courses.models import Lesson
+
+    lesson = Lesson.objects.select_related('module__course').filter(uuid=target_uuid).first()
+    if not lesson:
+        raise ValidationError('Lesson not found')
+
+    if not is_course_instructor(user, lesson.module.course):
+        raise PermissionDenied('Only course instructors can upload lesson files')
+    return lesson
+
+
+def _check_lesson_upload(user, target_uuid, filename):
+    _get_instructed_lesson(user, target_uuid)
+
+
+def _attach_lesson_attachment(session, file):
+    lesson = _get_instructed_lesson(session.user, session.target_uuid)
+    lesson.file_attachment.save(session.filename, file, save=True)
+    return lesson
+
+
+def _media_content_type(filename):
+    extension = _extension(filename)
+    return next((kind for kind, extensions in MEDIA_EXTENSIONS.items() if extension in extensions), None)
+
+
+def _get_media_course(user, target_uuid):
+    """The course media is uploaded into, if any; only its instructors may add to it"""
+    from courses.models import Course
+
+    if not target_uuid:
+        return None
+    course = Course.objects.filter(uuid=target_uuid).first()
+    if not course:
+        raise ValidationError('Course not found')
+
+    if not is_course_instructor(user, course):
+        raise PermissionDenied('Only course instructors can upload media to this course')
+    return course
+
+
+def _check_media_upload(user, target_uuid, filename):
+    if not (user.is_staff or user.role in ['moderator', 'manager', 'teacher']):
+        raise PermissionDenied('You cannot upload media content')
+    if not _media_content_type(filename):
+        raise ValidationError('Unsupported media file type')
+    _get_media_course(user, target_uuid)
+
+
+def _attach_media_content(session, file):
+    from core.models import MediaContent
+
+    return MediaContent.objects.create(
+        title=session.metadata.get('title') or session.filename,
+        description=session.metadata.get('description', ''),
+        content_type=_media_content_type(session.filename),
+        file=File(file, name=session.filename),
+        file_size=session.total_size,
+        mime_type=session.content_type,
+        course=_get_media_course(session.user, session.target_uuid),
+        uploaded_by=session.user,
+    )
+
+
+UPLOAD_TARGETS = {
+    'assignment_submission': (_check_assignment_upload, _attach_assignment_submission),
+    'lesson_attachment': (_check_lesson_upload, _attach_lesson_attachment),
+    'media_content': (_check_media_upload, _attach_media_content),
+}
+
+
+def create_session(user, purpose, filename, total_size, target_uuid=None, content_type='', metadata=None):
+    from core.models import UploadSession
+
+    if purpose not in UPLOAD_TARGETS:
+        raise ValidationError('Unknown upload purpose')
+
+    filename = os.path.basename(filename or '').strip()
+    if not filename:
+        raise ValidationError('Filename is required')
+
+    limit = max_upload_size(purpose)
+    if total_size <= 0 or total_size > limit:
+        raise ValidationError(f"File size must be between 1 byte and {limit // (1024 * 1024)}MB")
+
+    check, _ = UPLOAD_TARGETS[purpose]
+    check(user, target_uuid, filename)
+
+    session = UploadSession.objects.create(
+        user=user,
+        purpose=purpose,
+        target_uuid=target_uuid,
+        filename=filename,
+        content_type=content_type or mimetypes.guess_type(filename)[0] or '',
+        total_size=total_size,
+        metadata=metadata or {},
+        expires_at=timezone.now() + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS),
+    )
+
+    os.makedirs(settings.UPLOAD_SESSION_DIR, exist_ok=True)
+    open(partial_path(session), 'wb').close()
+    return session
+
+
+def parse_checksum_header(value):
+    """'sha256 <base64 digest>' (tus checksum extension) -> raw digest bytes"""
+    if not value:
+        return None
+    algorithm, _, encoded = value.strip().partition(' ')
+    if algorithm.lower() != 'sha256':
+        raise ValidationError('Only sha256 checksums are supported')
+    try:
+        return base64.b64decode(encoded.strip(), validate=True)
+    except ValueError:
+        raise ValidationError('Checksum is not valid base64')
+
+
+def _check_writable(session, offset, length):
+    if session.status != 'active' or session.expires_at < timezone.now():
+        raise ValidationError('Upload session is no longer active')
+    if offset != session.offset:
+        raise OffsetMismatch(session.offset)
+    if length is not None and length > session.total_size - session.offset:
+        raise ValidationError('Chunk exceeds the declared upload size')
+
+
+def write_chunk(session_uuid, user, stream, offset, length=None, checksum=None):
+    """
+    Append one chunk read from stream at offset, hashing it as it is written.
+
+    The chunk is spooled to its own file first, so no lock is held while the
+    client sends it. The session row is then locked only to recheck the
+    offset, append the spooled bytes and advance it; concurrent PATCHes for
+    one upload still serialize. A chunk failing its checksum never reaches
+    the partial file.
+    """
+    from core.models import UploadSession
+
+    session = UploadSession.objects.get(uuid=session_uuid, user=user)
+    _check_writable(session, offset, length)
+
+    remaining = session.total_size - session.offset
+    limit = min(remaining, settings.UPLOAD_MAX_CHUNK_SIZE if length is None else length)
+    chunk_path = f"{partial_path(session)}.{uuid.uuid4().hex}"
+    digest = hashlib.sha256()
+    written = 0
+
+    try:
+        with open(chunk_path, 'wb') as chunk:
+            while written < limit:
+                buffer = stream.read(min(READ_BUFFER_SIZE, limit - written))
+                if not buffer:
+                    break
+                chunk.write(buffer)
+                digest.update(buffer)
+                written += len(buffer)
+
+        if checksum is not None and digest.digest() != checksum:
+            raise ChecksumMismatch()
+
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+            _check_writable(session, offset, length)
+
+            with open(partial_path(session), 'r+b') as partial, open(chunk_path, 'rb') as chunk:
+                partial.seek(offset)
+                shutil.copyfileobj(chunk, partial, READ_BUFFER_SIZE)
+                partial.truncate(offset + written)
+
+            session.offset += written
+            session.save(update_fields=['offset', 'updated_at'])
+    finally:
+        try:
+            os.remove(chunk_path)
+        except FileNotFoundError:
+            pass
+    return session
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finalize_session(session_uuid, user, expected_checksum=None):
+    """Verify the assembled file and hand it to the purpose's target; returns (session, target)"""
+    from core.models import UploadSession
+
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(uuid=session_uuid, user=user)
+        if session.status != 'active':
+            raise ValidationError('Upload session is no longer active')
+        if not session.is_complete:
+            raise ValidationError(f"Upload incomplete: {session.offset} of {session.total_size} bytes received")
+
+        path = partial_path(session)
+        session.checksum = _file_sha256(path)
+        if expected_checksum and expected_checksum.lower() != session.checksum:
+            raise ChecksumMismatch()
+
+        _, attach = UPLOAD_TARGETS[session.purpose]
+        with open(path, 'rb') as partial:
+            target = attach(session, File(partial, name=session.filename))
+
+        session.status = 'completed'
+        session.completed_at = timezone.now()
+        session.save(update_fields=['status', 'checksum', 'completed_at', 'updated_at'])
+
+    discard_partial(session)
+    logger.info(f"Finalized {session.purpose} upload {session.uuid} ({session.total_size} bytes)")
+    return session, target
+
+
+def abort_session(session):
+    session.status = 'aborted'
+    session.save(update_fields=['status', 'updated_at'])
+    discard_partial(session)
+
+
+def discard_partial(session):
+    try:
+        os.remove(partial_path(session))
+    except FileNotFoundError:
+        pass
+
+
+def cleanup_expired_sessions():
+    """Abort stale sessions and remove their partial files"""
+    from core.models import UploadSession
+
+    expired = list(UploadSession.objects.filter(status='active', expires_at__lt=timezone.now()))
+    for session in expired:
+        discard_partial(session)
+    UploadSession.objects.filter(id__in=[s.id for s in expired]).update(status='aborted', updated_at=timezone.now())
+    return len(expired)
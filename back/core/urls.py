@@ -6,12 +6,14 @@ from .views import (
     DiscussionPinView, DiscussionLockView, DiscussionResolveView,
     ReplyListCreateView, ReplyDetailView, ReplyUpvoteView, ReplyMarkSolutionView,
     NotificationListView, NotificationDetailView,
-    NotificationMarkAllReadView, NotificationUnreadCountView,
+    NotificationMarkAllReadView, NotificationUnreadCountView, NotificationFanOutJobView,
+    NotificationPreferenceView,
     ActivityLogListView,
     MediaContentListCreateView, MediaContentDetailView,
     AnnouncementListCreateView, AnnouncementDetailView,
     SupportTicketListCreateView, SupportTicketDetailView,
-    DashboardView, StudentAnalyticsView, TeacherAnalyticsView, PlatformAnalyticsView, DashboardSummaryView
+    DashboardView, StudentAnalyticsView, TeacherAnalyticsView, PlatformAnalyticsView, DashboardSummaryView,
+    UploadSessionCreateView, UploadSessionDetailView, UploadSessionFinalizeView
 )
 
 app_name = 'core'
@@ -39,6 +41,8 @@ urlpatterns = [
     path('notifications/<uuid:uuid>/', NotificationDetailView.as_view(), name='notification-detail'),
     path('notifications/mark-all-read/', NotificationMarkAllReadView.as_view(), name='notification-mark-all-read'),
     path('notifications/unread-count/', NotificationUnreadCountView.as_view(), name='notification-unread-count'),
+    path('notifications/jobs/<str:job_id>/', NotificationFanOutJobView.as_view(), name='notification-fan-out-job'),
+    path('notifications/preferences/', NotificationPreferenceView.as_view(), name='notification-preferences'),
     
     # Activity Logs
     path('activities/', ActivityLogListView.as_view(), name='activity-list'),
@@ -47,6 +51,11 @@ urlpatterns = [
     path('media/', MediaContentListCreateView.as_view(), name='media-list'),
     path('media/<uuid:uuid>/', MediaContentDetailView.as_view(), name='media-detail'),
     
+    # Resumable Uploads
+    path('uploads/', UploadSessionCreateView.as_view(), name='upload-create'),
+    path('uploads/<uuid:uuid>/', UploadSessionDetailView.as_view(), name='upload-detail'),
+    path('uploads/<uuid:uuid>/finalize/', UploadSessionFinalizeView.as_view(), name='upload-finalize'),
+    
     # Announcements
     path('announcements/', AnnouncementListCreateView.as_view(), name='announcement-list'),
     path('announcements/<uuid:uuid>/', AnnouncementDetailView.as_view(), name='announcement-detail'),
@@ -4,13 +4,11 @@ from django.conf import settings
 from django.utils import timezone
 from django.db.models import F, Avg
 from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 from django.shortcuts import get_object_or_404
 from django.http import Http404
 from django.core.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import status
-from datetime import timedelta
 import logging
 import uuid
 
@@ -75,8 +73,16 @@ def format_api_response(data=None, message=None, errors=None, status_code=status
     return Response(response_data, status=status_code)
 
 def send_notification(user, notification_type, title, message, **kwargs):
-    """Send notification to user"""
+    """
+    Create a notification; the WebSocket push goes out through the outbox once
+    it commits. Returns None if the user muted this type.
+    """
     from core.models import Notification
+    from core.notifications import adjust_unread_counts, notification_payload, channel_enabled
+    from core.outbox import enqueue_push
+    
+    if not channel_enabled(user.id, notification_type, 'in_app'):
+        return None
     
     notification = Notification.objects.create(
         recipient=user,
@@ -86,57 +92,39 @@ def send_notification(user, notification_type, title, message, **kwargs):
         **kwargs
     )
     
-    # Send via WebSocket if available
-    if channel_layer:
-        try:
-            async_to_sync(channel_layer.group_send)(
-                f"user_{user.uuid}",
-                {
-                    "type": "notification.send",
-                    "notification": {
-                        "id": str(notification.uuid),
-                        "type": notification_type,
-                        "title": title,
-                        "message": message,
-                        "created_at": notification.created_at.isoformat(),
-                    }
-                }
-            )
-        except Exception as e:
-            logger.warning(f"Failed to send WebSocket notification: {e}")
+    if channel_enabled(user.id, notification_type, 'websocket'):
+        enqueue_push(
+            f"user_{user.uuid}",
+            {"type": "notification.send", "notification": notification_payload(notification)},
+            dedupe_key=f"notification:{notification.uuid}"
+        )
     
+    adjust_unread_counts({user.id: 1}, {user.id: user.uuid})
     return notification
 
 def bulk_notify_enrolled_students(course, notification_type, title, message):
-    """Notify all enrolled students in a course"""
-    from courses.models import Enrollment
+    """Notify all enrolled students in a course from a background fan-out job; returns the job id"""
+    from core.notifications import queue_course_notification
     
-    enrollments = Enrollment.objects.filter(
-        course=course,
-        is_active=True
-    ).select_related('student')
-    
-    for enrollment in enrollments:
-        send_notification(
-            enrollment.student,
-            notification_type,
-            title,
-            message,
-            course=course
-        )
+    return queue_course_notification(course, notification_type, title, message)
 
 def track_activity(user, activity_type, **kwargs):
-    """Track user activity"""
-    from core.models import ActivityLog
-    
-    ActivityLog.objects.create(
-        user=user,
-        activity_type=activity_type,
-        ip_address=kwargs.pop('ip_address', None),
-        user_agent=kwargs.pop('user_agent', ''),
-        metadata=kwargs.pop('metadata', {}),
-        **kwargs
-    )
+    """Track user activity; rows are written in batches by core.activity"""
+    from core.activity import record
+    
+    fields = {
+        'user_id': user.id,
+        'activity_type': activity_type,
+        'ip_address': kwargs.pop('ip_address', None),
+        'user_agent': kwargs.pop('user_agent', ''),
+        'metadata': kwargs.pop('metadata', {}),
+    }
+    for name, value in kwargs.items():
+        if hasattr(value, 'pk'):
+            fields[f"{name}_id"] = value.pk
+        else:
+            fields[name] = value
+    record('activity', fields)
 
 def increment_view_count(obj):
     """Increment view count atomically"""
@@ -170,23 +158,23 @@ def update_enrollment_progress(enrollment):
     enrollment.progress_percentage = progress
     
     # Update status based on progress
-    if progress >= 100 and enrollment.status != 'completed':
+    just_completed = progress >= 100 and enrollment.status != 'completed'
+    if just_completed:
         enrollment.status = 'completed'
         enrollment.completed_at = timezone.now()
-        
-        # Trigger certificate generation if available
-        try:
-            from courses.tasks import generate_certificate_task
-            generate_certificate_task.delay(enrollment.id)
-        except ImportError:
-            # Handle case where Celery is not available
-            logger.info(f"Certificate generation queued for enrollment {enrollment.id}")
-            
     elif progress > 0 and enrollment.status == 'enrolled':
         enrollment.status = 'in_progress'
         enrollment.started_at = timezone.now()
     
     enrollment.save()
+    
+    if just_completed:
+        # Certificate issuance is queued with the completed enrollment and relayed after commit
+        from core.outbox import enqueue_task
+        enqueue_task(
+            'courses.tasks.generate_certificate_task', [enrollment.id],
+            dedupe_key=f"certificate:{enrollment.id}"
+        )
     return progress
 
 # Cache utilities
@@ -198,6 +186,14 @@ def get_or_set_cache(key, func, timeout=3600):
         cache.set(key, value, timeout)
     return value
 
+def get_redis_client():
+    """Return the raw Redis client behind the default cache, or None for other backends"""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except (ImportError, NotImplementedError):
+        return None
+
 def invalidate_cache_pattern(pattern):
     """Invalidate all cache keys matching pattern"""
     if hasattr(cache, '_cache'):
@@ -208,6 +204,23 @@ def invalidate_cache_pattern(pattern):
             # Fallback for different cache backends
             pass
 
+# Cache locks
+_RELEASE_LOCK_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+def acquire_lock(key, timeout):
+    """Take a cache lock; returns its owner token, or None while someone else holds it"""
+    # An int is stored unpickled by django-redis, so release_lock can compare it in Lua
+    token = uuid.uuid4().int >> 65
+    return token if cache.add(key, token, timeout) else None
+
+def release_lock(key, token):
+    """Release a lock only if the token still owns it; an expired lock may belong to a later run"""
+    redis = get_redis_client()
+    if redis is not None:
+        redis.eval(_RELEASE_LOCK_SCRIPT, 1, cache.make_key(key), token)
+    elif cache.get(key) == token:
+        cache.delete(key)
+
 # Quiz scoring utilities
 def calculate_quiz_score(quiz_attempt):
     """Calculate score for a quiz attempt"""
@@ -277,26 +290,11 @@ def send_course_enrollment_email(enrollment):
         logger.error(f"Failed to send enrollment email: {e}")
 
 # Learning analytics helpers
-def get_study_streak(user):
+def get_study_streak(user, max_days=365):
     """Get user's current study streak in days"""
-    from core.models import ActivityLog
-    
-    today = timezone.now().date()
-    streak = 0
+    from core.activity import study_streak
     
-    for i in range(365):  # Check up to 1 year
-        check_date = today - timedelta(days=i)
-        has_activity = ActivityLog.objects.filter(
-            user=user,
-            created_at__date=check_date
-        ).exists()
-        
-        if has_activity:
-            streak += 1
-        else:
-            break
-            
-    return streak
+    return study_streak(user, max_days)
 
 def calculate_engagement_score(course):
     """Calculate course engagement score (0-100)"""
@@ -366,6 +364,14 @@ def validate_course_access(user, course):
     
     return False
 
+def is_course_instructor(user, course):
+    """Instructor, co-instructor or staff"""
+    return (
+        user.is_staff or
+        course.instructor_id == user.id or
+        course.co_instructors.filter(id=user.id).exists()
+    )
+
 def validate_lesson_access(user, lesson):
     """Check if user has access to lesson"""
     course = lesson.module.course
@@ -407,16 +413,16 @@ def safe_import(module_path, class_name):
 # Account activity tracking
 def track_user_activity(user, activity_type, **kwargs):
     """Track user activity for accounts module"""
-    from core.models import UserActivity
+    from core.activity import record
     
     try:
-        UserActivity.objects.create(
-            user=user,
-            activity_type=activity_type,
-            ip_address=kwargs.get('ip_address'),
-            user_agent=kwargs.get('user_agent'),
-            metadata=kwargs.get('metadata', {})
-        )
+        record('user_activity', {
+            'user_id': user.id,
+            'activity_type': activity_type,
+            'ip_address': kwargs.get('ip_address'),
+            'user_agent': kwargs.get('user_agent'),
+            'metadata': kwargs.get('metadata', {}),
+        })
     except Exception as e:
         logger.error(f"Failed to track user activity: {str(e)}")
 
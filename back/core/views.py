@@ -5,28 +5,34 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from django.db.models import Count, Q, Avg, Sum, Prefetch
 from django.utils import timezone
 from datetime import timedelta
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.exceptions import ValidationError, PermissionDenied
 
 from .models import (
     Forum, Discussion, Reply, Notification, LearningAnalytics,
-    ActivityLog, MediaContent, Announcement, SupportTicket
+    ActivityLog, MediaContent, Announcement, SupportTicket, UploadSession
 )
 from courses.models import Course, Enrollment, QuizAttempt, LessonProgress
 from .serializers import (
     ForumSerializer, DiscussionSerializer, ReplySerializer,
-    NotificationSerializer, LearningAnalyticsSerializer, ActivityLogSerializer,
-    MediaContentSerializer, AnnouncementSerializer, SupportTicketSerializer
+    NotificationSerializer, NotificationPreferenceSerializer, LearningAnalyticsSerializer, ActivityLogSerializer,
+    MediaContentSerializer, AnnouncementSerializer, SupportTicketSerializer,
+    UploadSessionSerializer, UploadSessionCreateSerializer
 )
 from .filters import DiscussionFilter, NotificationFilter, ActivityLogFilter
 from accounts.permissions import IsOwnerOrReadOnly, IsModeratorOrUp, IsManagerOrAdmin, IsTeacherOrAdmin
 from .utils import (
     send_notification, track_activity, increment_view_count, 
-    validate_and_get_object, format_api_response
+    validate_and_get_object, format_api_response, is_course_instructor, get_study_streak
 )
 from .services import AnalyticsService
+from .analytics.teacher import get_teacher_analytics
+from . import uploads, notifications
 
 
 User = get_user_model()
@@ -67,6 +73,7 @@ class DiscussionListCreateView(generics.ListCreateAPIView):
             'forum', 'author'
         ).prefetch_related('replies').order_by('-is_pinned', '-created_at', 'id')
     
+    @transaction.atomic
     def perform_create(self, serializer):
         discussion = serializer.save()
         
@@ -79,6 +86,11 @@ class DiscussionListCreateView(generics.ListCreateAPIView):
                 f'{self.request.user.get_full_name()} asked: {discussion.title}',
                 course=course, discussion=discussion
             )
+        
+        track_activity(
+            self.request.user, 'forum_post',
+            course=discussion.forum.course
+        )
 
 class DiscussionDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -175,6 +187,7 @@ class ReplyListCreateView(generics.ListCreateAPIView):
         
         return queryset.order_by('created_at', 'id')
     
+    @transaction.atomic
     def perform_create(self, serializer):
         reply = serializer.save()
         
@@ -269,6 +282,16 @@ class NotificationDetailView(generics.RetrieveUpdateAPIView):
     
     def get_queryset(self):
         return Notification.objects.filter(recipient=self.request.user)
+    
+    def perform_update(self, serializer):
+        was_read = serializer.instance.is_read
+        notification = serializer.save()
+        if notification.is_read != was_read:
+            if notification.is_read and not notification.read_at:
+                notification.read_at = timezone.now()
+                notification.save(update_fields=['read_at'])
+            user = self.request.user
+            notifications.adjust_unread_counts({user.id: -1 if notification.is_read else 1}, {user.id: user.uuid})
 
 # Notification Actions
 class NotificationMarkAllReadView(APIView):
@@ -276,9 +299,7 @@ class NotificationMarkAllReadView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        updated = Notification.objects.filter(
-            recipient=request.user, is_read=False
-        ).update(is_read=True, read_at=timezone.now())
+        updated = notifications.mark_all_read(request.user)
         
         return format_api_response(
             data={'updated_count': updated},
@@ -290,11 +311,43 @@ class NotificationUnreadCountView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        count = Notification.objects.filter(
-            recipient=request.user, is_read=False
-        ).count()
+        return format_api_response(data={'unread_count': notifications.unread_count(request.user.id)})
+
+class NotificationFanOutJobView(APIView):
+    """GET /api/core/notifications/jobs/{job_id}/ - Progress of a course-wide notification job"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, job_id):
+        job = notifications.get_fan_out_status(job_id)
+        course = Course.objects.filter(id=job['course_id']).first() if job else None
+        if not course or not is_course_instructor(request.user, course):
+            return format_api_response(
+                message='Job not found',
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+        
+        return format_api_response(data=job)
+
+class NotificationPreferenceView(APIView):
+    """
+    GET /api/core/notifications/preferences/ - Channels enabled per notification type
+    PUT /api/core/notifications/preferences/ - Update channels for one or more types
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        return format_api_response(data=notifications.preference_list(request.user.id))
+    
+    def put(self, request):
+        items = request.data if isinstance(request.data, list) else [request.data]
+        serializer = NotificationPreferenceSerializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
         
-        return format_api_response(data={'unread_count': count})
+        notifications.update_preferences(request.user, serializer.validated_data)
+        return format_api_response(
+            data=notifications.preference_list(request.user.id),
+            message='Notification preferences updated'
+        )
 
 # Activity Logs
 class ActivityLogListView(generics.ListAPIView):
@@ -307,10 +360,16 @@ class ActivityLogListView(generics.ListAPIView):
     def get_queryset(self):
         user = self.request.user
         
+        queryset = ActivityLog.objects.all()
+        # Bounded by default so only recent partitions are scanned; date_from or window_days widen it
+        params = self.request.query_params
+        if not params.get('date_from') and not params.get('window_days'):
+            queryset = queryset.recent()
+        
         if user.is_staff or user.role == 'manager':
-            return ActivityLog.objects.select_related('user', 'course', 'lesson').order_by('-created_at', 'id')
+            return queryset.select_related('user', 'course', 'lesson').order_by('-created_at', 'id')
         
-        return ActivityLog.objects.filter(user=user).select_related('course', 'lesson').order_by('-created_at', 'id')
+        return queryset.filter(user=user).select_related('course', 'lesson').order_by('-created_at', 'id')
 
 # Media Content
 class MediaContentListCreateView(generics.ListCreateAPIView):
@@ -453,17 +512,7 @@ class StudentAnalyticsView(APIView):
         enrollments = Enrollment.objects.filter(student=user, is_active=True)
         
         # Study streak
-        today = timezone.now().date()
-        streak_days = 0
-        for i in range(30):
-            check_date = today - timedelta(days=i)
-            has_activity = ActivityLog.objects.filter(
-                user=user, created_at__date=check_date
-            ).exists()
-            if has_activity:
-                streak_days += 1
-            else:
-                break
+        streak_days = get_study_streak(user, max_days=30)
         
         # Recent quiz performance
         recent_quizzes = QuizAttempt.objects.filter(
@@ -479,7 +528,7 @@ class StudentAnalyticsView(APIView):
                 'total_quizzes': recent_quizzes.count(),
                 'avg_quiz_score': float(recent_quizzes.aggregate(avg=Avg('score'))['avg'] or 0)
             },
-            'recent_activity': list(ActivityLog.objects.filter(
+            'recent_activity': list(ActivityLog.objects.recent().filter(
                 user=user
             ).order_by('-created_at')[:5].values(
                 'activity_type', 'created_at', 'course__title'
@@ -499,27 +548,23 @@ class TeacherAnalyticsView(APIView):
                 status_code=status.HTTP_403_FORBIDDEN
             )
         
-        courses = Course.objects.filter(instructor=user)
-        total_enrollments = Enrollment.objects.filter(course__instructor=user, is_active=True)
+        analytics = get_teacher_analytics(user)
+        summary = analytics['summary']
         
         return format_api_response(data={
             'summary': {
-                'total_courses': courses.count(),
-                'published_courses': courses.filter(status='published').count(),
-                'total_students': total_enrollments.values('student').distinct().count(),
-                'avg_course_rating': float(courses.aggregate(avg=Avg('reviews__rating'))['avg'] or 0),
-                'pending_questions': Discussion.objects.filter(
-                    forum__course__instructor=user,
-                    discussion_type='question',
-                    is_resolved=False
-                ).count()
+                'total_courses': summary['total_courses'],
+                'published_courses': summary['published_courses'],
+                'total_students': summary['total_students'],
+                'avg_course_rating': summary['avg_course_rating'],
+                'pending_questions': summary['pending_questions']
             },
             'course_performance': [{
-                'course_title': course.title,
-                'students': course.enrollments.filter(is_active=True).count(),
-                'avg_progress': float(course.enrollments.aggregate(avg=Avg('progress_percentage'))['avg'] or 0),
-                'rating': float(course.reviews.aggregate(avg=Avg('rating'))['avg'] or 0)
-            } for course in courses.select_related().prefetch_related('enrollments', 'reviews')]
+                'course_title': course['title'],
+                'students': course['students'],
+                'avg_progress': course['avg_progress'],
+                'rating': course['rating']
+            } for course in analytics['courses']]
         })
 
 class PlatformAnalyticsView(APIView):
@@ -571,7 +616,7 @@ class DashboardView(APIView):
     
     def _student_dashboard(self, user):
         enrollments = Enrollment.objects.filter(student=user, is_active=True)
-        recent_activities = ActivityLog.objects.filter(user=user).order_by('-created_at')[:5]
+        recent_activities = ActivityLog.objects.recent().filter(user=user).order_by('-created_at')[:5]
         
         return format_api_response(data={
             'role': 'student',
@@ -664,7 +709,137 @@ class DashboardSummaryView(APIView):
         
         return format_api_response(data=response_data)
 
+# Resumable Uploads
+def _upload_headers(session):
+    return {
+        'Upload-Offset': str(session.offset),
+        'Upload-Length': str(session.total_size),
+        'Tus-Resumable': '1.0.0',
+        'Cache-Control': 'no-store',
+    }
+
+class UploadSessionCreateView(APIView):
+    """POST /api/core/uploads/ - Start a resumable upload"""
+    permission_classes = [IsAuthenticated]
 
+    def post(self, request):
+        serializer = UploadSessionCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            session = uploads.create_session(
+                request.user,
+                purpose=data['purpose'],
+                filename=data['filename'],
+                total_size=data['size'],
+                target_uuid=data.get('target'),
+                content_type=data.get('content_type', ''),
+                metadata={k: data[k] for k in ('title', 'description') if data.get(k)},
+            )
+        except PermissionDenied as e:
+            return format_api_response(errors={'upload': [str(e)]}, status_code=status.HTTP_403_FORBIDDEN)
+        except ValidationError as e:
+            return format_api_response(errors={'upload': e.messages}, status_code=status.HTTP_400_BAD_REQUEST)
+
+        response = format_api_response(
+            data={**UploadSessionSerializer(session).data, 'chunk_size': settings.UPLOAD_MAX_CHUNK_SIZE},
+            message='Upload session created',
+            status_code=status.HTTP_201_CREATED
+        )
+        response['Location'] = request.build_absolute_uri(f"{request.path.rstrip('/')}/{session.uuid}/")
+        for header, value in _upload_headers(session).items():
+            response[header] = value
+        return response
 
+class UploadSessionDetailView(APIView):
+    """
+    HEAD /api/core/uploads/{uuid}/ - Current offset in Upload-Offset
+    GET /api/core/uploads/{uuid}/ - Upload session status
+    PATCH /api/core/uploads/{uuid}/ - Append a chunk (application/offset+octet-stream)
+    DELETE /api/core/uploads/{uuid}/ - Abort the upload
+    """
+    permission_classes = [IsAuthenticated]
 
+    def get_session(self, request, uuid):
+        return get_object_or_404(UploadSession, uuid=uuid, user=request.user)
+
+    def head(self, request, uuid):
+        session = self.get_session(request, uuid)
+        response = Response(status=status.HTTP_200_OK)
+        for header, value in _upload_headers(session).items():
+            response[header] = value
+        return response
+
+    def get(self, request, uuid):
+        session = self.get_session(request, uuid)
+        return format_api_response(data=UploadSessionSerializer(session).data)
+
+    def patch(self, request, uuid):
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = request.headers.get('Content-Length')
+            length = int(length) if length else None
+            checksum = uploads.parse_checksum_header(request.headers.get('Upload-Checksum'))
+        except ValueError:
+            return format_api_response(
+                errors={'offset': ['Upload-Offset header is required']},
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        except ValidationError as e:
+            return format_api_response(errors={'checksum': e.messages}, status_code=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Read the raw body so DRF never buffers it through a parser
+            session = uploads.write_chunk(uuid, request.user, request._request, offset, length, checksum)
+        except UploadSession.DoesNotExist:
+            return format_api_response(errors={'upload': ['Not found']}, status_code=status.HTTP_404_NOT_FOUND)
+        except uploads.OffsetMismatch as e:
+            response = format_api_response(
+                errors={'offset': [f'Expected offset {e.args[0]}']},
+                status_code=status.HTTP_409_CONFLICT
+            )
+            response['Upload-Offset'] = str(e.args[0])
+            return response
+        except uploads.ChecksumMismatch:
+            # 460 is the tus "Checksum Mismatch" status; the chunk was discarded
+            return format_api_response(errors={'checksum': ['Chunk checksum mismatch']}, status_code=460)
+        except ValidationError as e:
+            return format_api_response(errors={'upload': e.messages}, status_code=status.HTTP_400_BAD_REQUEST)
+
+        response = Response(status=status.HTTP_204_NO_CONTENT)
+        for header, value in _upload_headers(session).items():
+            response[header] = value
+        return response
+
+    def delete(self, request, uuid):
+        session = self.get_session(request, uuid)
+        if session.status == 'active':
+            uploads.abort_session(session)
+        return format_api_response(message='Upload aborted')
+
+class UploadSessionFinalizeView(APIView):
+    """POST /api/core/uploads/{uuid}/finalize/ - Verify and attach a completed upload"""
+    permission_classes = [IsAuthenticated]
 
+    def post(self, request, uuid):
+        try:
+            session, target = uploads.finalize_session(uuid, request.user, request.data.get('checksum'))
+        except UploadSession.DoesNotExist:
+            return format_api_response(errors={'upload': ['Not found']}, status_code=status.HTTP_404_NOT_FOUND)
+        except uploads.ChecksumMismatch:
+            return format_api_response(errors={'checksum': ['File checksum mismatch']}, status_code=460)
+        except PermissionDenied as e:
+            return format_api_response(errors={'upload': [str(e)]}, status_code=status.HTTP_403_FORBIDDEN)
+        except ValidationError as e:
+            return format_api_response(errors={'upload': e.messages}, status_code=status.HTTP_400_BAD_REQUEST)
+
+        stored_file = getattr(target, 'file', None) or getattr(target, 'file_attachment', None)
+        return format_api_response(
+            data={
+                **UploadSessionSerializer(session).data,
+                'target_uuid': str(target.uuid),
+                'file_url': stored_file.url if stored_file else None,
+            },
+            message='Upload completed'
+        )
@@ -1,10 +1,13 @@
 
 from django.contrib import admin
+from django.urls import reverse
 from .models import (
     Category, Tag, Course, Enrollment, Module, Lesson, LessonProgress, 
     Resource, Quiz, Question, Answer, QuizAttempt, QuestionResponse, 
-    Certificate, CourseReview, CourseFavorite, Assignment, AssignmentSubmission
+    Certificate, CourseReview, CourseFavorite, Assignment, AssignmentSubmission,
+    SimilarityMatch, DeadlineReminder
 )
+from . import certificates
 
 # Inline classes for better management in the admin panel
 
@@ -57,6 +60,7 @@ class CourseAdmin(admin.ModelAdmin):
     autocomplete_fields = ('instructor', 'category')
     filter_horizontal = ('tags', 'co_instructors')
     readonly_fields = ('published_at', 'views_count')
+    actions = ['reissue_course_certificates']
     fieldsets = (
         (None, {
             'fields': ('title', 'slug', 'instructor', 'description', 'short_description')
@@ -75,6 +79,13 @@ class CourseAdmin(admin.ModelAdmin):
         }),
     )
 
+    @admin.action(description='Reissue all certificates of selected courses')
+    def reissue_course_certificates(self, request, queryset):
+        for course in queryset:
+            job_id = certificates.queue_reissue(request.user, course_id=course.id)
+            url = reverse('courses:certificate-job', args=[job_id])
+            self.message_user(request, f"Reissue of {course.title} certificates queued. Progress: {url}")
+
 @admin.register(Enrollment)
 class EnrollmentAdmin(admin.ModelAdmin):
     list_display = ('student', 'course', 'status', 'enrolled_at', 'completed_at', 'progress_percentage')
@@ -148,11 +159,35 @@ class QuestionResponseAdmin(admin.ModelAdmin):
 
 @admin.register(Certificate)
 class CertificateAdmin(admin.ModelAdmin):
-    list_display = ('certificate_number', 'student', 'course', 'issue_date', 'is_valid')
-    list_filter = ('is_valid', 'course')
+    list_display = ('certificate_number', 'student', 'course', 'issue_date', 'is_valid', 'render_status')
+    list_filter = ('is_valid', 'render_status', 'course')
     search_fields = ('certificate_number', 'student__email', 'course__title')
-    readonly_fields = ('issue_date', 'created_at', 'updated_at', 'pdf_file', 'qr_code')
+    readonly_fields = ('issue_date', 'created_at', 'updated_at', 'pdf_file', 'qr_code', 'render_status', 'rendered_at')
     autocomplete_fields = ('student', 'course', 'enrollment')
+    actions = ['reissue_certificates', 'revoke_certificates', 'restore_certificates']
+
+    def _report_job(self, request, job_id, label):
+        url = reverse('courses:certificate-job', args=[job_id])
+        self.message_user(request, f"{label} queued for {certificates.get_job(job_id)['total']} certificates. Progress: {url}")
+
+    @admin.action(description='Reissue selected certificates (re-sign and re-render)')
+    def reissue_certificates(self, request, queryset):
+        job_id = certificates.queue_reissue(request.user, certificate_ids=list(queryset.values_list('id', flat=True)))
+        self._report_job(request, job_id, 'Reissue')
+
+    @admin.action(description='Revoke selected certificates')
+    def revoke_certificates(self, request, queryset):
+        job_id = certificates.queue_validity_change(
+            request.user, False, certificate_ids=list(queryset.values_list('id', flat=True))
+        )
+        self._report_job(request, job_id, 'Revocation')
+
+    @admin.action(description='Restore selected certificates')
+    def restore_certificates(self, request, queryset):
+        job_id = certificates.queue_validity_change(
+            request.user, True, certificate_ids=list(queryset.values_list('id', flat=True))
+        )
+        self._report_job(request, job_id, 'Restore')
 
 @admin.register(CourseReview)
 class CourseReviewAdmin(admin.ModelAdmin):
@@ -177,3 +212,16 @@ class AssignmentSubmissionAdmin(admin.ModelAdmin):
     list_filter = ('status', 'assignment__lesson__module__course')
     search_fields = ('student__email', 'assignment__title')
     readonly_fields = ('submission_date',)
+
+@admin.register(SimilarityMatch)
+class SimilarityMatchAdmin(admin.ModelAdmin):
+    list_display = ('assignment', 'submission', 'matched_submission', 'similarity', 'is_exact', 'created_at')
+    list_filter = ('is_exact', 'assignment__lesson__module__course')
+    search_fields = ('submission__student__email', 'matched_submission__student__email', 'assignment__title')
+    raw_id_fields = ('assignment', 'submission', 'matched_submission')
+
+@admin.register(DeadlineReminder)
+class DeadlineReminderAdmin(admin.ModelAdmin):
+    list_display = ('deadline_type', 'deadline_id', 'enrollment', 'hours_before', 'sent_at')
+    list_filter = ('deadline_type', 'hours_before')
+    raw_id_fields = ('enrollment',)
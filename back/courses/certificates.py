@@ -0,0 +1,519 @@
+# back/courses/certificates.py
+"""Certificate issuance, signed verification, PDF rendering and the background artifact pipeline."""
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.template import Context, Engine
+from django.utils import timezone
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+import hashlib
+import logging
+import multiprocessing
+import time
+import uuid
+
+from .pdf import build_pdf
+
+logger = logging.getLogger(__name__)
+
+RENDER_BATCH_SIZE = 50
+STALE_RENDER_MINUTES = 15
+SIGNING_SALT = 'courses.certificate'
+REVOKED_CACHE_KEY = 'certificates_revoked'
+REVOKED_CACHE_TIMEOUT = 60 * 60
+JOB_KEY = 'certificate_job_{}'
+JOB_COUNTER_KEY = 'certificate_job_{}_{}'
+JOB_TIMEOUT = 60 * 60 * 24
+JOB_CHUNK_SIZE = 100
+TEMPLATE_CACHE_SIZE = 128
+QR_MASK_PATTERN = 2
+
+DEFAULT_TEMPLATE = """
+<h3>Certificate of Completion</h3>
+<p>This certifies that</p>
+<h1>{{ student_name }}</h1>
+<p>has successfully completed the course</p>
+<h2>{{ course_title }}</h2>
+<p>on {{ completion_date }}{% if final_score %} with a final score of <b>{{ final_score }}%</b>{% endif %}</p>
+<br>
+<p><i>{{ instructor_name }}</i></p>
+"""
+
+_engine = Engine()
+_compiled_templates = {}
+
+
+# Rendering
+def compile_template(source):
+    """Parse a certificate template once per process, keyed by a hash of its content"""
+    key = hashlib.sha256(source.encode()).hexdigest()
+    template = _compiled_templates.get(key)
+    if template is None:
+        if len(_compiled_templates) >= TEMPLATE_CACHE_SIZE:
+            _compiled_templates.pop(next(iter(_compiled_templates)))
+        template = _compiled_templates[key] = _engine.from_string(source)
+    return template
+
+
+def qr_matrix(data):
+    import qrcode
+
+    # A fixed mask skips scoring all eight patterns, which dominates render time; any mask is valid
+    qr = qrcode.QRCode(version=None, border=2, mask_pattern=QR_MASK_PATTERN)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def qr_png(matrix, box_size=10):
+    """PNG of a QR module matrix, matching what Certificate.generate_qr_code used to draw"""
+    from PIL import Image
+
+    modules = len(matrix)
+    image = Image.frombytes('L', (modules, modules), bytes(0 if dark else 255 for row in matrix for dark in row))
+    buffer = BytesIO()
+    image.resize((modules * box_size, modules * box_size), Image.NEAREST).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def render_job(job):
+    """
+    (template_source, context, qr_data) -> (pdf_bytes, qr_png_bytes).
+
+    Depends only on its arguments and settings, so it can run in a pool worker without database access.
+    """
+    source, context, qr_data = job
+    html = compile_template(source or DEFAULT_TEMPLATE).render(Context(context))
+    matrix = qr_matrix(qr_data)
+    footer = f"Certificate {context['certificate_number']} - scan the QR code to verify"
+    pdf = build_pdf(
+        html, matrix, footer=footer, title=context['course_title'],
+        unicode_fonts=getattr(settings, 'CERTIFICATE_UNICODE_FONTS', None),
+    )
+    return pdf, qr_png(matrix)
+
+
+def certificate_job(certificate):
+    """Snapshot the fields a render needs; expects student and course loaded"""
+    course = certificate.course
+    context = {
+        'student_name': certificate.student.get_full_name() or certificate.student.email,
+        'course_title': course.title,
+        'completion_date': certificate.completion_date.strftime('%B %d, %Y'),
+        'issue_date': certificate.issue_date.strftime('%B %d, %Y'),
+        'final_score': f"{certificate.final_score:.0f}" if certificate.final_score is not None else '',
+        'certificate_number': certificate.certificate_number,
+        'instructor_name': course.instructor.get_full_name(),
+        'verification_url': certificate.verification_url,
+    }
+    return course.certificate_template, context, certificate.verification_url or str(certificate.uuid)
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def render_pool(workers):
+    """A process pool for batch renders, or None where child processes are not allowed (Celery prefork)"""
+    if workers <= 1 or multiprocessing.current_process().daemon:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+
+def render_jobs(jobs, pool=None, workers=1):
+    if pool is None:
+        return [render_job(job) for job in jobs]
+    return list(pool.map(render_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+
+def _attach_artifacts(certificate, pdf, png):
+    for field in (certificate.pdf_file, certificate.qr_code):
+        if field:
+            field.delete(save=False)
+    certificate.pdf_file.save(f"certificate_{certificate.certificate_number}.pdf", ContentFile(pdf), save=False)
+    certificate.qr_code.save(f"qr_{certificate.uuid}.png", ContentFile(png), save=False)
+    certificate.render_status = 'ready'
+    certificate.rendered_at = certificate.updated_at = timezone.now()
+
+
+def issue_certificate(enrollment):
+    """Create the certificate row for a completed enrollment; safe to call more than once"""
+    from courses.models import Certificate
+
+    completed_at = enrollment.completed_at or timezone.now()
+    certificate, created = Certificate.objects.get_or_create(
+        enrollment=enrollment,
+        defaults={
+            'student_id': enrollment.student_id,
+            'course_id': enrollment.course_id,
+            'completion_date': timezone.localdate(completed_at),
+            'final_score': enrollment.progress_percentage,
+            'verification_url': '',
+        }
+    )
+    if created:
+        certificate.verification_url = verification_url(certificate)
+        certificate.save(update_fields=['verification_url'])
+        transaction.on_commit(lambda: enqueue_render([certificate.id]))
+    return certificate, created
+
+
+# Verification
+def certificate_token(certificate):
+    """Compact signed payload carrying everything a verifier needs to display"""
+    return signing.dumps({
+        'n': certificate.certificate_number,
+        's': certificate.student.get_full_name() or certificate.student.email,
+        'c': certificate.course.title,
+        'i': certificate.issue_date.isoformat(),
+        'd': certificate.completion_date.isoformat(),
+        'x': certificate.expiry_date.isoformat() if certificate.expiry_date else None,
+    }, salt=SIGNING_SALT, compress=True)
+
+
+def verification_url(certificate):
+    return f"{settings.FRONTEND_URL.rstrip('/')}/certificates/verify/{certificate_token(certificate)}"
+
+
+def revoked_numbers():
+    """Certificate numbers with is_valid=False, served from the cache after the first load"""
+    from courses.models import Certificate
+
+    revoked = cache.get(REVOKED_CACHE_KEY)
+    if revoked is None:
+        revoked = frozenset(
+            Certificate.objects.filter(is_valid=False).values_list('certificate_number', flat=True)
+        )
+        cache.set(REVOKED_CACHE_KEY, revoked, REVOKED_CACHE_TIMEOUT)
+    return revoked
+
+
+def invalidate_revocations():
+    cache.delete(REVOKED_CACHE_KEY)
+
+
+def verify_token(token):
+    """
+    Check a certificate token without touching the certificates table.
+
+    Raises signing.BadSignature for forged or corrupted tokens.
+    """
+    payload = signing.loads(token, salt=SIGNING_SALT)
+    revoked = payload['n'] in revoked_numbers()
+    expired = bool(payload.get('x')) and payload['x'] < timezone.localdate().isoformat()
+    return {
+        'valid': not (revoked or expired),
+        'revoked': revoked,
+        'expired': expired,
+        'certificate_number': payload['n'],
+        'student_name': payload['s'],
+        'course_title': payload['c'],
+        'issue_date': payload['i'],
+        'completion_date': payload['d'],
+        'expiry_date': payload.get('x'),
+    }
+
+
+def enqueue_render(certificate_ids, job_id=None):
+    """Queue rendering in batches of RENDER_BATCH_SIZE"""
+    from courses.tasks import render_certificates_task
+
+    for start in range(0, len(certificate_ids), RENDER_BATCH_SIZE):
+        render_certificates_task.delay(certificate_ids[start:start + RENDER_BATCH_SIZE], job_id=job_id)
+
+
+def _claimable(stale_before):
+    """Pending or failed rows, plus 'rendering' rows whose worker appears to have died"""
+    return Q(render_status__in=['pending', 'failed']) | Q(render_status='rendering', updated_at__lt=stale_before)
+
+
+def claim(certificate_id):
+    """Move one certificate to 'rendering' unless another worker holds it or it is done"""
+    from courses.models import Certificate
+
+    stale = timezone.now() - timedelta(minutes=STALE_RENDER_MINUTES)
+    return Certificate.objects.filter(id=certificate_id).filter(
+        _claimable(stale)
+    ).update(render_status='rendering', updated_at=timezone.now()) == 1
+
+
+def render_batch(certificate_ids, pool=None, workers=1):
+    """
+    Render every claimable certificate in the batch.
+
+    Returns the ids that failed so the caller can retry just those.
+    """
+    from courses.models import Certificate
+
+    claimed = [cid for cid in certificate_ids if claim(cid)]
+    certificates = list(
+        Certificate.objects.filter(id__in=claimed).select_related('student', 'course__instructor')
+    )
+
+    failed = []
+    try:
+        results = render_jobs([certificate_job(c) for c in certificates], pool, workers)
+    except Exception as e:
+        # A pool failure loses the whole batch; fall back to rendering one at a time
+        logger.warning(f"Batch certificate render failed, retrying individually: {e}")
+        results = []
+        for certificate in certificates:
+            try:
+                results.append(render_job(certificate_job(certificate)))
+            except Exception as e:
+                logger.warning(f"Failed to render certificate {certificate.id}: {e}")
+                results.append(None)
+
+    rendered = []
+    for certificate, result in zip(certificates, results):
+        try:
+            if result is None:
+                raise ValueError('render failed')
+            _attach_artifacts(certificate, *result)
+            rendered.append(certificate)
+        except Exception as e:
+            logger.warning(f"Failed to store certificate {certificate.id}: {e}")
+            failed.append(certificate.id)
+
+    Certificate.objects.bulk_update(rendered, ['pdf_file', 'qr_code', 'render_status', 'rendered_at', 'updated_at'])
+    if failed:
+        Certificate.objects.filter(id__in=failed).update(render_status='failed', updated_at=timezone.now())
+
+    logger.info(f"Rendered {len(rendered)} certificates ({len(failed)} failed)")
+    return failed
+
+
+def render_course_certificates(course, workers=1, force=False, batch_size=200):
+    """
+    Render every certificate of a course through one process pool.
+
+    With force, certificates that are already rendered are redone (e.g. after
+    the course template changed). Returns a dict of counts and throughput.
+    """
+    from courses.models import Certificate
+
+    certificates = Certificate.objects.filter(course=course)
+    if force:
+        certificates.exclude(render_status='rendering').update(render_status='pending', updated_at=timezone.now())
+
+    stale = timezone.now() - timedelta(minutes=STALE_RENDER_MINUTES)
+    ids = list(certificates.filter(_claimable(stale)).order_by('id').values_list('id', flat=True))
+
+    started = time.perf_counter()
+    failed = []
+    pool = render_pool(workers)
+    try:
+        for start in range(0, len(ids), batch_size):
+            failed += render_batch(ids[start:start + batch_size], pool, workers)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    elapsed = time.perf_counter() - started
+    rendered = len(ids) - len(failed)
+    return {
+        'rendered': rendered,
+        'failed': len(failed),
+        'seconds': round(elapsed, 3),
+        'per_second': round(rendered / elapsed, 1) if elapsed and rendered else 0,
+    }
+
+
+def benchmark(count=200, worker_counts=(1, 2, 4), source=None):
+    """Render synthetic certificates in memory and report throughput per pool size"""
+    jobs = [(source, {
+        'student_name': f'Student {i:05d}',
+        'course_title': 'Benchmark Course: Introduction to Performance',
+        'completion_date': 'January 01, 2026',
+        'issue_date': 'January 01, 2026',
+        'final_score': '95',
+        'certificate_number': f'CERT-BENCH-{i:06X}',
+        'instructor_name': 'Benchmark Instructor',
+        'verification_url': f'https://example.com/certificates/verify/CERT-BENCH-{i:06X}',
+    }, f'https://example.com/certificates/verify/CERT-BENCH-{i:06X}') for i in range(count)]
+
+    _compiled_templates.clear()
+    started = time.perf_counter()
+    compile_template(source or DEFAULT_TEMPLATE)
+    cold = time.perf_counter() - started
+    started = time.perf_counter()
+    compile_template(source or DEFAULT_TEMPLATE)
+    warm = time.perf_counter() - started
+
+    results = []
+    for workers in worker_counts:
+        pool = render_pool(workers)
+        try:
+            if pool:
+                render_jobs(jobs[:workers], pool, workers)  # start the workers before timing
+            started = time.perf_counter()
+            pdfs = render_jobs(jobs, pool, workers)
+            elapsed = time.perf_counter() - started
+        finally:
+            if pool:
+                pool.shutdown()
+        results.append({
+            'workers': workers if pool else 1,
+            'seconds': round(elapsed, 3),
+            'per_second': round(count / elapsed, 1),
+            'avg_pdf_bytes': sum(len(pdf) for pdf, _ in pdfs) // count,
+        })
+
+    return {'count': count, 'compile_cold_ms': cold * 1000, 'compile_cached_ms': warm * 1000, 'runs': results}
+
+
+def pending_certificate_ids(limit=1000):
+    """Rows the sweep should pick up; 'failed' rows are left to the task's own retries"""
+    from courses.models import Certificate
+
+    stale = timezone.now() - timedelta(minutes=STALE_RENDER_MINUTES)
+    return list(
+        Certificate.objects.filter(
+            Q(render_status='pending') | Q(render_status='rendering', updated_at__lt=stale)
+        ).order_by('id').values_list('id', flat=True)[:limit]
+    )
+
+
+# Bulk jobs
+def start_job(kind, user, total, **extra):
+    """Create a progress record for a bulk reissue/revoke job and return its id"""
+    job_id = uuid.uuid4().hex
+    cache.set(JOB_KEY.format(job_id), {
+        'id': job_id,
+        'kind': kind,
+        'user_id': user.id if user else None,
+        'status': 'queued',
+        'total': total,
+        'created_at': timezone.now().isoformat(),
+        **extra,
+    }, JOB_TIMEOUT)
+    for counter in ('done', 'failed'):
+        cache.set(JOB_COUNTER_KEY.format(job_id, counter), 0, JOB_TIMEOUT)
+    return job_id
+
+
+def update_job(job_id, **fields):
+    job = cache.get(JOB_KEY.format(job_id))
+    if job:
+        job.update(fields)
+        cache.set(JOB_KEY.format(job_id), job, JOB_TIMEOUT)
+
+
+def record_job_progress(job_id, done=0, failed=0):
+    """Atomic counters so parallel render tasks can report into one job"""
+    for counter, amount in (('done', done), ('failed', failed)):
+        if amount:
+            try:
+                cache.incr(JOB_COUNTER_KEY.format(job_id, counter), amount)
+            except ValueError:
+                pass  # job record expired
+
+
+def get_job(job_id):
+    job = cache.get(JOB_KEY.format(job_id))
+    if not job:
+        return None
+
+    counters = cache.get_many([JOB_COUNTER_KEY.format(job_id, c) for c in ('done', 'failed')])
+    job['done'] = counters.get(JOB_COUNTER_KEY.format(job_id, 'done'), 0)
+    job['failed'] = counters.get(JOB_COUNTER_KEY.format(job_id, 'failed'), 0)
+    if job['status'] == 'running' and job['done'] + job['failed'] >= job['total']:
+        job['status'] = 'failed' if job['failed'] else 'completed'
+    job['percent'] = round(100 * (job['done'] + job['failed']) / job['total'], 1) if job['total'] else 100.0
+    return job
+
+
+def _job_queryset(course_id=None, certificate_ids=None):
+    from courses.models import Certificate
+
+    certificates = Certificate.objects.order_by('id')
+    if course_id is not None:
+        certificates = certificates.filter(course_id=course_id)
+    if certificate_ids is not None:
+        certificates = certificates.filter(id__in=certificate_ids)
+    return certificates
+
+
+def queue_reissue(user, course_id=None, certificate_ids=None):
+    from courses.tasks import reissue_certificates_task
+
+    total = _job_queryset(course_id, certificate_ids).count()
+    job_id = start_job('reissue', user, total, course_id=course_id)
+    transaction.on_commit(lambda: reissue_certificates_task.delay(job_id, course_id, certificate_ids))
+    return job_id
+
+
+def queue_validity_change(user, is_valid, course_id=None, certificate_ids=None):
+    from courses.tasks import set_certificates_validity_task
+
+    total = _job_queryset(course_id, certificate_ids).exclude(is_valid=is_valid).count()
+    job_id = start_job('restore' if is_valid else 'revoke', user, total, course_id=course_id)
+    transaction.on_commit(lambda: set_certificates_validity_task.delay(job_id, is_valid, course_id, certificate_ids))
+    return job_id
+
+
+def reissue_certificates(job_id, course_id=None, certificate_ids=None):
+    """
+    Re-sign and re-render certificates after a course title, template or branding change.
+
+    Streams the rows in chunks, refreshing each verification link (so the
+    signed payload carries the new details) and handing every chunk to the
+    render queue, where Celery workers render the chunks in parallel.
+    """
+    certificates = _job_queryset(course_id, certificate_ids).select_related('student', 'course')
+
+    update_job(job_id, status='running')
+    chunk = []
+    for certificate in certificates.iterator(chunk_size=JOB_CHUNK_SIZE):
+        chunk.append(certificate)
+        if len(chunk) == JOB_CHUNK_SIZE:
+            _queue_reissue(chunk, job_id)
+            chunk = []
+    if chunk:
+        _queue_reissue(chunk, job_id)
+
+
+def _queue_reissue(certificates, job_id):
+    from courses.models import Certificate
+
+    now = timezone.now()
+    for certificate in certificates:
+        certificate.verification_url = verification_url(certificate)
+        certificate.render_status = 'pending'
+        certificate.updated_at = now
+    Certificate.objects.bulk_update(certificates, ['verification_url', 'render_status', 'updated_at'])
+    enqueue_render([c.id for c in certificates], job_id=job_id)
+
+
+def set_certificates_validity(job_id, is_valid, course_id=None, certificate_ids=None):
+    """Revoke (or restore) certificates in chunked UPDATEs, then refresh the revocation cache"""
+    certificates = _job_queryset(course_id, certificate_ids).exclude(is_valid=is_valid)
+
+    update_job(job_id, status='running')
+    chunk = []
+    ids = certificates.values_list('id', flat=True).iterator(chunk_size=JOB_CHUNK_SIZE * 10)
+    for certificate_id in ids:
+        chunk.append(certificate_id)
+        if len(chunk) == JOB_CHUNK_SIZE * 10:
+            _apply_validity(chunk, is_valid, job_id)
+            chunk = []
+    if chunk:
+        _apply_validity(chunk, is_valid, job_id)
+
+    invalidate_revocations()
+    update_job(job_id, status='completed', finished_at=timezone.now().isoformat())
+
+
+def _apply_validity(certificate_ids, is_valid, job_id):
+    from courses.models import Certificate
+
+    updated = Certificate.objects.filter(id__in=certificate_ids).update(is_valid=is_valid, updated_at=timezone.now())
+    record_job_progress(job_id, done=updated)
+    # Verification picks revocations up chunk by chunk rather than only at the end
+    invalidate_revocations()
@@ -0,0 +1,157 @@
+# back/courses/gradebook.py
+"""CSV gradebook round-trip for assignment submissions."""
+from django.db import transaction
+from django.utils import timezone
+from decimal import Decimal, InvalidOperation
+import codecs
+import csv
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = [
+    'submission_uuid', 'student_email', 'student_name', 'status',
+    'submitted_at', 'grade', 'max_points', 'feedback',
+]
+BATCH_SIZE = 500
+FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+
+class _Echo:
+    """Write-through buffer so csv.writer yields rows instead of accumulating them"""
+
+    def write(self, value):
+        return value
+
+
+def _safe_cell(value):
+    """Keep spreadsheet apps from evaluating user text as a formula"""
+    value = str(value)
+    return "'" + value if value.startswith(FORMULA_PREFIXES) else value
+
+
+def _unsafe_cell(value):
+    return value[1:] if value.startswith("'") and value[1:].startswith(FORMULA_PREFIXES) else value
+
+
+def export_rows(assignment):
+    """CSV lines for every submission, streamed straight from the database cursor"""
+    from courses.models import AssignmentSubmission
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+
+    submissions = AssignmentSubmission.objects.filter(assignment=assignment).select_related(
+        'student'
+    ).order_by('student__last_name', 'student__first_name', 'id')
+
+    for submission in submissions.iterator(chunk_size=BATCH_SIZE):
+        yield writer.writerow([
+            submission.uuid,
+            submission.student.email,
+            _safe_cell(submission.student.get_full_name()),
+            submission.status,
+            submission.submission_date.isoformat(),
+            '' if submission.grade is None else submission.grade,
+            assignment.max_points,
+            _safe_cell(submission.feedback),
+        ])
+
+
+def _parse_grade(value, max_points):
+    try:
+        grade = Decimal(value.replace(',', '.'))
+    except InvalidOperation:
+        return None, f"Grade '{value}' is not a number"
+    if not grade.is_finite() or grade < 0 or grade > max_points:
+        return None, f"Grade must be between 0 and {max_points}"
+    return grade.quantize(Decimal('0.01')), None
+
+
+def import_grades(assignment, grader, file, dry_run=False):
+    """
+    Apply grades and feedback from a gradebook CSV.
+
+    Rows match submissions by submission_uuid, falling back to student_email.
+    Rows with an empty grade are skipped. Everything is validated before one
+    bulk_update, and graded students get a single batched notification job.
+    """
+    from courses.models import AssignmentSubmission
+
+    submissions = list(
+        AssignmentSubmission.objects.filter(assignment=assignment).select_related('student')
+    )
+    by_uuid = {str(s.uuid): s for s in submissions}
+    by_email = {s.student.email.lower(): s for s in submissions}
+
+    errors, changed, seen = [], [], set()
+    try:
+        reader = csv.DictReader(codecs.iterdecode(file, 'utf-8-sig'))
+        for row in reader:
+            row = {(k or '').strip().lower(): (v or '').strip() for k, v in row.items()}
+            line = reader.line_num
+
+            submission = by_uuid.get(row.get('submission_uuid', '')) or \
+                by_email.get(row.get('student_email', '').lower())
+            if submission is None:
+                errors.append({'line': line, 'errors': ['No submission matches this row']})
+                continue
+            if submission.id in seen:
+                errors.append({'line': line, 'errors': ['Submission appears more than once']})
+                continue
+            seen.add(submission.id)
+
+            if not row.get('grade'):
+                continue
+            grade, error = _parse_grade(row['grade'], assignment.max_points)
+            if error:
+                errors.append({'line': line, 'errors': [error]})
+                continue
+
+            feedback = _unsafe_cell(row['feedback']) if 'feedback' in row else submission.feedback
+            if grade == submission.grade and feedback == submission.feedback and submission.status == 'graded':
+                continue
+
+            submission.grade = grade
+            submission.feedback = feedback
+            changed.append(submission)
+    except (csv.Error, UnicodeDecodeError) as e:
+        errors.append({'line': None, 'errors': [f'Could not parse file: {e}']})
+
+    report = {
+        'dry_run': dry_run,
+        'rows_matched': len(seen),
+        'graded': len(changed),
+        'errors': errors,
+    }
+    if errors or dry_run or not changed:
+        return report
+
+    now = timezone.now()
+    for submission in changed:
+        submission.graded_by = grader
+        submission.graded_at = now
+        submission.status = 'graded'
+
+    with transaction.atomic():
+        AssignmentSubmission.objects.bulk_update(
+            changed, ['grade', 'feedback', 'graded_by', 'graded_at', 'status'], batch_size=BATCH_SIZE
+        )
+        transaction.on_commit(lambda: _notify_graded(assignment, changed))
+
+    logger.info(f"Imported {len(changed)} grades for assignment {assignment.id}")
+    return report
+
+
+def _notify_graded(assignment, submissions):
+    from core.tasks import send_bulk_notifications_task
+
+    course = assignment.lesson.module.course
+    send_bulk_notifications_task.delay([{
+        'recipient_id': submission.student_id,
+        'notification_type': 'system',
+        'title': f'Assignment graded: {assignment.title}',
+        'message': f'Your submission was graded {submission.grade}/{assignment.max_points}.',
+        'course_id': course.id,
+        'lesson_id': assignment.lesson_id,
+    } for submission in submissions])
@@ -0,0 +1,279 @@
+# back/courses/grading.py
+"""Batch grading of quiz attempts."""
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+import logging
+import re
+import unicodedata
+
+from .irt import get_item_bank
+from .leaderboards import schedule_quiz_results
+from .quiz_sessions import load_served
+
+logger = logging.getLogger(__name__)
+
+AUTO_GRADED_TYPES = ('multiple_choice', 'true_false')
+MAX_CACHED_VERDICTS = 10000
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_NUMERIC_RANGE_RE = re.compile(r'^#\s*(-?[\d.]+)\s*\.\.\s*(-?[\d.]+)$')
+_NUMERIC_TOLERANCE_RE = re.compile(r'^#\s*(-?[\d.]+)(?:\s*(?::|±|\+-)\s*([\d.]+))?$')
+_REGEX_RE = re.compile(r'^/(.+)/([imsx]*)$', re.DOTALL)
+
+
+def normalize_text(value):
+    """Unicode-normalize, case-fold and collapse whitespace"""
+    value = unicodedata.normalize('NFKC', value or '').casefold()
+    return _WHITESPACE_RE.sub(' ', value).strip().strip('.')
+
+
+def _to_decimal(value):
+    try:
+        number = Decimal(value.replace(',', '.').strip())
+    except (InvalidOperation, AttributeError):
+        return None
+    return number if number.is_finite() else None
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance, giving up with limit + 1 once it is exceeded"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) < len(b):
+        a, b = b, a
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class ShortAnswerMatcher:
+    """
+    Compiled set of accepted answers for one short-answer question.
+
+    Accepted answer syntax (Answer.answer_text of correct answers):
+        plain text      matched after case/whitespace folding
+        ~text           also accepts small typos (edit distance)
+        #3.14:0.01      numeric value with tolerance
+        #1..5           numeric range
+        /^colou?r$/i    regular expression
+    """
+
+    def __init__(self, specs):
+        self.exact = set()
+        self.fuzzy = []
+        self.numeric = []
+        self.patterns = []
+        self._verdicts = {}
+        ratio = getattr(settings, 'SHORT_ANSWER_MAX_EDIT_RATIO', 0.2)
+
+        for spec in specs:
+            spec = (spec or '').strip()
+            if not spec:
+                continue
+
+            regex_match = _REGEX_RE.match(spec)
+            if regex_match:
+                flags = 0
+                for flag in regex_match.group(2):
+                    flags |= {'i': re.IGNORECASE, 'm': re.MULTILINE, 's': re.DOTALL, 'x': re.VERBOSE}[flag]
+                try:
+                    self.patterns.append(re.compile(regex_match.group(1), flags))
+                except re.error as e:
+                    logger.warning(f"Invalid short answer pattern {spec!r}: {e}")
+                continue
+
+            range_match = _NUMERIC_RANGE_RE.match(spec)
+            if range_match:
+                low, high = _to_decimal(range_match.group(1)), _to_decimal(range_match.group(2))
+                if low is not None and high is not None:
+                    self.numeric.append((min(low, high), max(low, high)))
+                continue
+
+            tolerance_match = _NUMERIC_TOLERANCE_RE.match(spec)
+            if tolerance_match:
+                value = _to_decimal(tolerance_match.group(1))
+                tolerance = _to_decimal(tolerance_match.group(2) or '0')
+                if value is not None and tolerance is not None:
+                    self.numeric.append((value - tolerance, value + tolerance))
+                continue
+
+            if spec.startswith('~'):
+                text = normalize_text(spec[1:])
+                self.exact.add(text)
+                self.fuzzy.append((text, max(1, int(len(text) * ratio))))
+                continue
+
+            self.exact.add(normalize_text(spec))
+
+    def matches(self, response):
+        raw = (response or '').strip()
+        if not raw:
+            return False
+
+        text = normalize_text(raw)
+        if text in self.exact:
+            return True
+
+        # Cohorts repeat the same wrong answers, so remember verdicts for the slow paths
+        verdict = self._verdicts.get(raw)
+        if verdict is None:
+            verdict = self._match_slow(raw, text)
+            if len(self._verdicts) < MAX_CACHED_VERDICTS:
+                self._verdicts[raw] = verdict
+        return verdict
+
+    def _match_slow(self, raw, text):
+        if self.numeric:
+            number = _to_decimal(raw)
+            try:
+                if number is not None and any(low <= number <= high for low, high in self.numeric):
+                    return True
+            except InvalidOperation:
+                pass
+
+        if any(pattern.fullmatch(raw) for pattern in self.patterns):
+            return True
+
+        return any(edit_distance(text, accepted, limit) <= limit for accepted, limit in self.fuzzy)
+
+
+@lru_cache(maxsize=4096)
+def _compiled_matcher(question_id, specs):
+    return ShortAnswerMatcher(specs)
+
+
+def get_short_answer_matcher(question):
+    """Matcher cached per question; edited answers produce a new cache key"""
+    specs = tuple(a.answer_text for a in question.answers.all() if a.is_correct)
+    return _compiled_matcher(question.id, specs)
+
+
+def _load_question_banks(quiz_ids):
+    """{quiz_id: [Question, ...]} with answers prefetched, one query per table"""
+    from courses.models import Question
+
+    banks = {}
+    questions = Question.objects.filter(quiz_id__in=quiz_ids).prefetch_related('answers')
+    for question in questions:
+        banks.setdefault(question.quiz_id, []).append(question)
+    return banks
+
+
+def _grade_response(question, value):
+    """Return (selected_answer, text, is_correct, points_earned) for one response"""
+    value = value or {}
+    text = value.get('text', '') or ''
+
+    if question.question_type in AUTO_GRADED_TYPES:
+        answer_uuid = str(value.get('answer') or '')
+        selected = next((a for a in question.answers.all() if str(a.uuid) == answer_uuid), None)
+        is_correct = bool(selected and selected.is_correct)
+        return selected, text, is_correct, Decimal(question.points if is_correct else 0)
+
+    if question.question_type == 'short_answer':
+        is_correct = get_short_answer_matcher(question).matches(text)
+        return None, text, is_correct, Decimal(question.points if is_correct else 0)
+
+    # Essays wait for manual grading
+    return None, text, None, Decimal(0)
+
+
+def response_outcomes(questions, responses):
+    """[(question_id, is_correct)] for auto-gradable responses, used for ability estimates"""
+    outcomes = []
+    for question in questions:
+        value = responses.get(str(question.uuid))
+        if value is None:
+            continue
+        is_correct = _grade_response(question, value)[2]
+        if is_correct is not None:
+            outcomes.append((question.id, is_correct))
+    return outcomes
+
+
+@transaction.atomic
+def grade_attempts(attempts, responses_by_attempt):
+    """
+    Grade many open attempts at once.
+
+    responses_by_attempt maps attempt.id to {question_uuid: {'answer'|'text': value}}.
+    Writes all QuestionResponse rows with one bulk_create and all attempts with one bulk_update.
+    """
+    from courses.models import QuestionResponse, QuizAttempt
+
+    attempts = [a for a in attempts if a.completed_at is None]
+    if not attempts:
+        return []
+
+    banks = _load_question_banks({a.quiz_id for a in attempts})
+    served = load_served([a for a in attempts if a.quiz.is_adaptive])
+    now = timezone.now()
+    new_responses = []
+
+    for attempt in attempts:
+        quiz = attempt.quiz
+        submitted = responses_by_attempt.get(attempt.id, {})
+        questions = banks.get(attempt.quiz_id, [])
+        if quiz.is_adaptive:
+            # Adaptive learners are graded on the questions they were served; unanswered ones score zero
+            served_uuids = served.get(attempt.id, set())
+            questions = [q for q in questions if str(q.uuid) in served_uuids]
+
+        total_points = sum(q.points for q in questions)
+        earned_points = Decimal(0)
+        outcomes = []
+
+        for question in questions:
+            value = submitted.get(str(question.uuid))
+            if value is None:
+                continue
+            selected, text, is_correct, points = _grade_response(question, value)
+            earned_points += points
+            if is_correct is not None:
+                outcomes.append((question.id, is_correct))
+            new_responses.append(QuestionResponse(
+                attempt=attempt,
+                question=question,
+                selected_answer=selected,
+                text_response=text,
+                is_correct=is_correct,
+                points_earned=points,
+            ))
+
+        score = round(earned_points / total_points * 100, 2) if total_points else Decimal(0)
+        elapsed = int((now - attempt.started_at).total_seconds())
+        if quiz.time_limit_minutes:
+            elapsed = min(elapsed, quiz.time_limit_minutes * 60)
+
+        attempt.score = score
+        attempt.passed = score >= quiz.passing_score
+        attempt.completed_at = now
+        attempt.time_taken_seconds = elapsed
+        if quiz.is_adaptive:
+            attempt.ability_estimate = get_item_bank(quiz.id).estimate_ability(
+                [qid for qid, _ in outcomes], [correct for _, correct in outcomes]
+            )[0]
+
+    QuestionResponse.objects.bulk_create(new_responses, ignore_conflicts=True)
+    QuizAttempt.objects.bulk_update(
+        attempts, ['score', 'passed', 'completed_at', 'time_taken_seconds', 'ability_estimate']
+    )
+
+    schedule_quiz_results(attempts)
+
+    logger.info(f"Graded {len(attempts)} quiz attempts ({len(new_responses)} responses)")
+    return attempts
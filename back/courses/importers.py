@@ -0,0 +1,376 @@
+# back/courses/importers.py
+"""Bulk question import from CSV, Moodle GIFT and QTI XML."""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+import codecs
+import csv
+import logging
+import math
+import re
+import xml.etree.ElementTree as ET
+
+logger = logging.getLogger(__name__)
+
+QUESTION_TYPES = ('multiple_choice', 'true_false', 'short_answer', 'essay')
+MAX_QUESTIONS_PER_IMPORT = 5000
+BATCH_SIZE = 500
+
+FORMAT_EXTENSIONS = {
+    'csv': 'csv',
+    'gift': 'gift',
+    'txt': 'gift',
+    'xml': 'qti',
+    'qti': 'qti',
+}
+
+
+def _question(line, text, question_type, answers=(), points=1, explanation='', problems=()):
+    return {
+        'line': line,
+        'question_text': (text or '').strip(),
+        'question_type': question_type,
+        'points': points,
+        'explanation': (explanation or '').strip(),
+        'answers': list(answers),
+        'problems': list(problems),
+    }
+
+
+def _answer(text, is_correct=False, feedback=''):
+    return {'answer_text': (text or '').strip(), 'is_correct': is_correct, 'feedback': (feedback or '').strip()}
+
+
+def _number(value):
+    """float(value), or None when the file holds something that is not a finite number"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _decoded_lines(file):
+    return codecs.iterdecode(file, 'utf-8-sig')
+
+
+# CSV
+def parse_csv(file):
+    """
+    One question per row with a header:
+        question_text, question_type, points, explanation, answers, correct
+    answers are separated by '|'; correct holds 1-based positions or answer texts, also '|'-separated.
+    True/false rows may leave answers empty and put true/false in correct.
+    """
+    reader = csv.DictReader(_decoded_lines(file))
+    for row in reader:
+        row = {(k or '').strip().lower(): (v or '').strip() for k, v in row.items()}
+        question_type = row.get('question_type') or 'multiple_choice'
+        options = [a.strip() for a in row.get('answers', '').split('|') if a.strip()]
+        correct = {c.strip().lower() for c in row.get('correct', '').split('|') if c.strip()}
+
+        if question_type == 'true_false' and not options:
+            options = ['True', 'False']
+        if question_type == 'short_answer' and not correct:
+            correct = {str(i) for i in range(1, len(options) + 1)}
+
+        answers = [
+            _answer(text, str(position) in correct or text.lower() in correct)
+            for position, text in enumerate(options, 1)
+        ]
+        yield _question(
+            reader.line_num, row.get('question_text'), question_type, answers,
+            points=row.get('points') or 1, explanation=row.get('explanation'),
+        )
+
+
+# GIFT
+_GIFT_ESCAPES = {'\\~': '\x01', '\\=': '\x02', '\\#': '\x03', '\\{': '\x04', '\\}': '\x05', '\\:': '\x06'}
+_GIFT_UNESCAPES = {v: k[1] for k, v in _GIFT_ESCAPES.items()}
+_GIFT_TITLE_RE = re.compile(r'^::(.*?)::')
+_GIFT_FORMAT_RE = re.compile(r'^\[(html|moodle|plain|markdown)\]')
+_GIFT_ANSWER_RE = re.compile(r'([=~])(%-?[\d.]+%)?([^=~]*)')
+
+
+def _gift_unescape(value):
+    for placeholder, char in _GIFT_UNESCAPES.items():
+        value = value.replace(placeholder, char)
+    return value.strip()
+
+
+def _gift_split_feedback(value):
+    text, _, feedback = value.partition('#')
+    return _gift_unescape(text), _gift_unescape(feedback)
+
+
+def _parse_gift_record(line, record):
+    for escape, placeholder in _GIFT_ESCAPES.items():
+        record = record.replace(escape, placeholder)
+
+    record = _GIFT_TITLE_RE.sub('', record.strip()).strip()
+    if '{' not in record or '}' not in record:
+        return _question(line, _gift_unescape(record), 'unsupported')
+
+    stem, _, rest = record.partition('{')
+    body, _, tail = rest.rpartition('}')
+    text = _gift_unescape(_GIFT_FORMAT_RE.sub('', (stem + ' ' + tail).strip()))
+    body = body.strip()
+
+    if not body:
+        return _question(line, text, 'essay')
+
+    head, _, feedback = body.partition('#')
+    if head.strip().upper() in ('T', 'TRUE', 'F', 'FALSE'):
+        is_true = head.strip().upper().startswith('T')
+        return _question(line, text, 'true_false', [
+            _answer('True', is_true), _answer('False', not is_true),
+        ], explanation=_gift_unescape(feedback))
+
+    if body.startswith('#'):
+        # Numeric answers map onto the short-answer matcher syntax (#value:tolerance, #low..high)
+        answers = [
+            _answer('#' + _gift_split_feedback(spec)[0], True)
+            for spec in body[1:].split('=') if spec.strip()
+        ]
+        return _question(line, text, 'short_answer', answers)
+
+    answers, problems = [], []
+    has_distractors = False
+    for marker, weight, value in _GIFT_ANSWER_RE.findall(body):
+        answer_text, answer_feedback = _gift_split_feedback(value)
+        if marker == '~':
+            has_distractors = True
+            percent = _number(weight.strip('%')) if weight else 0
+            if percent is None:
+                problems.append(f"Invalid answer weight '{weight}'")
+            is_correct = bool(percent and percent > 0)
+        else:
+            is_correct = True
+        answers.append(_answer(answer_text, is_correct, answer_feedback))
+
+    question_type = 'multiple_choice' if has_distractors else 'short_answer'
+    return _question(line, text, question_type, answers, problems=problems)
+
+
+def parse_gift(file):
+    """Moodle GIFT: questions separated by blank lines, '//' comments and $CATEGORY skipped"""
+    record, start = [], 0
+    for number, raw in enumerate(_decoded_lines(file), 1):
+        stripped = raw.strip()
+        if stripped.startswith('//') or stripped.startswith('$CATEGORY'):
+            continue
+        if stripped:
+            if not record:
+                start = number
+            record.append(raw.rstrip('\r\n'))
+            continue
+        if record:
+            yield _parse_gift_record(start, '\n'.join(record))
+            record = []
+    if record:
+        yield _parse_gift_record(start, '\n'.join(record))
+
+
+# QTI
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _text(element):
+    return ' '.join(''.join(element.itertext()).split()) if element is not None else ''
+
+
+def _children(element, name):
+    return [child for child in element.iter() if _local(child.tag) == name]
+
+
+def _first(element, name):
+    if element is None:
+        return None
+    return next(iter(_children(element, name)), None)
+
+
+def _parse_qti2_item(position, item):
+    correct_response = _first(item, 'correctResponse')
+    correct = {_text(value) for value in _children(correct_response, 'value')} if correct_response is not None else set()
+    body = _first(item, 'itemBody')
+    explanation = _text(_first(item, 'modalFeedback'))
+
+    choice = _first(item, 'choiceInteraction')
+    if choice is not None:
+        answers = [
+            _answer(_text(option), option.get('identifier') in correct)
+            for option in _children(choice, 'simpleChoice')
+        ]
+        prompt = _text(_first(choice, 'prompt'))
+        stem = ' '.join(_text(child) for child in (body if body is not None else []) if _local(child.tag) != 'choiceInteraction')
+        labels = {a['answer_text'].lower() for a in answers}
+        question_type = 'true_false' if len(answers) == 2 and labels == {'true', 'false'} else 'multiple_choice'
+        return _question(position, ' '.join(filter(None, [stem, prompt])), question_type, answers, explanation=explanation)
+
+    if _first(item, 'extendedTextInteraction') is not None:
+        return _question(position, _text(body), 'essay', explanation=explanation)
+
+    if _first(item, 'textEntryInteraction') is not None:
+        return _question(
+            position, _text(body), 'short_answer', [_answer(value, True) for value in correct],
+            explanation=explanation,
+        )
+
+    return _question(position, _text(body) or item.get('title', ''), 'unsupported')
+
+
+def _parse_qti1_item(position, item):
+    stem = _text(_first(_first(item, 'presentation'), 'mattext'))
+    correct, problems = set(), []
+    for condition in _children(item, 'respcondition'):
+        scores = [_number(_text(setvar) or 0) for setvar in _children(condition, 'setvar')]
+        if None in scores:
+            problems.append('Invalid score value in response condition')
+        elif any(score > 0 for score in scores):
+            correct.update(_text(value) for value in _children(condition, 'varequal'))
+
+    labels = _children(item, 'response_label')
+    if _first(item, 'response_lid') is not None and labels:
+        answers = [_answer(_text(label), label.get('ident') in correct) for label in labels]
+        texts = {a['answer_text'].lower() for a in answers}
+        question_type = 'true_false' if len(answers) == 2 and texts == {'true', 'false'} else 'multiple_choice'
+        return _question(position, stem, question_type, answers, problems=problems)
+
+    if _first(item, 'response_str') is not None:
+        if correct:
+            return _question(
+                position, stem, 'short_answer', [_answer(value, True) for value in correct], problems=problems
+            )
+        return _question(position, stem, 'essay', problems=problems)
+
+    return _question(position, stem or item.get('title', ''), 'unsupported', problems=problems)
+
+
+def parse_qti(file):
+    """QTI 2.x assessmentItem or QTI 1.2 item elements, parsed incrementally with iterparse"""
+    position = 0
+    for _, element in ET.iterparse(file, events=('end',)):
+        name = _local(element.tag)
+        if name == 'assessmentItem':
+            position += 1
+            yield _parse_qti2_item(position, element)
+            element.clear()
+        elif name == 'item':
+            position += 1
+            yield _parse_qti1_item(position, element)
+            element.clear()
+
+
+PARSERS = {
+    'csv': parse_csv,
+    'gift': parse_gift,
+    'qti': parse_qti,
+}
+
+
+def detect_format(filename, declared=None):
+    file_format = (declared or '').lower() or FORMAT_EXTENSIONS.get(filename.rsplit('.', 1)[-1].lower())
+    if file_format not in PARSERS:
+        raise ValidationError(f"Unsupported question format. Use one of: {', '.join(PARSERS)}")
+    return file_format
+
+
+def validate_question(item):
+    """Return a list of problems with one parsed question"""
+    errors = list(item.get('problems', ()))
+    question_type = item['question_type']
+    answers = item['answers']
+    correct = sum(1 for a in answers if a['is_correct'])
+
+    if not item['question_text']:
+        errors.append('Question text is required')
+    if question_type not in QUESTION_TYPES:
+        errors.append(f"Unsupported question type '{question_type}'")
+
+    try:
+        item['points'] = int(item['points'])
+        if item['points'] < 1:
+            raise ValueError
+    except (TypeError, ValueError):
+        errors.append('Points must be a positive whole number')
+
+    if any(not a['answer_text'] for a in answers):
+        errors.append('Answers cannot be empty')
+    if question_type == 'multiple_choice' and (len(answers) < 2 or not correct):
+        errors.append('Multiple choice questions need at least two answers and one correct answer')
+    if question_type == 'true_false' and (len(answers) != 2 or correct != 1):
+        errors.append('True/false questions need exactly two answers with one correct')
+    if question_type == 'short_answer' and not correct:
+        errors.append('Short answer questions need at least one accepted answer')
+    if question_type == 'essay' and answers:
+        errors.append('Essay questions cannot have answers')
+
+    return errors
+
+
+def import_questions(quiz, file, file_format, dry_run=False):
+    """
+    Parse and validate every question in memory, then write them all or nothing.
+
+    Questions and answers are written with one bulk_create pass each; answers are
+    bound to the created questions by position. Returns a report dict.
+    """
+    from courses.models import Question, Answer
+    from courses.irt import invalidate_item_bank
+
+    items, errors = [], []
+    try:
+        for item in PARSERS[file_format](file):
+            if len(items) >= MAX_QUESTIONS_PER_IMPORT:
+                errors.append({'line': item['line'], 'errors': [
+                    f'Imports are limited to {MAX_QUESTIONS_PER_IMPORT} questions'
+                ]})
+                break
+            problems = validate_question(item)
+            if problems:
+                errors.append({'line': item['line'], 'errors': problems})
+            items.append(item)
+    except (csv.Error, ET.ParseError, UnicodeDecodeError, ValueError) as e:
+        errors.append({'line': None, 'errors': [f'Could not parse file: {e}']})
+
+    report = {
+        'format': file_format,
+        'dry_run': dry_run,
+        'questions': len(items),
+        'answers': sum(len(item['answers']) for item in items),
+        'errors': errors,
+        'created': False,
+    }
+    if errors or dry_run or not items:
+        return report
+
+    with transaction.atomic():
+        next_order = (Question.objects.filter(quiz=quiz).aggregate(m=Max('order'))['m'] or 0) + 1
+        questions = Question.objects.bulk_create([
+            Question(
+                quiz=quiz,
+                question_text=item['question_text'],
+                question_type=item['question_type'],
+                explanation=item['explanation'],
+                points=item['points'],
+                order=next_order + i,
+            ) for i, item in enumerate(items)
+        ], batch_size=BATCH_SIZE)
+
+        Answer.objects.bulk_create([
+            Answer(
+                question=question,
+                answer_text=answer['answer_text'],
+                is_correct=answer['is_correct'],
+                feedback=answer['feedback'],
+                order=position,
+            )
+            for question, item in zip(questions, items)
+            for position, answer in enumerate(item['answers'])
+        ], batch_size=BATCH_SIZE)
+
+    invalidate_item_bank(quiz.id)
+    report['created'] = True
+    logger.info(f"Imported {len(items)} {file_format} questions into quiz {quiz.id}")
+    return report
@@ -0,0 +1,210 @@
+# back/courses/irt.py
+"""Two-parameter logistic (2PL) item response theory for adaptive quizzes."""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BANK_VERSION_KEY = 'irt_bank_version_{}'
+BANK_TTL_SECONDS = 300
+
+DEFAULT_DISCRIMINATION = 1.0
+DEFAULT_DIFFICULTY = 0.0
+DISCRIMINATION_BOUNDS = (0.2, 4.0)
+DIFFICULTY_BOUNDS = (-4.0, 4.0)
+
+# Quadrature grid for expected-a-posteriori ability estimates under a N(0, 1) prior
+THETA_GRID = np.linspace(-4.0, 4.0, 81)
+LOG_PRIOR = -0.5 * THETA_GRID ** 2
+
+_banks = {}
+_banks_lock = threading.Lock()
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class ItemBank:
+    """Calibrated parameters of one quiz's questions as parallel numpy arrays"""
+
+    def __init__(self, question_ids, discrimination, difficulty, version=None):
+        self.question_ids = np.asarray(question_ids, dtype=np.int64)
+        self.a = np.asarray(discrimination, dtype=np.float64)
+        self.b = np.asarray(difficulty, dtype=np.float64)
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.index = {int(qid): i for i, qid in enumerate(self.question_ids)}
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def positions(self, question_ids):
+        return np.fromiter(
+            (self.index[qid] for qid in question_ids if qid in self.index), dtype=np.int64
+        )
+
+    def estimate_ability(self, question_ids, correct):
+        """EAP ability estimate and its standard error from answered items"""
+        positions = self.positions(question_ids)
+        outcomes = np.fromiter(
+            (bool(c) for qid, c in zip(question_ids, correct) if qid in self.index), dtype=np.float64
+        )
+        if not len(positions):
+            return 0.0, 1.0
+
+        p = _sigmoid(self.a[positions] * (THETA_GRID[:, None] - self.b[positions]))
+        log_likelihood = (outcomes * np.log(p) + (1 - outcomes) * np.log1p(-p)).sum(axis=1)
+
+        log_posterior = log_likelihood + LOG_PRIOR
+        weights = np.exp(log_posterior - log_posterior.max())
+        weights /= weights.sum()
+
+        theta = float(weights @ THETA_GRID)
+        se = float(np.sqrt(weights @ (THETA_GRID - theta) ** 2))
+        return theta, se
+
+    def next_question_id(self, theta, exclude=()):
+        """Unanswered question with maximum Fisher information at theta"""
+        p = _sigmoid(self.a * (theta - self.b))
+        information = self.a ** 2 * p * (1 - p)
+
+        excluded = self.positions(exclude)
+        if len(excluded):
+            information[excluded] = -1.0
+        if not len(information):
+            return None
+
+        best = int(information.argmax())
+        return None if information[best] < 0 else int(self.question_ids[best])
+
+
+def invalidate_item_bank(quiz_id):
+    try:
+        cache.incr(BANK_VERSION_KEY.format(quiz_id))
+    except ValueError:
+        cache.set(BANK_VERSION_KEY.format(quiz_id), 1, None)
+
+
+def get_item_bank(quiz_id):
+    """Per-process item bank, reloaded when calibration bumps the version or the TTL lapses"""
+    from courses.models import Question
+
+    version = cache.get(BANK_VERSION_KEY.format(quiz_id))
+    bank = _banks.get(quiz_id)
+    if bank is not None and bank.version == version and \
+            time.monotonic() - bank.loaded_at < BANK_TTL_SECONDS:
+        return bank
+
+    rows = list(
+        Question.objects.filter(quiz_id=quiz_id).exclude(question_type='essay')
+        .order_by('order', 'id').values_list('id', 'irt_discrimination', 'irt_difficulty')
+    )
+    bank = ItemBank(
+        [qid for qid, _, _ in rows],
+        [DEFAULT_DISCRIMINATION if a is None else a for _, a, _ in rows],
+        [DEFAULT_DIFFICULTY if b is None else b for _, _, b in rows],
+        version=version,
+    )
+    with _banks_lock:
+        _banks[quiz_id] = bank
+    return bank
+
+
+def fit_2pl(person_index, item_index, outcomes, n_persons, n_items, max_iter=100, tol=1e-4):
+    """
+    Joint maximum a posteriori fit of a 2PL model on long-format response arrays.
+
+    Alternates one Newton step for every ability and then every item at once,
+    using bincount to sum gradients, with N(0, 1) priors on ability and difficulty
+    and N(1, 1) on discrimination to keep sparse items finite.
+    """
+    theta = np.zeros(n_persons)
+    a = np.full(n_items, DEFAULT_DISCRIMINATION)
+    b = np.zeros(n_items)
+
+    for iteration in range(max_iter):
+        p = _sigmoid(a[item_index] * (theta[person_index] - b[item_index]))
+        residual = outcomes - p
+        weight = p * (1 - p)
+
+        grad = np.bincount(person_index, a[item_index] * residual, n_persons) - theta
+        hess = np.bincount(person_index, a[item_index] ** 2 * weight, n_persons) + 1.0
+        step_theta = np.clip(grad / hess, -1.0, 1.0)
+        theta += step_theta
+        theta = (theta - theta.mean()) / (theta.std() or 1.0)
+
+        distance = theta[person_index] - b[item_index]
+        p = _sigmoid(a[item_index] * distance)
+        residual = outcomes - p
+        weight = p * (1 - p)
+
+        grad_b = -np.bincount(item_index, a[item_index] * residual, n_items) - b
+        hess_b = np.bincount(item_index, a[item_index] ** 2 * weight, n_items) + 1.0
+        grad_a = np.bincount(item_index, distance * residual, n_items) - (a - DEFAULT_DISCRIMINATION)
+        hess_a = np.bincount(item_index, distance ** 2 * weight, n_items) + 1.0
+
+        step_b = np.clip(grad_b / hess_b, -1.0, 1.0)
+        step_a = np.clip(grad_a / hess_a, -0.5, 0.5)
+        b = np.clip(b + step_b, *DIFFICULTY_BOUNDS)
+        a = np.clip(a + step_a, *DISCRIMINATION_BOUNDS)
+
+        if max(np.abs(step_theta).max(), np.abs(step_a).max(), np.abs(step_b).max()) < tol:
+            break
+
+    return a, b, theta, iteration + 1
+
+
+def calibrate_quiz(quiz_id):
+    """Fit item parameters for one quiz from graded responses of completed attempts"""
+    from courses.models import Question, QuestionResponse
+
+    min_responses = getattr(settings, 'IRT_MIN_RESPONSES_PER_ITEM', 30)
+
+    rows = np.array(
+        QuestionResponse.objects.filter(
+            question__quiz_id=quiz_id,
+            attempt__completed_at__isnull=False,
+            is_correct__isnull=False,
+        ).values_list('attempt_id', 'question_id', 'is_correct'),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    if not len(rows):
+        return 0
+
+    persons, person_index = np.unique(rows[:, 0], return_inverse=True)
+    items, item_index = np.unique(rows[:, 1], return_inverse=True)
+
+    a, b, _, iterations = fit_2pl(
+        person_index, item_index, rows[:, 2].astype(np.float64), len(persons), len(items)
+    )
+
+    counts = np.bincount(item_index, minlength=len(items))
+    calibrated = {int(qid): (float(a[i]), float(b[i])) for i, qid in enumerate(items) if counts[i] >= min_responses}
+    if not calibrated:
+        return 0
+
+    now = timezone.now()
+    questions = list(Question.objects.filter(id__in=calibrated))
+    for question in questions:
+        question.irt_discrimination, question.irt_difficulty = calibrated[question.id]
+        question.irt_calibrated_at = now
+
+    with transaction.atomic():
+        Question.objects.bulk_update(
+            questions, ['irt_discrimination', 'irt_difficulty', 'irt_calibrated_at'], batch_size=500
+        )
+    invalidate_item_bank(quiz_id)
+
+    logger.info(
+        f"Calibrated {len(questions)} questions for quiz {quiz_id} "
+        f"from {len(rows)} responses in {iterations} iterations"
+    )
+    return len(questions)
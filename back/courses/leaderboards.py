@@ -0,0 +1,237 @@
+# back/courses/leaderboards.py
+"""Quiz and course leaderboards kept incrementally in sorted sets."""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from bisect import bisect_left, insort
+import logging
+import threading
+
+from core.utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+QUIZ_BOARD_KEY = 'leaderboard_quiz_{}'
+COURSE_BOARD_KEY = 'leaderboard_course_{}'
+
+# Quiz boards rank by best score, then by fastest time: score_cents * TIME_SLOTS + (TIME_SLOTS - 1 - seconds)
+TIME_SLOTS = 10 ** 6
+
+
+def encode_quiz_score(score, time_taken_seconds):
+    seconds = min(int(time_taken_seconds or 0), TIME_SLOTS - 1)
+    return int(round(float(score or 0) * 100)) * TIME_SLOTS + (TIME_SLOTS - 1 - seconds)
+
+
+def decode_quiz_score(value):
+    value = int(value)
+    return value // TIME_SLOTS / 100, TIME_SLOTS - 1 - value % TIME_SLOTS
+
+
+def quiz_points(score):
+    """Course leaderboard points contributed by a quiz's best score"""
+    return int(round(float(score or 0)))
+
+
+class RedisLeaderboard:
+    """Leaderboard on a Redis sorted set: O(log n) updates and rank lookups"""
+
+    def __init__(self, redis, key):
+        self.redis = redis
+        self.key = cache.make_key(key)
+
+    def set_best(self, member, score):
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.zscore(self.key, member)
+        pipe.zadd(self.key, {member: score}, gt=True)
+        previous, _ = pipe.execute()
+        return previous
+
+    def increment(self, member, amount):
+        if amount:
+            self.redis.zincrby(self.key, amount, member)
+
+    def top(self, n):
+        return [(int(member), score) for member, score in self.redis.zrevrange(self.key, 0, n - 1, withscores=True)]
+
+    def rank(self, member):
+        pipe = self.redis.pipeline()
+        pipe.zrevrank(self.key, member)
+        pipe.zscore(self.key, member)
+        rank, score = pipe.execute()
+        return rank, score
+
+    def size(self):
+        return self.redis.zcard(self.key)
+
+    def replace(self, entries):
+        if not entries:
+            self.redis.delete(self.key)
+            return
+        staging = f"{self.key}:rebuild"
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(staging)
+        pipe.zadd(staging, entries)
+        pipe.rename(staging, self.key)
+        pipe.execute()
+
+
+class LocalLeaderboard:
+    """In-process stand-in for a sorted set, used when the cache is not Redis"""
+
+    _boards = {}
+    _lock = threading.Lock()
+
+    def __init__(self, key):
+        with self._lock:
+            self.scores, self.order = self._boards.setdefault(key, ({}, []))
+
+    def _put(self, member, score):
+        previous = self.scores.get(member)
+        if previous is not None:
+            del self.order[bisect_left(self.order, (-previous, member))]
+        self.scores[member] = score
+        insort(self.order, (-score, member))
+        return previous
+
+    def set_best(self, member, score):
+        with self._lock:
+            previous = self.scores.get(member)
+            if previous is None or score > previous:
+                self._put(member, score)
+            return previous
+
+    def increment(self, member, amount):
+        if amount:
+            with self._lock:
+                self._put(member, self.scores.get(member, 0) + amount)
+
+    def top(self, n):
+        with self._lock:
+            return [(member, -negative) for negative, member in self.order[:n]]
+
+    def rank(self, member):
+        with self._lock:
+            score = self.scores.get(member)
+            if score is None:
+                return None, None
+            return bisect_left(self.order, (-score, member)), score
+
+    def size(self):
+        return len(self.scores)
+
+    def replace(self, entries):
+        with self._lock:
+            self.scores.clear()
+            self.scores.update(entries)
+            self.order[:] = sorted((-score, member) for member, score in entries.items())
+
+
+def get_board(key):
+    redis = get_redis_client()
+    if redis is not None:
+        return RedisLeaderboard(redis, key)
+    return LocalLeaderboard(key)
+
+
+def quiz_board(quiz_id):
+    return get_board(QUIZ_BOARD_KEY.format(quiz_id))
+
+
+def course_board(course_id):
+    return get_board(COURSE_BOARD_KEY.format(course_id))
+
+
+def record_quiz_results(attempts):
+    """Fold completed attempts into quiz boards and add point gains to course boards"""
+    for attempt in attempts:
+        if attempt.completed_at is None or attempt.score is None:
+            continue
+        try:
+            previous = quiz_board(attempt.quiz_id).set_best(
+                attempt.student_id, encode_quiz_score(attempt.score, attempt.time_taken_seconds)
+            )
+            old_points = quiz_points(decode_quiz_score(previous)[0]) if previous is not None else 0
+            gained = quiz_points(attempt.score) - old_points
+            if gained > 0:
+                course_board(attempt.quiz.course_id).increment(attempt.student_id, gained)
+        except Exception as e:
+            # Boards are rebuilt nightly, so a failed update must not fail grading
+            logger.warning(f"Failed to update leaderboard for attempt {attempt.id}: {e}")
+
+
+def record_lesson_completion(enrollment, lesson):
+    if not lesson.points:
+        return
+    try:
+        course_board(enrollment.course_id).increment(enrollment.student_id, lesson.points)
+    except Exception as e:
+        logger.warning(f"Failed to update course leaderboard for enrollment {enrollment.id}: {e}")
+
+
+def schedule_quiz_results(attempts):
+    """Update boards only once the grading transaction has committed"""
+    attempts = list(attempts)
+    transaction.on_commit(lambda: record_quiz_results(attempts))
+
+
+def leaderboard_entries(board, user, limit=10):
+    """Top-N rows plus the requesting user's rank, decorated with names in one query"""
+    from django.contrib.auth import get_user_model
+    User = get_user_model()
+
+    top = board.top(limit)
+    rank, score = board.rank(user.id)
+
+    users = User.objects.in_bulk([member for member, _ in top])
+    entries = [{
+        'rank': position + 1,
+        'user_uuid': str(users[member].uuid) if member in users else None,
+        'name': users[member].get_full_name() if member in users else '',
+        'score': value,
+    } for position, (member, value) in enumerate(top)]
+
+    return entries, {
+        'rank': rank + 1 if rank is not None else None,
+        'score': score,
+        'total': board.size(),
+    }
+
+
+def rebuild_leaderboards():
+    """Recompute every quiz and course board from the database"""
+    from courses.models import QuizAttempt, LessonProgress
+
+    quiz_entries = {}
+    course_entries = {}
+
+    best_attempts = QuizAttempt.objects.filter(
+        completed_at__isnull=False, score__isnull=False
+    ).order_by('quiz_id', 'student_id', '-score', 'time_taken_seconds').values_list(
+        'quiz_id', 'quiz__course_id', 'student_id', 'score', 'time_taken_seconds'
+    )
+
+    seen = set()
+    for quiz_id, course_id, student_id, score, seconds in best_attempts.iterator(chunk_size=2000):
+        if (quiz_id, student_id) in seen:
+            continue
+        seen.add((quiz_id, student_id))
+        quiz_entries.setdefault(quiz_id, {})[student_id] = encode_quiz_score(score, seconds)
+        course = course_entries.setdefault(course_id, {})
+        course[student_id] = course.get(student_id, 0) + quiz_points(score)
+
+    lesson_points = LessonProgress.objects.filter(
+        is_completed=True, lesson__points__gt=0
+    ).values('enrollment__course_id', 'enrollment__student_id').annotate(points=Sum('lesson__points'))
+
+    for row in lesson_points.iterator():
+        course = course_entries.setdefault(row['enrollment__course_id'], {})
+        student_id = row['enrollment__student_id']
+        course[student_id] = course.get(student_id, 0) + row['points']
+
+    for quiz_id, entries in quiz_entries.items():
+        quiz_board(quiz_id).replace(entries)
+    for course_id, entries in course_entries.items():
+        course_board(course_id).replace(entries)
+
+    return len(quiz_entries), len(course_entries)
@@ -0,0 +1,114 @@
+# Generated by Django 5.2 on 2026-10-19 02:07
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='category',
+            options={'ordering': ['order', 'name', 'id'], 'verbose_name': 'Category', 'verbose_name_plural': 'Categories'},
+        ),
+        migrations.AlterModelOptions(
+            name='certificate',
+            options={'ordering': ['-issue_date', 'id'], 'verbose_name': 'Certificate', 'verbose_name_plural': 'Certificates'},
+        ),
+        migrations.AlterModelOptions(
+            name='course',
+            options={'ordering': ['-created_at', 'id'], 'verbose_name': 'Course', 'verbose_name_plural': 'Courses'},
+        ),
+        migrations.AlterModelOptions(
+            name='coursereview',
+            options={'ordering': ['-created_at', 'id'], 'verbose_name': 'Course Review', 'verbose_name_plural': 'Course Reviews'},
+        ),
+        migrations.AlterModelOptions(
+            name='module',
+            options={'ordering': ['course', 'order', 'id'], 'verbose_name': 'Module', 'verbose_name_plural': 'Modules'},
+        ),
+        migrations.AlterModelOptions(
+            name='question',
+            options={'ordering': ['quiz', 'order', 'id'], 'verbose_name': 'Question', 'verbose_name_plural': 'Questions'},
+        ),
+        migrations.AlterModelOptions(
+            name='quiz',
+            options={'ordering': ['course', 'created_at', 'id'], 'verbose_name': 'Quiz', 'verbose_name_plural': 'Quizzes'},
+        ),
+        migrations.AlterModelOptions(
+            name='quizattempt',
+            options={'ordering': ['-started_at', 'id'], 'verbose_name': 'Quiz Attempt', 'verbose_name_plural': 'Quiz Attempts'},
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='views_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Views Count'),
+        ),
+        migrations.CreateModel(
+            name='Assignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('title', models.CharField(max_length=200, verbose_name='Assignment Title')),
+                ('description', models.TextField(verbose_name='Description')),
+                ('due_date', models.DateTimeField()),
+                ('max_points', models.PositiveIntegerField(default=100)),
+                ('allowed_file_extensions', models.CharField(blank=True, help_text="Comma-separated list of extensions, e.g., 'pdf,docx,zip'", max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('lesson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignments', to='courses.lesson')),
+            ],
+            options={
+                'verbose_name': 'Assignment',
+                'verbose_name_plural': 'Assignments',
+                'ordering': ['lesson', 'due_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AssignmentSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('submission_date', models.DateTimeField(auto_now_add=True)),
+                ('file', models.FileField(blank=True, null=True, upload_to='assignments/submissions/')),
+                ('text_submission', models.TextField(blank=True)),
+                ('grade', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('feedback', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('submitted', 'Submitted'), ('graded', 'Graded'), ('late', 'Late'), ('resubmitted', 'Resubmitted')], default='submitted', max_length=20)),
+                ('graded_at', models.DateTimeField(blank=True, null=True)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='courses.assignment')),
+                ('enrollment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignment_submissions', to='courses.enrollment')),
+                ('graded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='graded_submissions', to=settings.AUTH_USER_MODEL)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignment_submissions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Assignment Submission',
+                'verbose_name_plural': 'Assignment Submissions',
+                'ordering': ['-submission_date'],
+                'unique_together': {('assignment', 'student')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CourseFavorite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorites', to='courses.course')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorite_courses', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Course Favorite',
+                'verbose_name_plural': 'Course Favorites',
+                'ordering': ['-created_at', 'id'],
+                'unique_together': {('course', 'user')},
+            },
+        ),
+    ]
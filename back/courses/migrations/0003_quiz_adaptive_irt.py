@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-19 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_sync_model_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='irt_calibrated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='irt_difficulty',
+            field=models.FloatField(blank=True, null=True, verbose_name='IRT Difficulty'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='irt_discrimination',
+            field=models.FloatField(blank=True, null=True, verbose_name='IRT Discrimination'),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='adaptive_question_count',
+            field=models.PositiveIntegerField(blank=True, help_text='Questions served per adaptive attempt (all when empty)', null=True, verbose_name='Adaptive Question Count'),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='is_adaptive',
+            field=models.BooleanField(default=False, verbose_name='Adaptive'),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='ability_estimate',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2 on 2026-10-19 02:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_quiz_adaptive_irt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionSignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minhash', models.BinaryField(help_text='MinHash signature as packed uint32 values')),
+                ('shingle_count', models.PositiveIntegerField(default=0)),
+                ('text_hash', models.CharField(blank=True, max_length=64)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submission_signatures', to='courses.assignment')),
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='signature', to='courses.assignmentsubmission')),
+            ],
+            options={
+                'verbose_name': 'Submission Signature',
+                'verbose_name_plural': 'Submission Signatures',
+            },
+        ),
+        migrations.CreateModel(
+            name='SimilarityMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('similarity', models.FloatField(help_text='Estimated Jaccard similarity of word shingles')),
+                ('is_exact', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarity_matches', to='courses.assignment')),
+                ('matched_submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='courses.assignmentsubmission')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarity_matches', to='courses.assignmentsubmission')),
+            ],
+            options={
+                'verbose_name': 'Similarity Match',
+                'verbose_name_plural': 'Similarity Matches',
+                'ordering': ['-similarity', 'id'],
+                'constraints': [models.UniqueConstraint(fields=('submission', 'matched_submission'), name='unique_similarity_pair')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SimilarityBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_hash', models.BigIntegerField()),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarity_buckets', to='courses.assignment')),
+                ('signature', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buckets', to='courses.submissionsignature')),
+            ],
+            options={
+                'verbose_name': 'Similarity Bucket',
+                'verbose_name_plural': 'Similarity Buckets',
+                'indexes': [models.Index(fields=['assignment', 'bucket_hash'], name='courses_sim_assignm_0ce3c4_idx')],
+            },
+        ),
+    ]
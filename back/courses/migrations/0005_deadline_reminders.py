@@ -0,0 +1,45 @@
+# Generated by Django 5.2 on 2026-10-19 02:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_submission_similarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeadlineReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('deadline_type', models.CharField(choices=[('assignment', 'Assignment'), ('quiz', 'Quiz')], max_length=20)),
+                ('deadline_id', models.PositiveBigIntegerField()),
+                ('hours_before', models.PositiveIntegerField()),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Deadline Reminder',
+                'verbose_name_plural': 'Deadline Reminders',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['due_date'], name='courses_ass_due_dat_e405cf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['available_until'], name='courses_qui_availab_872975_idx'),
+        ),
+        migrations.AddField(
+            model_name='deadlinereminder',
+            name='enrollment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deadline_reminders', to='courses.enrollment'),
+        ),
+        migrations.AddConstraint(
+            model_name='deadlinereminder',
+            constraint=models.UniqueConstraint(fields=('deadline_type', 'deadline_id', 'enrollment', 'hours_before'), name='unique_deadline_reminder'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-19 02:22
+
+from django.db import migrations, models
+
+
+def mark_existing_ready(apps, schema_editor):
+    # Certificates created before the pipeline already had their QR code rendered on save
+    Certificate = apps.get_model('courses', 'Certificate')
+    Certificate.objects.exclude(qr_code='').exclude(qr_code__isnull=True).update(render_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_deadline_reminders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='render_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('rendering', 'Rendering'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='rendered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_existing_ready, migrations.RunPython.noop),
+    ]
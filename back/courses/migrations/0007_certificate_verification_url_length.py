@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 02:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_certificate_render_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='certificate',
+            name='verification_url',
+            field=models.URLField(blank=True, max_length=500),
+        ),
+    ]
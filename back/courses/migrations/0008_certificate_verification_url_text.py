@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_certificate_verification_url_length'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='certificate',
+            name='verification_url',
+            field=models.TextField(blank=True),
+        ),
+    ]
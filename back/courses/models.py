@@ -1,13 +1,11 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator, FileExtensionValidator
 from django.utils import timezone
 from django.template.loader import render_to_string
 import uuid
-import qrcode
-from io import BytesIO
-from django.core.files import File
+from django.core.files.base import ContentFile
 
 User = get_user_model()
 
@@ -296,6 +294,13 @@ class Quiz(models.Model):
     randomize_answers = models.BooleanField(default=True)
     show_correct_answers = models.BooleanField(default=True)
     
+    # Adaptive mode serves one question at a time, chosen from the learner's ability estimate
+    is_adaptive = models.BooleanField(default=False, verbose_name=_('Adaptive'))
+    adaptive_question_count = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name=_('Adaptive Question Count'),
+        help_text=_('Questions served per adaptive attempt (all when empty)')
+    )
+    
     available_from = models.DateTimeField(null=True, blank=True)
     available_until = models.DateTimeField(null=True, blank=True)
     
@@ -307,6 +312,9 @@ class Quiz(models.Model):
         verbose_name = _('Quiz')
         verbose_name_plural = _('Quizzes')
         ordering = ['course', 'created_at', 'id']
+        indexes = [
+            models.Index(fields=['available_until']),
+        ]
 
     def __str__(self):
         return f"{self.course.title} - {self.title}"
@@ -332,6 +340,11 @@ class Question(models.Model):
     
     is_required = models.BooleanField(default=True)
     
+    # 2PL item response theory parameters, calibrated offline from responses
+    irt_difficulty = models.FloatField(null=True, blank=True, verbose_name=_('IRT Difficulty'))
+    irt_discrimination = models.FloatField(null=True, blank=True, verbose_name=_('IRT Discrimination'))
+    irt_calibrated_at = models.DateTimeField(null=True, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -375,6 +388,7 @@ class QuizAttempt(models.Model):
     passed = models.BooleanField(default=False)
     
     time_taken_seconds = models.PositiveIntegerField(null=True, blank=True)
+    ability_estimate = models.FloatField(null=True, blank=True)
     
     attempt_number = models.PositiveIntegerField(default=1)
 
@@ -434,9 +448,20 @@ class Certificate(models.Model):
     qr_code = models.ImageField(upload_to='certificates/qrcodes/', null=True, blank=True)
     
     # Verification
-    verification_url = models.URLField(blank=True)
+    # Unbounded: the signed token carries the student name and course title
+    verification_url = models.TextField(blank=True)
     is_valid = models.BooleanField(default=True)
     
+    # Artifact rendering (QR code, PDF) happens in a background pipeline
+    RENDER_STATUS_CHOICES = [
+        ('pending', _('Pending')),
+        ('rendering', _('Rendering')),
+        ('ready', _('Ready')),
+        ('failed', _('Failed')),
+    ]
+    render_status = models.CharField(max_length=20, choices=RENDER_STATUS_CHOICES, default='pending', db_index=True)
+    rendered_at = models.DateTimeField(null=True, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -450,11 +475,17 @@ class Certificate(models.Model):
         return f"{self.certificate_number} - {self.student.email} - {self.course.title}"
 
     def save(self, *args, **kwargs):
+        # Only the row is written here; QR and PDF files are rendered by courses.tasks.render_certificates_task
         if not self.certificate_number:
             self.certificate_number = self.generate_certificate_number()
-        if not self.qr_code:
-            self.generate_qr_code()
+        adding = self._state.adding
         super().save(*args, **kwargs)
+        
+        # Signed verification links consult a cached revocation set; drop it whenever is_valid may have changed
+        update_fields = kwargs.get('update_fields')
+        if not (adding and self.is_valid) and (update_fields is None or 'is_valid' in update_fields):
+            from courses.certificates import invalidate_revocations
+            transaction.on_commit(invalidate_revocations)
 
     def generate_certificate_number(self):
         import datetime
@@ -464,17 +495,10 @@ class Certificate(models.Model):
         return f"{prefix}-{year}-{random_part}"
 
     def generate_qr_code(self):
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        verification_data = f"{self.verification_url or self.uuid}"
-        qr.add_data(verification_data)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        
-        file_name = f"qr_{self.uuid}.png"
-        self.qr_code.save(file_name, File(buffer), save=False)
+        from courses.certificates import qr_matrix, qr_png
+
+        png = qr_png(qr_matrix(f"{self.verification_url or self.uuid}"))
+        self.qr_code.save(f"qr_{self.uuid}.png", ContentFile(png), save=False)
 
 # Reviews
 class CourseReview(models.Model):
@@ -539,6 +563,9 @@ class Assignment(models.Model):
         verbose_name = _('Assignment')
         verbose_name_plural = _('Assignments')
         ordering = ['lesson', 'due_date']
+        indexes = [
+            models.Index(fields=['due_date']),
+        ]
 
     def __str__(self):
         return f"{self.lesson.title} - {self.title}"
@@ -576,4 +603,84 @@ class AssignmentSubmission(models.Model):
         ordering = ['-submission_date']
 
     def __str__(self):
-        return f"{self.assignment.title} - {self.student.email}"
\ No newline at end of file
+        return f"{self.assignment.title} - {self.student.email}"
+
+
+# Submission Similarity
+class SubmissionSignature(models.Model):
+    submission = models.OneToOneField(AssignmentSubmission, on_delete=models.CASCADE, related_name='signature')
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='submission_signatures')
+    
+    minhash = models.BinaryField(help_text=_('MinHash signature as packed uint32 values'))
+    shingle_count = models.PositiveIntegerField(default=0)
+    text_hash = models.CharField(max_length=64, blank=True)
+    
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Submission Signature')
+        verbose_name_plural = _('Submission Signatures')
+
+    def __str__(self):
+        return f"Signature for {self.submission}"
+
+class SimilarityBucket(models.Model):
+    """LSH band bucket: signatures sharing a bucket are candidate near-duplicates"""
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='similarity_buckets')
+    signature = models.ForeignKey(SubmissionSignature, on_delete=models.CASCADE, related_name='buckets')
+    bucket_hash = models.BigIntegerField()
+
+    class Meta:
+        verbose_name = _('Similarity Bucket')
+        verbose_name_plural = _('Similarity Buckets')
+        indexes = [
+            models.Index(fields=['assignment', 'bucket_hash']),
+        ]
+
+class SimilarityMatch(models.Model):
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='similarity_matches')
+    submission = models.ForeignKey(AssignmentSubmission, on_delete=models.CASCADE, related_name='similarity_matches')
+    matched_submission = models.ForeignKey(AssignmentSubmission, on_delete=models.CASCADE, related_name='+')
+    
+    similarity = models.FloatField(help_text=_('Estimated Jaccard similarity of word shingles'))
+    is_exact = models.BooleanField(default=False)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Similarity Match')
+        verbose_name_plural = _('Similarity Matches')
+        ordering = ['-similarity', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['submission', 'matched_submission'], name='unique_similarity_pair'),
+        ]
+
+    def __str__(self):
+        return f"{self.submission_id} ~ {self.matched_submission_id} ({self.similarity:.0%})"
+
+# Deadline Reminders
+class DeadlineReminder(models.Model):
+    DEADLINE_TYPE_CHOICES = [
+        ('assignment', _('Assignment')),
+        ('quiz', _('Quiz')),
+    ]
+
+    enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, related_name='deadline_reminders')
+    deadline_type = models.CharField(max_length=20, choices=DEADLINE_TYPE_CHOICES)
+    deadline_id = models.PositiveBigIntegerField()
+    hours_before = models.PositiveIntegerField()
+    
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Deadline Reminder')
+        verbose_name_plural = _('Deadline Reminders')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['deadline_type', 'deadline_id', 'enrollment', 'hours_before'],
+                name='unique_deadline_reminder'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.deadline_type} {self.deadline_id} - {self.enrollment_id} ({self.hours_before}h)"
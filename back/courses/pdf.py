@@ -0,0 +1,560 @@
+# back/courses/pdf.py
+"""
+Minimal single-page PDF writer for certificates.
+
+Handles the HTML subset certificate templates use (headings, paragraphs,
+line breaks, bold/italic runs), lays it out centred on a landscape A4 page
+with the standard Helvetica fonts, and embeds a QR code as an image. Text
+outside Windows-1252, such as Arabic or Cyrillic names, is set in an
+embedded TrueType font (Type0, Identity-H) when one is supplied; Arabic
+letters are shaped into their presentation forms and right-to-left words
+are laid out in visual order. Pure Python with zlib only, so it runs without
+system libraries or network access.
+"""
+from functools import lru_cache
+from html.parser import HTMLParser
+import re
+import struct
+import unicodedata
+import zlib
+
+PAGE_WIDTH, PAGE_HEIGHT = 842, 595  # A4 landscape, points
+MARGIN = 72
+QR_SIZE = 96
+
+BLOCK_STYLES = {
+    'h1': (34, True),
+    'h2': (26, True),
+    'h3': (20, True),
+    'h4': (16, True),
+    'p': (14, False),
+    'div': (14, False),
+    'li': (14, False),
+}
+SMALL_SIZE = 9
+
+FONTS = {
+    (False, False): ('F1', 'Helvetica'),
+    (True, False): ('F2', 'Helvetica-Bold'),
+    (False, True): ('F3', 'Helvetica-Oblique'),
+    (True, True): ('F4', 'Helvetica-BoldOblique'),
+}
+
+# Glyph widths (1/1000 em) for ASCII 32-126 from the Adobe core font metrics; obliques share them
+_HELVETICA = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_HELVETICA_BOLD = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+DEFAULT_WIDTH = 556
+
+UNICODE_FONTS = {False: ('F5', 'CertificateSans'), True: ('F6', 'CertificateSans-Bold')}
+RTL_CLASSES = ('R', 'AL')
+
+
+def needs_unicode(text):
+    """True when text cannot be set in the WinAnsi-encoded standard fonts"""
+    try:
+        text.encode('cp1252')
+    except UnicodeEncodeError:
+        return True
+    return False
+
+
+# TrueType fonts
+class TrueTypeFont:
+    """Unicode cmap, advance widths and metrics of a TrueType font, read with struct"""
+
+    def __init__(self, data):
+        if data[:4] not in (b'\x00\x01\x00\x00', b'true'):
+            raise ValueError('Only fonts with TrueType outlines can be embedded')
+        self.data = data
+        count, = struct.unpack_from('>H', data, 4)
+        tables = {}
+        for index in range(count):
+            tag, _, offset, _ = struct.unpack_from('>4sIII', data, 12 + 16 * index)
+            tables[tag] = offset
+        head, hhea, hmtx, cmap = (tables[tag] for tag in (b'head', b'hhea', b'hmtx', b'cmap'))
+
+        self.units, = struct.unpack_from('>H', data, head + 18)
+        self.bbox = [value * 1000 // self.units for value in struct.unpack_from('>4h', data, head + 36)]
+        ascent, descent = struct.unpack_from('>hh', data, hhea + 4)
+        self.ascent, self.descent = ascent * 1000 // self.units, descent * 1000 // self.units
+        metrics, = struct.unpack_from('>H', data, hhea + 34)
+        self.advances = struct.unpack_from(f'>{metrics * 2}H', data, hmtx)[::2]
+        self.cmap = self._read_cmap(cmap)
+        self._compressed = None
+
+    def _read_cmap(self, offset):
+        data = self.data
+        count, = struct.unpack_from('>H', data, offset + 2)
+        subtables = {}
+        for index in range(count):
+            platform, encoding, start = struct.unpack_from('>HHI', data, offset + 4 + 8 * index)
+            subtables[(platform, encoding)] = offset + start
+
+        for key in ((3, 10), (0, 4), (3, 1), (0, 3)):
+            start = subtables.get(key)
+            if start is None:
+                continue
+            table_format, = struct.unpack_from('>H', data, start)
+            if table_format == 12:
+                return self._read_format_12(start)
+            if table_format == 4:
+                return self._read_format_4(start)
+        raise ValueError('Font has no Unicode cmap')
+
+    def _read_format_4(self, start):
+        data = self.data
+        segments = struct.unpack_from('>H', data, start + 6)[0] // 2
+        ends = struct.unpack_from(f'>{segments}H', data, start + 14)
+        firsts = struct.unpack_from(f'>{segments}H', data, start + 16 + 2 * segments)
+        deltas = struct.unpack_from(f'>{segments}h', data, start + 16 + 4 * segments)
+        range_offsets_at = start + 16 + 6 * segments
+
+        mapping = {}
+        for index, (first, end, delta) in enumerate(zip(firsts, ends, deltas)):
+            range_offset, = struct.unpack_from('>H', data, range_offsets_at + 2 * index)
+            for code in range(first, min(end, 0xFFFE) + 1):
+                if range_offset:
+                    glyph, = struct.unpack_from('>H', data, range_offsets_at + 2 * index + range_offset + 2 * (code - first))
+                    glyph = (glyph + delta) & 0xFFFF if glyph else 0
+                else:
+                    glyph = (code + delta) & 0xFFFF
+                if glyph:
+                    mapping[code] = glyph
+        return mapping
+
+    def _read_format_12(self, start):
+        groups, = struct.unpack_from('>I', self.data, start + 12)
+        mapping = {}
+        for index in range(groups):
+            first, last, glyph = struct.unpack_from('>III', self.data, start + 16 + 12 * index)
+            for code in range(first, last + 1):
+                mapping[code] = glyph + code - first
+        return mapping
+
+    def glyph(self, char):
+        return self.cmap.get(ord(char), 0)
+
+    def advance(self, glyph):
+        return self.advances[min(glyph, len(self.advances) - 1)] * 1000 / self.units
+
+    def width(self, text, size):
+        return sum(self.advance(self.glyph(char)) for char in text) * size / 1000
+
+    @property
+    def compressed(self):
+        if self._compressed is None:
+            self._compressed = zlib.compress(self.data)
+        return self._compressed
+
+
+@lru_cache(maxsize=8)
+def load_font(path):
+    """TrueTypeFont for path, or None when the file is missing or unusable"""
+    try:
+        with open(path, 'rb') as font_file:
+            return TrueTypeFont(font_file.read())
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+
+
+class EmbeddedFonts:
+    """The Unicode fonts of one document and the glyphs it has used from each"""
+
+    def __init__(self, paths):
+        paths = paths or {}
+        regular = load_font(paths['regular']) if paths.get('regular') else None
+        bold = load_font(paths['bold']) if paths.get('bold') else None
+        self.fonts = {False: regular, True: bold or regular}
+        self.used = {False: {}, True: {}}
+
+    def __bool__(self):
+        return self.fonts[False] is not None
+
+    def width(self, text, size, bold):
+        return self.fonts[bold].width(text, size)
+
+    def encode(self, text, bold):
+        """Identity-H hex string of glyph ids, remembering each glyph's character for ToUnicode"""
+        font, used = self.fonts[bold], self.used[bold]
+        glyphs = []
+        for char in text:
+            glyph = font.glyph(char)
+            used.setdefault(glyph, char)
+            glyphs.append(b'%04x' % glyph)
+        return b''.join(glyphs)
+
+
+# Arabic shaping and right-to-left order
+_JOINING_FORMS = ('ISOLATED', 'FINAL', 'INITIAL', 'MEDIAL')
+_ALEFS = '\u0622\u0623\u0625\u0627'
+_LAM = '\u0644'
+
+
+@lru_cache(maxsize=None)
+def _arabic_forms(char):
+    """Presentation forms of an Arabic letter, found by name (ARABIC LETTER BEH FINAL FORM)"""
+    if not '\u0620' <= char <= '\u06ff':
+        return {}
+    name = unicodedata.name(char, '')
+    forms = {}
+    for form in _JOINING_FORMS:
+        try:
+            forms[form] = unicodedata.lookup(f'{name} {form} FORM')
+        except KeyError:
+            pass
+    return forms
+
+
+def _joins_forward(char):
+    forms = _arabic_forms(char)
+    return 'INITIAL' in forms or 'MEDIAL' in forms
+
+
+def shape_arabic(text):
+    """Replace Arabic letters (logical order) with their contextual forms and lam-alef ligatures"""
+    letters = [index for index, char in enumerate(text) if unicodedata.category(char) != 'Mn']
+    shaped = list(text)
+    skip = set()
+    for position, index in enumerate(letters):
+        char = text[index]
+        forms = _arabic_forms(char)
+        if index in skip or not forms:
+            continue
+        previous = text[letters[position - 1]] if position else None
+        following = text[letters[position + 1]] if position + 1 < len(letters) else None
+        joins_previous = previous is not None and _joins_forward(previous) and letters[position - 1] not in skip
+
+        if char == _LAM and following is not None and following in _ALEFS:
+            alef = unicodedata.name(following)[len('ARABIC LETTER '):]
+            form = 'FINAL' if joins_previous else 'ISOLATED'
+            shaped[index] = unicodedata.lookup(f'ARABIC LIGATURE LAM WITH {alef} {form} FORM')
+            shaped[letters[position + 1]] = ''
+            skip.add(letters[position + 1])
+            continue
+
+        joins_next = following is not None and _joins_forward(char) and bool(_arabic_forms(following))
+        form = ('MEDIAL' if joins_next else 'FINAL') if joins_previous else ('INITIAL' if joins_next else 'ISOLATED')
+        shaped[index] = forms.get(form) or forms.get('ISOLATED', char)
+    return ''.join(shaped)
+
+
+def is_rtl(text):
+    return any(unicodedata.bidirectional(char) in RTL_CLASSES for char in text)
+
+
+def visual_word(word):
+    """A right-to-left word shaped and reversed for left-to-right drawing, combining marks kept after their base"""
+    if not is_rtl(word):
+        return word
+    clusters = []
+    for char in shape_arabic(word):
+        if clusters and unicodedata.category(char) == 'Mn':
+            clusters[-1] += char
+        else:
+            clusters.append(char)
+    return ''.join(reversed(clusters))
+
+
+def _first_strong_is_rtl(line):
+    for text, _, _ in line:
+        for char in text:
+            direction = unicodedata.bidirectional(char)
+            if direction in RTL_CLASSES:
+                return True
+            if direction == 'L':
+                return False
+    return False
+
+
+def text_width(text, size, bold=False, fonts=None):
+    if fonts and needs_unicode(text):
+        return fonts.width(text, size, bold)
+    widths = _HELVETICA_BOLD if bold else _HELVETICA
+    total = 0
+    for char in text:
+        code = ord(char) - 32
+        total += widths[code] if 0 <= code < len(widths) else DEFAULT_WIDTH
+    return total * size / 1000
+
+
+class _BlockParser(HTMLParser):
+    """Collects block-level elements as lists of (text, bold, italic) runs"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self._runs = []
+        self._style = BLOCK_STYLES['p']
+        self._bold = 0
+        self._italic = 0
+        self._skip = 0
+
+    def _flush(self):
+        text = ''.join(run[0] for run in self._runs).strip()
+        if text:
+            self.blocks.append((self._style, self._runs))
+        self._runs = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('style', 'script', 'head', 'title'):
+            self._skip += 1
+        elif tag in BLOCK_STYLES:
+            self._flush()
+            self._style = BLOCK_STYLES[tag]
+        elif tag == 'br':
+            self._flush()
+        elif tag in ('b', 'strong'):
+            self._bold += 1
+        elif tag in ('i', 'em'):
+            self._italic += 1
+
+    def handle_endtag(self, tag):
+        if tag in ('style', 'script', 'head', 'title'):
+            self._skip = max(0, self._skip - 1)
+        elif tag in BLOCK_STYLES:
+            self._flush()
+            self._style = BLOCK_STYLES['p']
+        elif tag in ('b', 'strong'):
+            self._bold = max(0, self._bold - 1)
+        elif tag in ('i', 'em'):
+            self._italic = max(0, self._italic - 1)
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._runs.append((re.sub(r'\s+', ' ', data), bool(self._bold), bool(self._italic)))
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def parse_blocks(html):
+    """HTML -> [((size, bold), [(text, bold, italic), ...]), ...]"""
+    parser = _BlockParser()
+    parser.feed(html)
+    parser.close()
+    return parser.blocks
+
+
+def _words(runs, block_bold):
+    """Split runs into (word, bold, italic) with spaces folded into word boundaries"""
+    words = []
+    for text, bold, italic in runs:
+        for index, word in enumerate(text.split(' ')):
+            if index and words:
+                words.append(None)  # boundary
+            if word:
+                words.append((visual_word(word), bold or block_bold, italic))
+    return words
+
+
+def _finish_line(line):
+    # A line that starts right-to-left reads from the right, so its words are drawn in reverse
+    return line[::-1] if _first_strong_is_rtl(line) else line
+
+
+def layout(blocks, width, fonts=None):
+    """Wrap blocks into lines of (size, [(text, bold, italic)], line_width)"""
+    lines = []
+    for (size, block_bold), runs in blocks:
+        line, line_width, pending_space = [], 0, False
+        for word in _words(runs, block_bold) + [None]:
+            if word is None:
+                pending_space = bool(line)
+                continue
+            text, bold, italic = word
+            gap = text_width(' ', size, bold) if pending_space else 0
+            word_width = text_width(text, size, bold, fonts)
+            if line and line_width + gap + word_width > width:
+                lines.append((size, _finish_line(line), line_width))
+                line, line_width, gap = [], 0, 0
+            if gap:
+                line.append((' ', bold, italic))
+            line.append((text, bold, italic))
+            line_width += gap + word_width
+            pending_space = False
+        if line:
+            lines.append((size, _finish_line(line), line_width))
+        lines.append((size, None, 0))  # paragraph spacing
+    return lines
+
+
+def _escape(text):
+    raw = text.encode('cp1252', errors='replace')
+    return raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def _pdf_string(text):
+    """Literal string for document metadata, UTF-16 when it does not fit the 8-bit encoding"""
+    if needs_unicode(text):
+        return b'<%s>' % ('\ufeff' + text).encode('utf-16-be').hex().encode()
+    return b'(%s)' % _escape(text)
+
+
+def _merge_runs(runs, fonts=None):
+    merged = []
+    for text, bold, italic in runs:
+        embedded = bool(fonts) and needs_unicode(text)
+        if merged and merged[-1][1:] == (bold, italic, embedded):
+            merged[-1] = (merged[-1][0] + text, bold, italic, embedded)
+        else:
+            merged.append((text, bold, italic, embedded))
+    return merged
+
+
+def _text_ops(x, y, size, runs, fonts=None):
+    ops = [b'BT', b'%.2f %.2f Td' % (x, y)]
+    for text, bold, italic, embedded in _merge_runs(runs, fonts):
+        if embedded:
+            ops.append(b'/%s %d Tf <%s> Tj' % (UNICODE_FONTS[bold][0].encode(), size, fonts.encode(text, bold)))
+        else:
+            ops.append(b'/%s %d Tf (%s) Tj' % (FONTS[(bold, italic)][0].encode(), size, _escape(text)))
+    ops.append(b'ET')
+    return ops
+
+
+def _to_unicode_cmap(used):
+    entries = [
+        b'<%04x> <%s>' % (glyph, char.encode('utf-16-be').hex().encode())
+        for glyph, char in sorted(used.items())
+    ]
+    chunks = [
+        b'%d beginbfchar\n%s\nendbfchar' % (len(entries[i:i + 100]), b'\n'.join(entries[i:i + 100]))
+        for i in range(0, len(entries), 100)
+    ]
+    return (
+        b'/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n'
+        b'/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def\n'
+        b'/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n'
+        b'1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n%s\n'
+        b'endcmap\nCMapName currentdict /CMap defineresource pop\nend\nend' % b'\n'.join(chunks)
+    )
+
+
+def _font_objects(objects, font, used, base_font):
+    """Append a Type0 font with its CID font, descriptor, font file and ToUnicode map; returns its number"""
+    objects.append(
+        b'<< /Length %d /Length1 %d /Filter /FlateDecode >>\nstream\n%s\nendstream'
+        % (len(font.compressed), len(font.data), font.compressed)
+    )
+    objects.append(
+        b'<< /Type /FontDescriptor /FontName /%s /Flags 32 /FontBBox [%d %d %d %d] /ItalicAngle 0 '
+        b'/Ascent %d /Descent %d /CapHeight %d /StemV 80 /FontFile2 %d 0 R >>'
+        % (base_font, *font.bbox, font.ascent, font.descent, font.ascent, len(objects))
+    )
+    widths = b' '.join(b'%d [%d]' % (glyph, round(font.advance(glyph))) for glyph in sorted(used))
+    objects.append(
+        b'<< /Type /Font /Subtype /CIDFontType2 /BaseFont /%s '
+        b'/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> '
+        b'/FontDescriptor %d 0 R /CIDToGIDMap /Identity /W [%s] >>' % (base_font, len(objects), widths)
+    )
+    cmap = zlib.compress(_to_unicode_cmap(used))
+    objects.append(b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(cmap), cmap))
+    objects.append(
+        b'<< /Type /Font /Subtype /Type0 /BaseFont /%s /Encoding /Identity-H '
+        b'/DescendantFonts [%d 0 R] /ToUnicode %d 0 R >>' % (base_font, len(objects) - 1, len(objects))
+    )
+    return len(objects)
+
+
+def _qr_image(matrix):
+    """Grayscale 8-bit image stream for a QR module matrix (True = dark)"""
+    rows = bytes(0 if dark else 255 for row in matrix for dark in row)
+    return len(matrix), zlib.compress(rows)
+
+
+def build_pdf(html, qr_matrix=None, footer='', title='', unicode_fonts=None):
+    """
+    Lay out certificate HTML on one page and return the PDF bytes.
+
+    unicode_fonts maps 'regular' and optionally 'bold' to TrueType files used
+    for text the standard fonts cannot encode; without them such text falls
+    back to '?'.
+    """
+    fonts = EmbeddedFonts(unicode_fonts)
+    text_width_limit = PAGE_WIDTH - 2 * MARGIN
+    lines = layout(parse_blocks(html), text_width_limit, fonts)
+    if lines:
+        lines.pop()  # trailing paragraph spacing
+
+    height = sum(size * (0.8 if runs is None else 1.35) for size, runs, _ in lines)
+    top = PAGE_HEIGHT - MARGIN
+    bottom = MARGIN + QR_SIZE * 0.6
+    y = top - max(0, (top - bottom - height) / 2)
+
+    ops = [
+        b'q 0.15 0.25 0.45 RG 3 w 24 24 %d %d re S' % (PAGE_WIDTH - 48, PAGE_HEIGHT - 48),
+        b'0.75 w 32 32 %d %d re S Q' % (PAGE_WIDTH - 64, PAGE_HEIGHT - 64),
+    ]
+    for size, runs, width in lines:
+        if runs is None:
+            y -= size * 0.8
+            continue
+        y -= size * 1.1
+        ops.extend(_text_ops((PAGE_WIDTH - width) / 2, y, size, runs, fonts))
+        y -= size * 0.25
+
+    if footer:
+        ops.extend(_text_ops(MARGIN - 24, MARGIN - 24, SMALL_SIZE, [(footer, False, False)], fonts))
+
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        None,  # page, filled in once the resource list is known
+    ]
+    font_refs = []
+    for font_id, base_font in FONTS.values():
+        objects.append(b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % base_font.encode())
+        font_refs.append(b'/%s %d 0 R' % (font_id.encode(), len(objects)))
+    for bold, (font_id, base_font) in UNICODE_FONTS.items():
+        if fonts and fonts.used[bold]:
+            number = _font_objects(objects, fonts.fonts[bold], fonts.used[bold], base_font.encode())
+            font_refs.append(b'/%s %d 0 R' % (font_id.encode(), number))
+
+    xobjects = b''
+    if qr_matrix:
+        modules, data = _qr_image(qr_matrix)
+        objects.append(
+            b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray '
+            b'/BitsPerComponent 8 /Interpolate false /Filter /FlateDecode /Length %d >>\nstream\n%s\nendstream'
+            % (modules, modules, len(data), data)
+        )
+        xobjects = b' /XObject << /QR %d 0 R >>' % len(objects)
+        qr_x, qr_y = PAGE_WIDTH - MARGIN - QR_SIZE + 24, MARGIN - 36
+        ops.append(b'q %d 0 0 %d %d %d cm /QR Do Q' % (QR_SIZE, QR_SIZE, qr_x, qr_y))
+
+    content = zlib.compress(b'\n'.join(ops))
+    objects.append(b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(content), content))
+    objects[2] = (
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R '
+        b'/Resources << /Font << %s >>%s >> >>' % (PAGE_WIDTH, PAGE_HEIGHT, len(objects), b' '.join(font_refs), xobjects)
+    )
+    objects.append(b'<< /Title %s /Producer (E-Learning certificates) >>' % _pdf_string(title))
+
+    out = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+        len(objects) + 1, len(objects), xref
+    )
+    return bytes(out)
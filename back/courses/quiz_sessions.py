@@ -0,0 +1,235 @@
+# back/courses/quiz_sessions.py
+"""Timed quiz sessions: cache-held deadlines, per-attempt draft autosave and served adaptive questions."""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from datetime import timedelta
+import json
+import logging
+import time
+import uuid
+
+from core.utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_KEY = 'quiz_attempt_deadline_{}'
+DRAFT_KEY = 'quiz_attempt_draft_{}'
+SERVED_KEY = 'quiz_attempt_served_{}'
+DEADLINE_INDEX_KEY = 'quiz_attempt_deadlines'
+
+# Drafts of untimed quizzes are kept this long after the last write
+DRAFT_TTL_SECONDS = 60 * 60 * 24
+
+
+def _grace_seconds():
+    return getattr(settings, 'QUIZ_SESSION_GRACE_SECONDS', 30)
+
+
+def _session_ttl(attempt):
+    """Seconds the session keys must outlive the attempt start"""
+    limit = attempt.quiz.time_limit_minutes
+    if not limit:
+        return DRAFT_TTL_SECONDS
+    return limit * 60 + _grace_seconds() + 3600
+
+
+def start_session(attempt):
+    """Record the attempt deadline in the cache and the sweeper index"""
+    limit = attempt.quiz.time_limit_minutes
+    if not limit:
+        return None
+
+    deadline = (attempt.started_at + timedelta(minutes=limit)).timestamp()
+    cache.set(DEADLINE_KEY.format(attempt.uuid), deadline, _session_ttl(attempt))
+
+    redis = get_redis_client()
+    if redis is not None:
+        redis.zadd(cache.make_key(DEADLINE_INDEX_KEY), {attempt.id: deadline})
+    return deadline
+
+
+def get_deadline(attempt):
+    """Epoch deadline for a timed attempt, rebuilt from the row on cache miss"""
+    limit = attempt.quiz.time_limit_minutes
+    if not limit:
+        return None
+
+    deadline = cache.get(DEADLINE_KEY.format(attempt.uuid))
+    if deadline is None:
+        deadline = start_session(attempt)
+    return deadline
+
+
+def remaining_seconds(attempt):
+    """Seconds left on the clock, or None for untimed quizzes"""
+    deadline = get_deadline(attempt)
+    if deadline is None:
+        return None
+    return max(int(deadline - time.time()), 0)
+
+
+def is_expired(attempt, grace=True):
+    deadline = get_deadline(attempt)
+    if deadline is None:
+        return False
+    return time.time() > deadline + (_grace_seconds() if grace else 0)
+
+
+def save_draft(attempt, responses):
+    """Merge {question_uuid: response} into the attempt draft without touching the DB"""
+    if not responses:
+        return
+
+    key = DRAFT_KEY.format(attempt.uuid)
+    redis = get_redis_client()
+    if redis is not None:
+        redis_key = cache.make_key(key)
+        pipe = redis.pipeline()
+        pipe.hset(redis_key, mapping={
+            question_uuid: json.dumps(value) for question_uuid, value in responses.items()
+        })
+        pipe.expire(redis_key, _session_ttl(attempt))
+        pipe.execute()
+        return
+
+    draft = cache.get(key) or {}
+    draft.update(responses)
+    cache.set(key, draft, _session_ttl(attempt))
+
+
+def load_draft(attempt):
+    """Return the autosaved {question_uuid: response} mapping"""
+    return load_drafts([attempt]).get(attempt.id, {})
+
+
+def load_drafts(attempts):
+    """Fetch drafts for many attempts in one round trip"""
+    attempts = list(attempts)
+    if not attempts:
+        return {}
+
+    redis = get_redis_client()
+    if redis is not None:
+        pipe = redis.pipeline()
+        for attempt in attempts:
+            pipe.hgetall(cache.make_key(DRAFT_KEY.format(attempt.uuid)))
+        results = pipe.execute()
+        return {
+            attempt.id: {
+                field.decode(): json.loads(value) for field, value in raw.items()
+            }
+            for attempt, raw in zip(attempts, results)
+        }
+
+    keys = {DRAFT_KEY.format(attempt.uuid): attempt.id for attempt in attempts}
+    found = cache.get_many(list(keys))
+    return {attempt_id: found.get(key, {}) for key, attempt_id in keys.items()}
+
+
+def mark_served(attempt, question_uuid):
+    """Remember an adaptive question shown to the learner, so grading counts it even if unanswered"""
+    key = SERVED_KEY.format(attempt.uuid)
+    redis = get_redis_client()
+    if redis is not None:
+        redis_key = cache.make_key(key)
+        pipe = redis.pipeline()
+        pipe.sadd(redis_key, str(question_uuid))
+        pipe.expire(redis_key, _session_ttl(attempt))
+        pipe.execute()
+        return
+
+    served = cache.get(key) or []
+    if str(question_uuid) not in served:
+        served.append(str(question_uuid))
+    cache.set(key, served, _session_ttl(attempt))
+
+
+def load_served(attempts):
+    """{attempt.id: set of served question uuids} for many attempts in one round trip"""
+    attempts = list(attempts)
+    if not attempts:
+        return {}
+
+    redis = get_redis_client()
+    if redis is not None:
+        pipe = redis.pipeline()
+        for attempt in attempts:
+            pipe.smembers(cache.make_key(SERVED_KEY.format(attempt.uuid)))
+        results = pipe.execute()
+        return {
+            attempt.id: {member.decode() for member in members}
+            for attempt, members in zip(attempts, results)
+        }
+
+    keys = {SERVED_KEY.format(attempt.uuid): attempt.id for attempt in attempts}
+    found = cache.get_many(list(keys))
+    return {attempt_id: set(found.get(key, [])) for key, attempt_id in keys.items()}
+
+
+def clear_sessions(attempts):
+    """Drop deadline, draft, served and index entries once attempts are graded"""
+    attempts = list(attempts)
+    if not attempts:
+        return
+
+    cache.delete_many(
+        [DEADLINE_KEY.format(a.uuid) for a in attempts] +
+        [DRAFT_KEY.format(a.uuid) for a in attempts] +
+        [SERVED_KEY.format(a.uuid) for a in attempts]
+    )
+    redis = get_redis_client()
+    if redis is not None:
+        redis.zrem(cache.make_key(DEADLINE_INDEX_KEY), *[a.id for a in attempts])
+
+
+def forget_attempt_ids(attempt_ids):
+    """Remove stale sweeper index entries (attempts deleted or already graded)"""
+    redis = get_redis_client()
+    if redis is not None and attempt_ids:
+        redis.zrem(cache.make_key(DEADLINE_INDEX_KEY), *attempt_ids)
+
+
+def expired_attempt_ids(limit=200):
+    """IDs of open attempts whose deadline plus grace has passed"""
+    cutoff = time.time() - _grace_seconds()
+
+    redis = get_redis_client()
+    if redis is not None:
+        ids = redis.zrangebyscore(cache.make_key(DEADLINE_INDEX_KEY), '-inf', cutoff, start=0, num=limit)
+        return [int(attempt_id) for attempt_id in ids]
+
+    # Without Redis there is no shared index, so derive deadlines from the rows
+    from courses.models import QuizAttempt
+
+    open_attempts = QuizAttempt.objects.filter(
+        completed_at__isnull=True,
+        quiz__time_limit_minutes__isnull=False,
+        started_at__lt=timezone.now() - timedelta(seconds=_grace_seconds()),
+    ).values_list('id', 'started_at', 'quiz__time_limit_minutes').order_by('started_at')
+
+    expired = []
+    for attempt_id, started_at, limit_minutes in open_attempts.iterator():
+        if (started_at + timedelta(minutes=limit_minutes)).timestamp() > cutoff:
+            continue
+        expired.append(attempt_id)
+        if len(expired) >= limit:
+            break
+    return expired
+
+
+def parse_responses(items):
+    """Turn the API list format into {question_uuid: {'answer'|'text': value}}, skipping malformed ids"""
+    responses = {}
+    for item in items:
+        try:
+            question_uuid = uuid.UUID(str(item.get('question')))
+        except ValueError:
+            continue
+        value = {}
+        if item.get('answer'):
+            value['answer'] = item['answer']
+        if 'text' in item:
+            value['text'] = item['text']
+        responses[str(question_uuid)] = value
+    return responses
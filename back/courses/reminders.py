@@ -0,0 +1,125 @@
+# back/courses/reminders.py
+"""Deadline reminders for assignments and quizzes."""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+TICK_LOCK_KEY = 'deadline_reminders_tick_lock'
+TICK_LOCK_SECONDS = 300
+
+
+def reminder_offsets():
+    """Hours before a deadline at which reminders go out, largest first"""
+    return sorted(getattr(settings, 'DEADLINE_REMINDER_HOURS', [24, 1]), reverse=True)
+
+
+def upcoming_deadlines(now):
+    """
+    (deadline_type, object, due) for deadlines inside the widest reminder window.
+
+    Both scans are range queries on indexed due columns, so each tick only
+    touches deadlines that are about to fall due, ordered by time.
+    """
+    from courses.models import Assignment, Quiz
+
+    horizon = now + timedelta(hours=reminder_offsets()[0])
+
+    assignments = Assignment.objects.filter(
+        due_date__gt=now, due_date__lte=horizon
+    ).select_related('lesson__module__course').order_by('due_date')
+    quizzes = Quiz.objects.filter(
+        is_published=True, available_until__gt=now, available_until__lte=horizon
+    ).select_related('course').order_by('available_until')
+
+    deadlines = [('assignment', a, a.due_date) for a in assignments]
+    deadlines += [('quiz', q, q.available_until) for q in quizzes]
+    return sorted(deadlines, key=lambda item: item[2])
+
+
+def _pending_enrollments(deadline_type, obj, hours_before):
+    """Active enrollments with no submission and no reminder yet, as one anti-join query"""
+    from courses.models import Enrollment, AssignmentSubmission, QuizAttempt, DeadlineReminder
+
+    if deadline_type == 'assignment':
+        course_id = obj.lesson.module.course_id
+        done = AssignmentSubmission.objects.filter(assignment=obj, student=OuterRef('student'))
+    else:
+        course_id = obj.course_id
+        done = QuizAttempt.objects.filter(quiz=obj, student=OuterRef('student'), completed_at__isnull=False)
+
+    reminded = DeadlineReminder.objects.filter(
+        deadline_type=deadline_type, deadline_id=obj.id,
+        enrollment=OuterRef('pk'), hours_before=hours_before,
+    )
+
+    return Enrollment.objects.filter(course_id=course_id, is_active=True).exclude(
+        Exists(done)
+    ).exclude(Exists(reminded)).values_list('id', 'student_id')
+
+
+def _describe(deadline_type, obj, due, now):
+    remaining = due - now
+    hours = int(remaining.total_seconds() // 3600)
+    when = f"in {hours} hours" if hours >= 2 else "within the hour" if hours < 1 else "in about an hour"
+
+    if deadline_type == 'assignment':
+        course = obj.lesson.module.course
+        return course, obj.lesson_id, f'Assignment due: {obj.title}', f'"{obj.title}" in {course.title} is due {when}.'
+
+    return obj.course, obj.lesson_id, f'Quiz closing: {obj.title}', f'"{obj.title}" in {obj.course.title} closes {when}.'
+
+
+def send_due_reminders(now=None):
+    """One scheduler tick: record and send every reminder that has come due"""
+    from courses.models import DeadlineReminder
+    from core.notifications import send_bulk_notifications
+    from core.utils import acquire_lock, release_lock
+
+    # Two overlapping ticks would both see the same anti-join result
+    token = acquire_lock(TICK_LOCK_KEY, TICK_LOCK_SECONDS)
+    if token is None:
+        logger.info("Deadline reminder tick already running")
+        return 0
+
+    try:
+        now = now or timezone.now()
+        offsets = reminder_offsets()
+        sent = 0
+
+        for deadline_type, obj, due in upcoming_deadlines(now):
+            # Only the tightest window the deadline is in; a missed wider reminder is not sent late
+            hours_before = min(h for h in offsets if due - now <= timedelta(hours=h))
+
+            pending = list(_pending_enrollments(deadline_type, obj, hours_before))
+            if not pending:
+                continue
+
+            course, lesson_id, title, message = _describe(deadline_type, obj, due, now)
+            # A reminder is recorded only together with its notification, so a failed send is retried next tick
+            with transaction.atomic():
+                DeadlineReminder.objects.bulk_create([
+                    DeadlineReminder(
+                        enrollment_id=enrollment_id, deadline_type=deadline_type,
+                        deadline_id=obj.id, hours_before=hours_before,
+                    ) for enrollment_id, _ in pending
+                ], ignore_conflicts=True, batch_size=1000)
+
+                sent += send_bulk_notifications([{
+                    'recipient_id': student_id,
+                    'notification_type': 'assignment_due',
+                    'title': title,
+                    'message': message,
+                    'course_id': course.id,
+                    'lesson_id': lesson_id,
+                } for _, student_id in pending])
+
+        if sent:
+            logger.info(f"Sent {sent} deadline reminders")
+        return sent
+    finally:
+        release_lock(TICK_LOCK_KEY, token)
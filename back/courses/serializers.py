@@ -331,6 +331,19 @@ class QuestionSerializer(serializers.ModelSerializer):
         model = Question
         fields = '__all__'
 
+# Adaptive Question Serializer (served to learners, so correctness stays hidden)
+class AnswerOptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Answer
+        fields = ['uuid', 'answer_text', 'order']
+
+class AdaptiveQuestionSerializer(serializers.ModelSerializer):
+    answers = AnswerOptionSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Question
+        fields = ['uuid', 'question_text', 'question_type', 'points', 'answers']
+
 # Answer Serializer
 class AnswerSerializer(serializers.ModelSerializer):
     class Meta:
@@ -364,6 +377,13 @@ class QuizSubmissionSerializer(serializers.Serializer):
         child=serializers.DictField(child=serializers.CharField())
     )
 
+# Quiz Draft Serializer (autosaved responses of an open attempt)
+class QuizDraftSerializer(serializers.Serializer):
+    responses = serializers.ListField(
+        child=serializers.DictField(child=serializers.CharField(allow_blank=True)),
+        allow_empty=True
+    )
+
 # Certificate Serializer
 class CertificateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -373,6 +393,8 @@ class CertificateSerializer(serializers.ModelSerializer):
             'certificate_number': {'read_only': True},
             'pdf_file': {'read_only': True},
             'qr_code': {'read_only': True},
+            'render_status': {'read_only': True},
+            'rendered_at': {'read_only': True},
         }
 
 # Course Review Serializer
@@ -0,0 +1,228 @@
+# back/courses/similarity.py
+"""Near-duplicate detection for assignment submissions with MinHash and LSH banding."""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+import hashlib
+import logging
+import re
+import zipfile
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 128
+BANDS = 32  # 4 rows per band: pairs above ~0.42 Jaccard become candidates
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+MAX_TEXT_BYTES = 5 * 1024 * 1024
+
+REPORT_STATUS_KEY = 'similarity_report_status_{}'
+
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.RandomState(20240601)
+# Fixed seed: signatures must stay comparable across processes and deployments
+_PERM_A = _rng.randint(1, (1 << 31) - 1, size=NUM_PERMUTATIONS).astype(np.uint64)
+_PERM_B = _rng.randint(0, (1 << 31) - 1, size=NUM_PERMUTATIONS).astype(np.uint64)
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_XML_TAG_RE = re.compile(r'<[^>]+>')
+_XML_PARAGRAPH_RE = re.compile(r'</w:p>|</text:p>')
+
+PLAIN_TEXT_EXTENSIONS = {'txt', 'md', 'py', 'java', 'js', 'ts', 'c', 'cpp', 'h', 'cs', 'rb', 'go', 'html', 'css', 'sql', 'csv'}
+ZIPPED_XML_DOCUMENTS = {'docx': 'word/document.xml', 'odt': 'content.xml'}
+
+
+def _read_limited(file):
+    return file.read(MAX_TEXT_BYTES)
+
+
+def extract_file_text(file_field):
+    """Best-effort text from an uploaded file; binary formats without a text layer yield ''"""
+    name = file_field.name or ''
+    extension = name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+
+    try:
+        if extension in PLAIN_TEXT_EXTENSIONS:
+            with file_field.open('rb') as f:
+                return _read_limited(f).decode('utf-8', errors='ignore')
+
+        if extension in ZIPPED_XML_DOCUMENTS:
+            with file_field.open('rb') as f, zipfile.ZipFile(f) as archive:
+                with archive.open(ZIPPED_XML_DOCUMENTS[extension]) as document:
+                    xml = _read_limited(document).decode('utf-8', errors='ignore')
+            return _XML_TAG_RE.sub(' ', _XML_PARAGRAPH_RE.sub('\n', xml))
+    except (OSError, KeyError, zipfile.BadZipFile) as e:
+        logger.warning(f"Could not extract text from {name}: {e}")
+
+    return ''
+
+
+def submission_text(submission):
+    parts = [submission.text_submission or '']
+    if submission.file:
+        parts.append(extract_file_text(submission.file))
+    return '\n'.join(part for part in parts if part)
+
+
+def shingle_hashes(text, size=SHINGLE_SIZE):
+    """Distinct 31-bit hashes of overlapping word n-grams"""
+    words = _WORD_RE.findall(text.casefold())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    if len(words) < size:
+        grams = [' '.join(words)]
+    else:
+        grams = (' '.join(words[i:i + size]) for i in range(len(words) - size + 1))
+    hashes = {zlib.crc32(gram.encode('utf-8')) & 0x7FFFFFFF for gram in grams}
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+
+def minhash(shingles):
+    """MinHash signature from shingle hashes, one vectorized pass per permutation block"""
+    if not len(shingles):
+        return np.full(NUM_PERMUTATIONS, np.iinfo(np.uint32).max, dtype=np.uint32)
+
+    signature = np.empty(NUM_PERMUTATIONS, dtype=np.uint32)
+    block = max(1, 2 ** 22 // len(shingles))
+    for start in range(0, NUM_PERMUTATIONS, block):
+        a = _PERM_A[start:start + block, None]
+        b = _PERM_B[start:start + block, None]
+        signature[start:start + block] = ((a * shingles[None, :] + b) % _MERSENNE_PRIME).min(axis=1)
+    return signature
+
+
+def band_hashes(signature):
+    """One signed 64-bit bucket key per band; the band index is mixed in so bands never collide"""
+    rows = signature.reshape(BANDS, ROWS_PER_BAND)
+    keys = []
+    for band, values in enumerate(rows):
+        digest = hashlib.blake2b(values.tobytes(), digest_size=8, key=band.to_bytes(2, 'big')).digest()
+        keys.append(int.from_bytes(digest, 'big', signed=True))
+    return keys
+
+
+def estimated_similarity(signature, other):
+    return float(np.count_nonzero(signature == other)) / NUM_PERMUTATIONS
+
+
+def _unpack(raw):
+    return np.frombuffer(bytes(raw), dtype=np.uint32)
+
+
+def similarity_threshold():
+    return getattr(settings, 'SIMILARITY_MATCH_THRESHOLD', 0.5)
+
+
+@transaction.atomic
+def index_submission(submission):
+    """
+    (Re)compute one submission's signature and compare it against the assignment's index.
+
+    Only submissions sharing at least one LSH bucket are compared, so cost grows
+    with the number of candidates rather than with the number of prior submissions.
+    """
+    from courses.models import SubmissionSignature, SimilarityBucket, SimilarityMatch
+
+    text = submission_text(submission)
+    shingles = shingle_hashes(text)
+    signature = minhash(shingles)
+    text_hash = hashlib.sha256(' '.join(_WORD_RE.findall(text.casefold())).encode('utf-8')).hexdigest()
+
+    record, _ = SubmissionSignature.objects.update_or_create(
+        submission=submission,
+        defaults={
+            'assignment_id': submission.assignment_id,
+            'minhash': signature.tobytes(),
+            'shingle_count': len(shingles),
+            'text_hash': text_hash,
+        }
+    )
+    record.buckets.all().delete()
+    SimilarityMatch.objects.filter(submission=submission).delete()
+    SimilarityMatch.objects.filter(matched_submission=submission).delete()
+
+    if not len(shingles):
+        return []
+
+    keys = band_hashes(signature)
+    SimilarityBucket.objects.bulk_create([
+        SimilarityBucket(assignment_id=submission.assignment_id, signature=record, bucket_hash=key)
+        for key in keys
+    ])
+
+    candidate_ids = SimilarityBucket.objects.filter(
+        assignment_id=submission.assignment_id, bucket_hash__in=keys
+    ).exclude(signature=record).values('signature_id')
+    candidates = SubmissionSignature.objects.filter(id__in=candidate_ids).values_list(
+        'submission_id', 'minhash', 'text_hash'
+    )
+
+    threshold = similarity_threshold()
+    matches = []
+    for other_id, other_minhash, other_text_hash in candidates:
+        is_exact = other_text_hash == text_hash
+        similarity = 1.0 if is_exact else estimated_similarity(signature, _unpack(other_minhash))
+        if similarity >= threshold:
+            matches.append(SimilarityMatch(
+                assignment_id=submission.assignment_id,
+                submission=submission,
+                matched_submission_id=other_id,
+                similarity=similarity,
+                is_exact=is_exact,
+            ))
+
+    SimilarityMatch.objects.bulk_create(matches)
+    return matches
+
+
+def index_assignment(assignment_id):
+    """Index every submission of an assignment that has no signature yet"""
+    from courses.models import AssignmentSubmission
+
+    pending = AssignmentSubmission.objects.filter(
+        assignment_id=assignment_id, signature__isnull=True
+    ).order_by('submission_date', 'id')
+
+    indexed = 0
+    for submission in pending.iterator(chunk_size=200):
+        index_submission(submission)
+        indexed += 1
+    return indexed
+
+
+def set_report_status(assignment_id, status, **extra):
+    cache.set(
+        REPORT_STATUS_KEY.format(assignment_id),
+        {'status': status, 'updated_at': timezone.now().isoformat(), **extra},
+        60 * 60 * 24
+    )
+
+
+def get_report_status(assignment_id):
+    return cache.get(REPORT_STATUS_KEY.format(assignment_id))
+
+
+def similarity_report(assignment):
+    """Flagged pairs for an assignment, most similar first"""
+    from courses.models import SimilarityMatch
+
+    matches = SimilarityMatch.objects.filter(assignment=assignment).select_related(
+        'submission__student', 'matched_submission__student'
+    )
+    return [{
+        'similarity': round(match.similarity, 3),
+        'is_exact': match.is_exact,
+        'submissions': [
+            {
+                'uuid': str(submission.uuid),
+                'student': submission.student.get_full_name(),
+                'student_email': submission.student.email,
+                'submitted_at': submission.submission_date,
+            }
+            for submission in (match.matched_submission, match.submission)
+        ],
+    } for match in matches]
@@ -1,44 +1,103 @@
 from celery import shared_task
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db import transaction
 import logging
 
 logger = logging.getLogger(__name__)
 
 @shared_task
 def generate_certificate_task(enrollment_id):
-    """Generate certificate for completed course"""
-    from courses.models import Enrollment, Certificate
+    """Issue the certificate for a completed course and email the student"""
+    from courses.models import Enrollment
+    from courses.certificates import issue_certificate
     
     try:
-        enrollment = Enrollment.objects.get(id=enrollment_id)
-        
-        # Generate certificate logic here
-        certificate = Certificate.objects.create(
-            student=enrollment.student,
-            course=enrollment.course,
-            enrollment=enrollment,
-            completion_date=enrollment.completed_at,
-            final_score=enrollment.progress_percentage
-        )
-        
-        # Send email notification
-        from accounts.utils import send_certificate_email
-        send_certificate_email(
-            email=enrollment.student.email,
-            user_name=enrollment.student.get_full_name(),
-            course_title=enrollment.course.title,
-            certificate_url=f"{settings.FRONTEND_URL}/certificates/{certificate.uuid}",
-            certificate_number=certificate.certificate_number
-        )
+        enrollment = Enrollment.objects.select_related('student', 'course').get(id=enrollment_id)
+        with transaction.atomic():
+            certificate, created = issue_certificate(enrollment)
+            from core.notifications import channel_enabled
+            if not created or not channel_enabled(enrollment.student_id, 'certificate_ready', 'email'):
+                return True
+            
+            # The email is queued with the certificate, so a redelivered task never sends it twice
+            from core.outbox import enqueue_email
+            enqueue_email(
+                to_email=enrollment.student.email,
+                subject=f"Your Certificate for {enrollment.course.title}",
+                template_name='certificate_earned',
+                context={
+                    'user_name': enrollment.student.get_full_name(),
+                    'course_title': enrollment.course.title,
+                    'certificate_url': f"{settings.FRONTEND_URL}/certificates/{certificate.uuid}",
+                    'certificate_number': certificate.certificate_number,
+                },
+                action_type='certificate',
+                dedupe_key=f"certificate-email:{certificate.uuid}"
+            )
         
-        logger.info(f"Certificate generated for enrollment {enrollment_id}")
+        logger.info(f"Certificate issued for enrollment {enrollment_id}")
         return True
         
     except Exception as e:
         logger.error(f"Failed to generate certificate for enrollment {enrollment_id}: {str(e)}")
         raise
 
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def render_certificates_task(self, certificate_ids, job_id=None):
+    """Render QR/PDF artifacts for a batch of certificates, retrying only the ones that failed"""
+    from courses.certificates import render_batch, record_job_progress, update_job
+    
+    try:
+        failed = render_batch(certificate_ids)
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=self.default_retry_delay * (2 ** self.request.retries))
+        if job_id:
+            record_job_progress(job_id, failed=len(certificate_ids))
+            update_job(job_id, status='failed', error=str(e))
+        raise
+    if job_id:
+        exhausted = self.request.retries >= self.max_retries
+        record_job_progress(job_id, done=len(certificate_ids) - len(failed), failed=len(failed) if exhausted else 0)
+    if failed and self.request.retries < self.max_retries:
+        raise self.retry(
+            args=[failed], kwargs={'job_id': job_id},
+            countdown=self.default_retry_delay * (2 ** self.request.retries)
+        )
+    return len(certificate_ids) - len(failed)
+
+@shared_task
+def reissue_certificates_task(job_id, course_id=None, certificate_ids=None):
+    from courses.certificates import reissue_certificates, update_job
+    
+    try:
+        reissue_certificates(job_id, course_id=course_id, certificate_ids=certificate_ids)
+    except Exception as e:
+        update_job(job_id, status='failed', error=str(e))
+        raise
+
+@shared_task
+def set_certificates_validity_task(job_id, is_valid, course_id=None, certificate_ids=None):
+    from courses.certificates import set_certificates_validity, update_job
+    
+    try:
+        set_certificates_validity(job_id, is_valid, course_id=course_id, certificate_ids=certificate_ids)
+    except Exception as e:
+        update_job(job_id, status='failed', error=str(e))
+        raise
+
+@shared_task
+def render_pending_certificates():
+    """Sweep for certificates whose render job was lost or whose worker died mid-render"""
+    from courses.certificates import pending_certificate_ids, enqueue_render
+    
+    ids = pending_certificate_ids()
+    if ids:
+        enqueue_render(ids)
+        logger.info(f"Queued {len(ids)} pending certificates for rendering")
+    return len(ids)
+
 @shared_task
 def send_course_reminder_emails():
     """Send reminder emails for inactive students"""
@@ -65,4 +124,126 @@ def send_course_reminder_emails():
             fail_silently=True
         )
     
-    logger.info(f"Sent {inactive_enrollments.count()} reminder emails")
\ No newline at end of file
+    logger.info(f"Sent {inactive_enrollments.count()} reminder emails")
+
+
+@shared_task
+def auto_submit_expired_quiz_attempts(batch_size=200, max_batches=50):
+    """Grade timed quiz attempts whose clock ran out, using their autosaved drafts"""
+    from django.db import transaction
+    from courses.models import QuizAttempt
+    from courses.quiz_sessions import expired_attempt_ids, forget_attempt_ids, load_drafts, clear_sessions
+    from courses.grading import grade_attempts
+    from core.utils import track_activity
+
+    graded = 0
+    for _ in range(max_batches):
+        ids = expired_attempt_ids(limit=batch_size)
+        if not ids:
+            break
+
+        with transaction.atomic():
+            attempts = list(
+                QuizAttempt.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+                    id__in=ids, completed_at__isnull=True
+                ).select_related('quiz', 'student')
+            )
+            grade_attempts(attempts, load_drafts(attempts))
+            for attempt in attempts:
+                track_activity(
+                    attempt.student, 'quiz_submit', quiz=attempt.quiz, course_id=attempt.quiz.course_id,
+                    metadata={
+                        'seconds': attempt.time_taken_seconds or 0,
+                        'score': float(attempt.score) if attempt.score is not None else None,
+                        'passed': attempt.passed,
+                    }
+                )
+
+        clear_sessions(attempts)
+        # Rows skipped only because a submit holds their lock stay indexed for the next run
+        skipped = set(ids) - {a.id for a in attempts}
+        still_open = set(QuizAttempt.objects.filter(
+            id__in=skipped, completed_at__isnull=True
+        ).values_list('id', flat=True)) if skipped else set()
+        forget_attempt_ids(list(skipped - still_open))
+        graded += len(attempts)
+
+        if len(still_open) == len(ids):
+            break
+
+    if graded:
+        logger.info(f"Auto-submitted {graded} expired quiz attempts")
+    return graded
+
+@shared_task
+def rebuild_leaderboards_task():
+    """Reconcile quiz and course leaderboards with the database"""
+    from courses.leaderboards import rebuild_leaderboards
+
+    try:
+        quizzes, courses = rebuild_leaderboards()
+        logger.info(f"Rebuilt leaderboards for {quizzes} quizzes and {courses} courses")
+    except Exception as e:
+        logger.error(f"Error rebuilding leaderboards: {e}")
+
+@shared_task
+def calibrate_adaptive_quizzes(quiz_id=None):
+    """Refit 2PL item parameters from historical responses"""
+    from courses.models import Quiz
+    from courses.irt import calibrate_quiz
+
+    quizzes = Quiz.objects.filter(is_adaptive=True)
+    if quiz_id:
+        quizzes = quizzes.filter(id=quiz_id)
+
+    calibrated = 0
+    for quiz_pk in quizzes.values_list('id', flat=True):
+        try:
+            calibrated += calibrate_quiz(quiz_pk)
+        except Exception as e:
+            logger.error(f"Error calibrating quiz {quiz_pk}: {e}")
+
+    logger.info(f"Calibrated {calibrated} adaptive quiz questions")
+    return calibrated
+
+@shared_task
+def index_submission_similarity_task(submission_id):
+    """Add one submission to its assignment's similarity index"""
+    from courses.models import AssignmentSubmission
+    from courses.similarity import index_submission
+
+    try:
+        submission = AssignmentSubmission.objects.get(id=submission_id)
+        matches = index_submission(submission)
+        if matches:
+            logger.info(f"Submission {submission_id} matched {len(matches)} earlier submissions")
+    except AssignmentSubmission.DoesNotExist:
+        logger.warning(f"Submission {submission_id} not found for similarity indexing")
+    except Exception as e:
+        logger.error(f"Error indexing submission {submission_id}: {e}")
+
+@shared_task
+def build_similarity_report_task(assignment_id):
+    """Index outstanding submissions and mark the assignment's similarity report ready"""
+    from courses.models import SimilarityMatch
+    from courses.similarity import index_assignment, set_report_status
+
+    try:
+        set_report_status(assignment_id, 'running')
+        indexed = index_assignment(assignment_id)
+        flagged = SimilarityMatch.objects.filter(assignment_id=assignment_id).count()
+        set_report_status(assignment_id, 'ready', indexed=indexed, flagged_pairs=flagged)
+        logger.info(f"Similarity report for assignment {assignment_id}: {flagged} flagged pairs")
+    except Exception as e:
+        set_report_status(assignment_id, 'failed')
+        logger.error(f"Error building similarity report for assignment {assignment_id}: {e}")
+
+@shared_task
+def send_deadline_reminders():
+    """Remind students of assignments and quizzes that are about to close"""
+    from courses.reminders import send_due_reminders
+
+    try:
+        return send_due_reminders()
+    except Exception as e:
+        logger.error(f"Error sending deadline reminders: {e}")
@@ -1,3 +1,718 @@
-from django.test import TestCase
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+import csv
+import io
+import os
+import re
+import shutil
+import tempfile
+import unittest
+import uuid
+import zlib
 
-# Create your tests here.
+from core import activity, learning_analytics
+from core.models import LearningAnalytics, Notification
+from core.testing import EnrollmentTestCase, api_client, make_user
+from core.utils import acquire_lock, release_lock
+from . import certificates, leaderboards, pdf, quiz_sessions, reminders, similarity, tasks
+from .grading import ShortAnswerMatcher
+from .importers import import_questions
+from .models import (
+    Answer, Assignment, AssignmentSubmission, Certificate, DeadlineReminder, Enrollment, Lesson, LessonProgress,
+    Module, Question, Quiz, QuizAttempt, SimilarityMatch
+)
+
+
+class CoursesTestCase(EnrollmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = api_client(self.student)
+
+
+# Quiz sessions
+class QuizStartTests(CoursesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = Quiz.objects.create(course=self.course, title='Quiz', is_published=True, max_attempts=2)
+
+    def start(self):
+        return self.client.post(f'/api/quizzes/{self.quiz.uuid}/start/')
+
+    def test_resumes_open_attempt(self):
+        first = self.start()
+        second = self.start()
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(QuizAttempt.objects.filter(quiz=self.quiz).count(), 1)
+
+    def test_attempt_numbers_and_max_attempts(self):
+        for expected in (1, 2):
+            response = self.start()
+            self.assertEqual(response.status_code, 201)
+            QuizAttempt.objects.filter(quiz=self.quiz, completed_at__isnull=True).update(completed_at=self.quiz.created_at)
+
+        self.assertEqual(self.start().status_code, 400)
+        self.assertEqual(
+            list(QuizAttempt.objects.filter(quiz=self.quiz).order_by('attempt_number').values_list('attempt_number', flat=True)),
+            [1, 2]
+        )
+
+    def test_requires_enrollment(self):
+        outsider = api_client(make_user())
+        self.assertEqual(outsider.post(f'/api/quizzes/{self.quiz.uuid}/start/').status_code, 404)
+
+    def test_draft_autosave_and_deadline(self):
+        self.quiz.time_limit_minutes = 10
+        self.quiz.save()
+        self.start()
+        attempt = QuizAttempt.objects.get(quiz=self.quiz)
+        question = uuid.uuid4()
+
+        response = self.client.patch(
+            f'/api/quiz-attempts/{attempt.uuid}/draft/', {'responses': [{'question': str(question), 'text': 'x'}]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(0 < response.json()['data']['remaining_seconds'] <= 600)
+        self.assertEqual(quiz_sessions.load_draft(attempt), {str(question): {'text': 'x'}})
+
+    def test_malformed_question_ids_are_skipped(self):
+        self.assertEqual(quiz_sessions.parse_responses([{'question': 'abc', 'text': 'x'}, {'text': 'y'}]), {})
+
+        self.start()
+        attempt = QuizAttempt.objects.get(quiz=self.quiz)
+        response = self.client.patch(
+            f'/api/quiz-attempts/{attempt.uuid}/draft/', {'responses': [{'question': 'not-a-uuid', 'text': 'x'}]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(quiz_sessions.load_draft(attempt), {})
+
+
+class FakeDeadlineIndex:
+    """The few sorted-set and pipeline calls the quiz sweeper makes"""
+
+    def __init__(self):
+        self.scores = {}
+
+    def zadd(self, key, mapping):
+        self.scores.update({str(member): score for member, score in mapping.items()})
+
+    def zrem(self, key, *members):
+        for member in members:
+            self.scores.pop(str(member), None)
+
+    def zrangebyscore(self, key, low, high, start=0, num=None):
+        members = sorted((score, member) for member, score in self.scores.items() if score <= high)
+        return [member.encode() for _, member in members][start:start + num]
+
+    def pipeline(self):
+        return FakePipeline()
+
+
+class FakePipeline:
+    def __init__(self):
+        self.results = []
+
+    def hgetall(self, key):
+        self.results.append({})
+
+    def smembers(self, key):
+        self.results.append(set())
+
+    def execute(self):
+        return self.results
+
+
+class QuizSweeperTests(CoursesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = Quiz.objects.create(course=self.course, title='Timed', is_published=True, time_limit_minutes=10)
+        self.redis = FakeDeadlineIndex()
+        patcher = mock.patch.object(quiz_sessions, 'get_redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def expired_attempt(self, **kwargs):
+        student = make_user()
+        enrollment = Enrollment.objects.create(student=student, course=self.course)
+        attempt = QuizAttempt.objects.create(quiz=self.quiz, student=student, enrollment=enrollment, **kwargs)
+        QuizAttempt.objects.filter(pk=attempt.pk).update(started_at=timezone.now() - timedelta(minutes=15))
+        attempt.refresh_from_db()
+        quiz_sessions.start_session(attempt)
+        return attempt
+
+    def test_locked_attempts_stay_indexed(self):
+        open_attempt = self.expired_attempt()
+        locked = self.expired_attempt()
+        graded = self.expired_attempt(completed_at=timezone.now())
+        deleted = self.expired_attempt()
+        QuizAttempt.objects.filter(pk=deleted.pk).delete()
+
+        # A concurrent submit holds the lock, so skip_locked leaves this row out
+        skip_locked = lambda **kwargs: QuizAttempt.objects.exclude(pk=locked.pk)
+        with mock.patch.object(QuizAttempt.objects, 'select_for_update', side_effect=skip_locked), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(tasks.auto_submit_expired_quiz_attempts(), 1)
+
+        self.assertEqual(set(self.redis.scores), {str(locked.id)})
+        open_attempt.refresh_from_db()
+        self.assertIsNotNone(open_attempt.completed_at)
+        self.assertIsNone(QuizAttempt.objects.get(pk=locked.pk).completed_at)
+        self.assertIsNotNone(QuizAttempt.objects.get(pk=graded.pk).completed_at)
+
+
+class AdaptiveQuizTests(CoursesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = Quiz.objects.create(
+            course=self.course, title='Adaptive', is_published=True, is_adaptive=True, adaptive_question_count=3
+        )
+        self.questions = []
+        for i in range(3):
+            question = Question.objects.create(quiz=self.quiz, question_text=f'Q{i}', question_type='multiple_choice')
+            right = Answer.objects.create(question=question, answer_text='right', is_correct=True)
+            Answer.objects.create(question=question, answer_text='wrong', is_correct=False)
+            self.questions.append((question, right))
+        self.client.post(f'/api/quizzes/{self.quiz.uuid}/start/')
+        self.attempt = QuizAttempt.objects.get(quiz=self.quiz)
+
+    def next_question(self):
+        response = self.client.get(f'/api/quiz-attempts/{self.attempt.uuid}/next-question/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']['question']['uuid']
+
+    def answer(self, question_uuid):
+        right = next(right for question, right in self.questions if str(question.uuid) == question_uuid)
+        return {'question': question_uuid, 'answer': str(right.uuid)}
+
+    def test_served_unanswered_questions_count_as_wrong(self):
+        first = self.next_question()
+        self.client.patch(
+            f'/api/quiz-attempts/{self.attempt.uuid}/draft/', {'responses': [self.answer(first)]}, format='json'
+        )
+        second = self.next_question()
+        self.assertNotEqual(first, second)
+        unserved = next(str(q.uuid) for q, _ in self.questions if str(q.uuid) not in (first, second))
+
+        response = self.client.post(
+            f'/api/quiz-attempts/{self.attempt.uuid}/submit/', {'responses': [self.answer(unserved)]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.score, 50)
+        self.assertEqual(quiz_sessions.load_served([self.attempt]), {self.attempt.id: set()})
+
+
+# Short-answer grading
+class ShortAnswerMatcherTests(SimpleTestCase):
+    def test_text_forms(self):
+        matcher = ShortAnswerMatcher(['Paris', '~photosynthesis', '/^colou?r$/i'])
+        self.assertTrue(matcher.matches('  paris. '))
+        self.assertTrue(matcher.matches('photosynthesys'))
+        self.assertFalse(matcher.matches('chlorophyll'))
+        self.assertTrue(matcher.matches('COLOR'))
+        self.assertFalse(matcher.matches('colours'))
+        self.assertFalse(matcher.matches(''))
+        self.assertFalse(matcher.matches(None))
+
+    def test_numeric_forms(self):
+        matcher = ShortAnswerMatcher(['#3.14:0.01', '#10..5'])
+        self.assertTrue(matcher.matches('3,145'))
+        self.assertTrue(matcher.matches('7'))
+        self.assertFalse(matcher.matches('3.2'))
+        self.assertFalse(matcher.matches('abc'))
+
+    def test_non_finite_numbers_do_not_match_or_raise(self):
+        matcher = ShortAnswerMatcher(['#1..5'])
+        for response in ('nan', 'NaN', 'sNaN', '-nan', 'inf', '-Infinity', '.'):
+            self.assertFalse(matcher.matches(response), response)
+
+    def test_invalid_pattern_is_skipped(self):
+        matcher = ShortAnswerMatcher(['/([a-z/', 'ok'])
+        self.assertTrue(matcher.matches('ok'))
+        self.assertFalse(matcher.matches('([a-z'))
+
+
+class ShortAnswerSubmitTests(CoursesTestCase):
+    def test_nan_answer_is_graded_wrong(self):
+        quiz = Quiz.objects.create(course=self.course, title='Quiz', is_published=True)
+        question = Question.objects.create(quiz=quiz, question_text='2 + 2?', question_type='short_answer')
+        Answer.objects.create(question=question, answer_text='#4', is_correct=True)
+
+        self.client.post(f'/api/quizzes/{quiz.uuid}/start/')
+        attempt = QuizAttempt.objects.get(quiz=quiz)
+        response = self.client.post(
+            f'/api/quiz-attempts/{attempt.uuid}/submit/',
+            {'responses': [{'question': str(question.uuid), 'text': 'sNaN'}]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 0)
+        self.assertFalse(attempt.passed)
+
+
+# Leaderboards
+class LeaderboardTests(CoursesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = Quiz.objects.create(course=self.course, title='Quiz', is_published=True)
+        self.board = leaderboards.course_board(self.course.id)
+        self.board.replace({})
+
+    def test_requires_enrollment_or_instructor(self):
+        outsider = api_client(make_user())
+        for url in (f'/api/courses/{self.course.uuid}/leaderboard/', f'/api/quizzes/{self.quiz.uuid}/leaderboard/'):
+            self.assertEqual(outsider.get(url).status_code, 403, url)
+            self.assertEqual(self.client.get(url).status_code, 200, url)
+            self.assertEqual(api_client(self.teacher).get(url).status_code, 200, url)
+
+    def test_inactive_enrollment_is_denied(self):
+        self.enrollment.is_active = False
+        self.enrollment.save()
+        self.assertEqual(self.client.get(f'/api/courses/{self.course.uuid}/leaderboard/').status_code, 403)
+
+    def test_lesson_points_awarded_once(self):
+        module = Module.objects.create(course=self.course, title='Module')
+        lesson = Lesson.objects.create(module=module, title='Lesson', slug='lesson', points=5)
+        url = f'/api/courses/{self.course.uuid}/lessons/{lesson.uuid}/complete/'
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(url).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(url).status_code, 200)
+
+        self.assertTrue(LessonProgress.objects.get(lesson=lesson).is_completed)
+        self.assertEqual(self.board.rank(self.student.id)[1], 5)
+
+
+# Question import
+QTI_ITEM = """<questestinterop><item ident="q1"><presentation><material><mattext>Pick</mattext></material>
+<response_lid ident="r"><render_choice><response_label ident="a"><material><mattext>A</mattext></material></response_label>
+<response_label ident="b"><material><mattext>B</mattext></material></response_label></render_choice></response_lid>
+</presentation><resprocessing><respcondition><conditionvar><varequal respident="r">a</varequal></conditionvar>
+<setvar action="Set">{score}</setvar></respcondition></resprocessing></item></questestinterop>"""
+
+
+class QuestionImportTests(CoursesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz = Quiz.objects.create(course=self.course, title='Quiz')
+
+    def run_import(self, file_format, content, dry_run=False):
+        return import_questions(self.quiz, BytesIO(content.encode()), file_format, dry_run=dry_run)
+
+    def test_gift_and_qti_questions(self):
+        gift = self.run_import('gift', '::Q1:: Capital of France? {=Paris ~%50%Lyon ~Nice}\n\nThe sky is blue. {T}\n')
+        self.assertEqual(gift['errors'], [])
+        self.assertEqual(gift['questions'], 2)
+        self.assertEqual(list(Answer.objects.filter(question__quiz=self.quiz, is_correct=True).values_list(
+            'answer_text', flat=True
+        ).order_by('answer_text')), ['Lyon', 'Paris', 'True'])
+
+        qti = self.run_import('qti', QTI_ITEM.format(score='1'), dry_run=True)
+        self.assertEqual((qti['questions'], qti['errors']), (1, []))
+
+    def test_invalid_numbers_are_reported(self):
+        gift = self.run_import('gift', 'Pick one {=A ~%1.2.3%B}\n')
+        self.assertIn("Invalid answer weight '%1.2.3%'", gift['errors'][0]['errors'])
+
+        for score in ('abc', 'nan'):
+            qti = self.run_import('qti', QTI_ITEM.format(score=score))
+            self.assertIn('Invalid score value in response condition', qti['errors'][0]['errors'])
+        self.assertFalse(Question.objects.filter(quiz=self.quiz).exists())
+
+    def test_malformed_file_is_a_bad_request(self):
+        client = api_client(self.teacher)
+        upload = BytesIO(QTI_ITEM.format(score='x').encode())
+        upload.name = 'items.xml'
+        response = client.post(f'/api/quizzes/{self.quiz.uuid}/import-questions/', {'file': upload})
+        self.assertEqual(response.status_code, 400)
+
+        upload = BytesIO(b'<questestinterop><item>')
+        upload.name = 'broken.xml'
+        response = client.post(f'/api/quizzes/{self.quiz.uuid}/import-questions/', {'file': upload})
+        self.assertEqual(response.status_code, 400)
+
+
+# Deadline reminders
+class DeadlineReminderTests(CoursesTestCase):
+    def setUp(self):
+        super().setUp()
+        module = Module.objects.create(course=self.course, title='Module')
+        lesson = Lesson.objects.create(module=module, title='Lesson', slug='lesson')
+        self.assignment = Assignment.objects.create(
+            lesson=lesson, title='Essay', description='d', due_date=timezone.now() + timedelta(minutes=30)
+        )
+
+    def test_each_reminder_is_sent_once(self):
+        self.assertEqual(reminders.send_due_reminders(), 1)
+        self.assertEqual(reminders.send_due_reminders(), 0)
+        self.assertEqual(DeadlineReminder.objects.get().hours_before, 1)
+        self.assertEqual(Notification.objects.filter(recipient=self.student).count(), 1)
+
+    def test_failed_send_records_nothing(self):
+        with mock.patch('core.notifications.send_bulk_notifications', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                reminders.send_due_reminders()
+        self.assertFalse(DeadlineReminder.objects.exists())
+        self.assertEqual(reminders.send_due_reminders(), 1)
+
+    def test_tick_lock(self):
+        token = acquire_lock(reminders.TICK_LOCK_KEY, 60)
+        self.assertEqual(reminders.send_due_reminders(), 0)
+        self.assertIsNone(acquire_lock(reminders.TICK_LOCK_KEY, 60))
+
+        release_lock(reminders.TICK_LOCK_KEY, token + 1)
+        self.assertIsNone(acquire_lock(reminders.TICK_LOCK_KEY, 60))
+        release_lock(reminders.TICK_LOCK_KEY, token)
+        self.assertEqual(reminders.send_due_reminders(), 1)
+
+
+# Certificate PDFs
+def pdf_text_ops(document):
+    """Decompressed content streams of a generated PDF"""
+    streams = re.findall(rb'/Filter /FlateDecode >>\nstream\n(.*?)\nendstream', document, re.S)
+    return b'\n'.join(zlib.decompress(stream) for stream in streams)
+
+
+def certificate_job(student_name, course_title='Python Basics'):
+    context = {
+        'student_name': student_name, 'course_title': course_title, 'completion_date': 'May 01, 2026',
+        'issue_date': 'May 02, 2026', 'final_score': '95', 'certificate_number': 'CERT-20260501-ABCDEFGH',
+        'instructor_name': 'Dana Lee', 'verification_url': 'https://example.com/verify/x',
+    }
+    return None, context, context['verification_url']
+
+
+class CertificatePdfTests(SimpleTestCase):
+    def test_latin_certificate_uses_standard_fonts(self):
+        document, png = certificates.render_job(certificate_job('José Müller'))
+        self.assertTrue(document.startswith(b'%PDF-1.4'))
+        self.assertTrue(png.startswith(b'\x89PNG'))
+        self.assertNotIn(b'/FontFile2', document)
+        self.assertIn(b'(Jos\xe9 M\xfcller) Tj', pdf_text_ops(document))
+
+    @unittest.skipUnless(
+        os.path.exists(settings.CERTIFICATE_UNICODE_FONTS['regular']), 'Unicode certificate font not installed'
+    )
+    def test_non_latin_text_embeds_unicode_font(self):
+        document, _ = certificates.render_job(certificate_job('محمد علي', course_title='Основы Python'))
+        self.assertIn(b'/Encoding /Identity-H', document)
+        self.assertIn(b'/FontFile2', document)
+        self.assertIn(b'/Title <feff', document)
+
+        font = pdf.load_font(settings.CERTIFICATE_UNICODE_FONTS['bold'])
+        shaped = pdf.visual_word('علي')
+        glyphs = b''.join(b'%04x' % font.glyph(char) for char in shaped)
+        ops = pdf_text_ops(document)
+        self.assertIn(b'<%s> Tj' % glyphs, ops)
+        self.assertNotIn(b'?', b''.join(re.findall(rb'\((.*?)\) Tj', ops)))
+
+    def test_arabic_shaping(self):
+        self.assertEqual(pdf.shape_arabic('سلام'), '\ufeb3\ufefc\ufee1')
+        self.assertEqual(pdf.visual_word('بب'), '\ufe90\ufe91')
+        self.assertEqual(pdf.visual_word('Python'), 'Python')
+
+
+class CertificateIssueTests(CoursesTestCase):
+    def test_token_with_maximum_length_fields(self):
+        # Varied characters, so the compressed token stays long
+        text = ''.join(chr(0x4E00 + i * 7919 % 20000) for i in range(500))
+        self.student.first_name, self.student.last_name = text[:150], text[150:300]
+        self.student.save()
+        self.course.title = text[300:]
+        self.course.save()
+
+        certificate, created = certificates.issue_certificate(self.enrollment)
+        self.assertTrue(created)
+        certificate = Certificate.objects.get(pk=certificate.pk)
+        self.assertGreater(len(certificate.verification_url), 500)
+
+        result = certificates.verify_token(certificate.verification_url.rsplit('/', 1)[-1])
+        self.assertTrue(result['valid'])
+        self.assertEqual(result['student_name'], self.student.get_full_name())
+        self.assertEqual(result['course_title'], self.course.title)
+        self.assertTrue(certificates.qr_matrix(certificate.verification_url))
+
+
+class CertificatePipelineTests(CoursesTestCase):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=tmp)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def test_issue_queues_one_render_after_commit(self):
+        with mock.patch.object(certificates, 'enqueue_render') as enqueue, \
+                self.captureOnCommitCallbacks(execute=True):
+            certificate, created = certificates.issue_certificate(self.enrollment)
+            self.assertEqual(certificates.issue_certificate(self.enrollment), (certificate, False))
+        self.assertTrue(created)
+        enqueue.assert_called_once_with([certificate.id])
+        self.assertEqual(certificate.render_status, 'pending')
+
+    def test_render_batch_attaches_artifacts_once(self):
+        certificate, _ = certificates.issue_certificate(self.enrollment)
+        self.assertEqual(certificates.render_batch([certificate.id]), [])
+        certificate.refresh_from_db()
+        self.assertEqual(certificate.render_status, 'ready')
+        with certificate.pdf_file.open('rb') as rendered:
+            self.assertTrue(rendered.read().startswith(b'%PDF'))
+        self.assertTrue(certificate.qr_code)
+
+        with mock.patch.object(certificates, 'render_jobs') as render:
+            certificates.render_batch([certificate.id])
+        self.assertEqual(render.call_args.args[0], [])
+
+    def test_only_stale_renders_are_reclaimed(self):
+        certificate, _ = certificates.issue_certificate(self.enrollment)
+        self.assertTrue(certificates.claim(certificate.id))
+        self.assertFalse(certificates.claim(certificate.id))
+
+        stale = timezone.now() - timedelta(minutes=certificates.STALE_RENDER_MINUTES + 1)
+        Certificate.objects.filter(pk=certificate.pk).update(updated_at=stale)
+        self.assertTrue(certificates.claim(certificate.id))
+
+    def test_failed_render_is_marked_and_returned(self):
+        certificate, _ = certificates.issue_certificate(self.enrollment)
+        with mock.patch.object(certificates, 'render_job', side_effect=RuntimeError('bad template')):
+            self.assertEqual(certificates.render_batch([certificate.id]), [certificate.id])
+        certificate.refresh_from_db()
+        self.assertEqual(certificate.render_status, 'failed')
+
+    def test_revoked_token_is_invalid(self):
+        certificate, _ = certificates.issue_certificate(self.enrollment)
+        token = certificate.verification_url.rsplit('/', 1)[-1]
+        self.assertTrue(certificates.verify_token(token)['valid'])
+
+        Certificate.objects.filter(pk=certificate.pk).update(is_valid=False)
+        certificates.invalidate_revocations()
+        result = certificates.verify_token(token)
+        self.assertEqual((result['valid'], result['revoked']), (False, True))
+
+
+# Bulk certificate jobs
+class CertificateJobTests(CoursesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.certificate, _ = certificates.issue_certificate(self.enrollment)
+
+    def revoke(self, restore):
+        return api_client(self.teacher).post(
+            f'/api/courses/{self.course.uuid}/certificates/revoke/',
+            {'certificate_uuids': [str(self.certificate.uuid)], 'restore': restore}, format='json'
+        )
+
+    def test_restore_flag_parsing(self):
+        self.assertEqual(self.revoke('false').json()['data']['job']['kind'], 'revoke')
+        self.assertEqual(self.revoke(False).json()['data']['job']['kind'], 'revoke')
+        self.assertEqual(self.revoke('true').json()['data']['job']['kind'], 'restore')
+        self.assertEqual(self.revoke('maybe').status_code, 400)
+
+    def test_job_fails_once_retries_are_exhausted(self):
+        job_id = certificates.start_job('reissue', self.teacher, 1)
+        certificates.update_job(job_id, status='running')
+        with mock.patch('courses.certificates.render_batch', side_effect=lambda ids: list(ids)) as render:
+            tasks.render_certificates_task.apply(args=[[self.certificate.id]], kwargs={'job_id': job_id})
+        self.assertEqual(render.call_count, tasks.render_certificates_task.max_retries + 1)
+        job = certificates.get_job(job_id)
+        self.assertEqual((job['status'], job['done'], job['failed']), ('failed', 0, 1))
+
+    def test_job_fails_when_rendering_raises(self):
+        job_id = certificates.start_job('reissue', self.teacher, 1)
+        certificates.update_job(job_id, status='running')
+        with mock.patch('courses.certificates.render_batch', side_effect=RuntimeError('disk full')):
+            result = tasks.render_certificates_task.apply(args=[[self.certificate.id]], kwargs={'job_id': job_id})
+        self.assertIsInstance(result.result, RuntimeError)
+        job = certificates.get_job(job_id)
+        self.assertEqual((job['status'], job['error'], job['failed']), ('failed', 'disk full', 1))
+
+
+# Learning analytics
+@override_settings(ACTIVITY_BUFFER='sync')
+class LearningAnalyticsTests(CoursesTestCase):
+    FIELDS = [
+        'total_time_spent_seconds', 'lessons_completed', 'quizzes_attempted', 'quizzes_passed',
+        'average_quiz_score', 'highest_quiz_score',
+    ]
+
+    def setUp(self):
+        super().setUp()
+        activity._buffer = None
+        self.addCleanup(setattr, activity, '_buffer', None)
+
+    def test_incremental_counts_match_reconcile(self):
+        module = Module.objects.create(course=self.course, title='Module')
+        lesson = Lesson.objects.create(module=module, title='Lesson', slug='lesson')
+        LessonProgress.objects.create(enrollment=self.enrollment, lesson=lesson, time_spent_seconds=120)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/courses/{self.course.uuid}/lessons/{lesson.uuid}/complete/')
+
+        # A timed attempt left open is graded by the sweeper
+        quiz = Quiz.objects.create(course=self.course, title='Quiz', is_published=True, time_limit_minutes=10)
+        question = Question.objects.create(quiz=quiz, question_text='2 + 2?', question_type='short_answer')
+        Answer.objects.create(question=question, answer_text='4', is_correct=True)
+        self.client.post(f'/api/quizzes/{quiz.uuid}/start/')
+        attempt = QuizAttempt.objects.get(quiz=quiz)
+        self.client.patch(
+            f'/api/quiz-attempts/{attempt.uuid}/draft/', {'responses': [{'question': str(question.uuid), 'text': '4'}]},
+            format='json'
+        )
+        QuizAttempt.objects.filter(pk=attempt.pk).update(started_at=timezone.now() - timedelta(minutes=15))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(tasks.auto_submit_expired_quiz_attempts(), 1)
+
+        incremental = LearningAnalytics.objects.filter(user=self.student, course=self.course).values(*self.FIELDS).get()
+        self.assertEqual((incremental['lessons_completed'], incremental['quizzes_attempted']), (1, 1))
+        self.assertGreaterEqual(incremental['total_time_spent_seconds'], 120)
+
+        learning_analytics.reconcile()
+        reconciled = LearningAnalytics.objects.filter(user=self.student, course=self.course).values(*self.FIELDS).get()
+        self.assertEqual(incremental, reconciled)
+
+
+# Assignment submissions
+ESSAY = (
+    "The industrial revolution changed how goods were made and moved. Factories replaced workshops, "
+    "railways linked distant markets, and cities grew around mills as workers left farms for wages. "
+    "Historians still argue about whether living standards rose or fell during the first decades."
+)
+
+
+class AssignmentTestCase(CoursesTestCase):
+    def setUp(self):
+        super().setUp()
+        module = Module.objects.create(course=self.course, title='Module')
+        lesson = Lesson.objects.create(module=module, title='Lesson', slug='lesson')
+        self.assignment = Assignment.objects.create(
+            lesson=lesson, title='Essay', description='Write', due_date=timezone.now() + timedelta(days=7), max_points=20
+        )
+
+    def submit(self, text, student=None):
+        student = student or make_user()
+        enrollment = Enrollment.objects.get_or_create(student=student, course=self.course)[0]
+        return AssignmentSubmission.objects.create(
+            assignment=self.assignment, student=student, enrollment=enrollment, text_submission=text
+        )
+
+
+class SimilarityTests(AssignmentTestCase):
+    def test_near_duplicates_are_matched(self):
+        original = self.submit(ESSAY)
+        copied = self.submit(ESSAY.replace('Historians still argue', 'Scholars continue to debate'))
+        unrelated = self.submit("Photosynthesis turns light, water and carbon dioxide into sugar and oxygen inside leaves.")
+        for submission in (original, copied, unrelated):
+            similarity.index_submission(submission)
+
+        match = SimilarityMatch.objects.get()
+        self.assertEqual((match.submission, match.matched_submission), (copied, original))
+        self.assertFalse(match.is_exact)
+        self.assertGreaterEqual(match.similarity, similarity.similarity_threshold())
+
+    def test_exact_copies_ignore_case_and_punctuation(self):
+        original = self.submit(ESSAY)
+        copied = self.submit(ESSAY.upper().replace(',', ''))
+        similarity.index_submission(original)
+        matches = similarity.index_submission(copied)
+        self.assertEqual([(m.similarity, m.is_exact) for m in matches], [(1.0, True)])
+
+    def test_reindexing_an_edited_submission_drops_its_matches(self):
+        original = self.submit(ESSAY)
+        copied = self.submit(ESSAY)
+        similarity.index_submission(original)
+        similarity.index_submission(copied)
+
+        copied.text_submission = "A different essay about the history of printing presses and the spread of books."
+        copied.save()
+        similarity.index_submission(copied)
+        self.assertFalse(SimilarityMatch.objects.exists())
+
+    def test_report_is_for_the_instructor_only(self):
+        url = f'/api/assignments/{self.assignment.uuid}/similarity-report/'
+        similarity.index_submission(self.submit(ESSAY))
+        similarity.index_submission(self.submit(ESSAY))
+
+        self.assertEqual(api_client(make_user('teacher')).get(url).status_code, 403)
+        response = api_client(self.teacher).get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['data']['pairs']), 1)
+
+
+class GradebookTests(AssignmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher_client = api_client(self.teacher)
+        self.first = self.submit('one', self.student)
+        self.second = self.submit('two')
+
+    def export(self):
+        response = self.teacher_client.get(f'/api/assignments/{self.assignment.uuid}/gradebook/')
+        self.assertEqual(response.status_code, 200)
+        return list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def import_rows(self, rows, **data):
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+        upload = io.BytesIO(out.getvalue().encode())
+        upload.name = 'grades.csv'
+        return self.teacher_client.post(
+            f'/api/assignments/{self.assignment.uuid}/gradebook/import/', {'file': upload, **data}, format='multipart'
+        )
+
+    def test_round_trip_grades_and_notifies_once(self):
+        self.first.feedback = '=HYPERLINK("x")'
+        self.first.save()
+        rows = self.export()
+        self.assertEqual({row['feedback'] for row in rows}, {'', '\'=HYPERLINK("x")'})
+        for row in rows:
+            row['grade'] = '17,5' if row['submission_uuid'] == str(self.first.uuid) else '12'
+
+        self.assertEqual(self.import_rows(rows, dry_run='true').status_code, 200)
+        self.assertFalse(AssignmentSubmission.objects.filter(status='graded').exists())
+
+        with mock.patch('core.tasks.send_bulk_notifications_task.delay') as notify, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.import_rows(rows)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['graded'], 2)
+        self.first.refresh_from_db()
+        self.assertEqual((str(self.first.grade), self.first.status, self.first.feedback), ('17.50', 'graded', '=HYPERLINK("x")'))
+        self.assertEqual(self.first.graded_by, self.teacher)
+        self.assertEqual(notify.call_count, 1)
+        self.assertEqual(len(notify.call_args.args[0]), 2)
+
+    def test_any_invalid_row_saves_nothing(self):
+        rows = self.export()
+        rows[0]['grade'] = '10'
+        rows[1]['grade'] = '25'
+        rows.append({**rows[0], 'submission_uuid': str(uuid.uuid4()), 'student_email': 'nobody@example.com'})
+
+        response = self.import_rows(rows)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [row['errors'] for row in response.json()['errors']['rows']],
+            [['Grade must be between 0 and 20'], ['No submission matches this row']]
+        )
+        self.assertFalse(AssignmentSubmission.objects.filter(grade__isnull=False).exists())
+
+    def test_rows_fall_back_to_email_and_reject_duplicates(self):
+        rows = [
+            {'submission_uuid': '', 'student_email': self.student.email.upper(), 'grade': '5'},
+            {'submission_uuid': str(self.first.uuid), 'student_email': '', 'grade': '6'},
+        ]
+        response = self.import_rows(rows)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors']['rows'], [{'line': 3, 'errors': ['Submission appears more than once']}])
+
+    def test_requires_the_course_instructor(self):
+        response = api_client(make_user('teacher')).get(f'/api/assignments/{self.assignment.uuid}/gradebook/')
+        self.assertEqual(response.status_code, 403)
@@ -12,7 +12,19 @@ from .views import (
     
     # Lessons under Course
     CourseLessonListCreateView, CourseLessonDetailView, LessonFileUploadView,
-    LessonCompleteView, LessonNotesView,
+    LessonCompleteView, LessonNotesView, ResourceAccessView,
+    
+    # Quiz Questions
+    QuizQuestionImportView,
+    
+    # Quiz Sessions
+    QuizStartView, QuizAttemptDraftView, QuizAttemptNextQuestionView, QuizAttemptSubmitView,
+    
+    # Leaderboards
+    QuizLeaderboardView, CourseLeaderboardView,
+    
+    # Assignments
+    AssignmentGradebookExportView, AssignmentGradebookImportView, AssignmentSimilarityReportView,
     
     # Enrollments
     EnrollmentListView, MyEnrollmentsView,
@@ -25,7 +37,8 @@ from .views import (
     
     TeacherCoursesView, TeacherStudentsView,
     # Certificates
-    CertificateListView, CertificateDetailView, CertificateVerifyView,
+    CertificateListView, CertificateDetailView, CertificateVerifyView, CertificateTokenVerifyView,
+    CourseCertificatesReissueView, CourseCertificatesRevokeView, CertificateJobView,
 )
 
 app_name = 'courses'
@@ -63,11 +76,30 @@ urlpatterns = [
     path('courses/<uuid:course_uuid>/lessons/<uuid:uuid>/upload/', LessonFileUploadView.as_view(), name='lesson-file-upload'),
     path('courses/<uuid:course_uuid>/lessons/<uuid:uuid>/complete/', LessonCompleteView.as_view(), name='lesson-complete'),
     path('courses/<uuid:course_uuid>/lessons/<uuid:uuid>/notes/', LessonNotesView.as_view(), name='lesson-notes'),
+    path('courses/<uuid:course_uuid>/resources/<uuid:uuid>/access/', ResourceAccessView.as_view(), name='resource-access'),
     
 
+    # ===== QUIZ QUESTIONS =====
+    path('quizzes/<uuid:uuid>/import-questions/', QuizQuestionImportView.as_view(), name='quiz-question-import'),
+
+    # ===== QUIZ SESSIONS =====
+    path('quizzes/<uuid:uuid>/start/', QuizStartView.as_view(), name='quiz-start'),
+    path('quiz-attempts/<uuid:uuid>/draft/', QuizAttemptDraftView.as_view(), name='quiz-attempt-draft'),
+    path('quiz-attempts/<uuid:uuid>/next-question/', QuizAttemptNextQuestionView.as_view(), name='quiz-attempt-next-question'),
+    path('quiz-attempts/<uuid:uuid>/submit/', QuizAttemptSubmitView.as_view(), name='quiz-attempt-submit'),
+
+    # ===== LEADERBOARDS =====
+    path('quizzes/<uuid:uuid>/leaderboard/', QuizLeaderboardView.as_view(), name='quiz-leaderboard'),
+    path('courses/<uuid:uuid>/leaderboard/', CourseLeaderboardView.as_view(), name='course-leaderboard'),
+
     path('courses/teacher/', TeacherCoursesView.as_view(), name='teacher-courses'),
     path('courses/teacher/students/', TeacherStudentsView.as_view(), name='teacher-students'),
     
+    # ===== ASSIGNMENTS =====
+    path('assignments/<uuid:uuid>/gradebook/', AssignmentGradebookExportView.as_view(), name='assignment-gradebook'),
+    path('assignments/<uuid:uuid>/gradebook/import/', AssignmentGradebookImportView.as_view(), name='assignment-gradebook-import'),
+    path('assignments/<uuid:uuid>/similarity-report/', AssignmentSimilarityReportView.as_view(), name='assignment-similarity-report'),
+    
     # ===== ENROLLMENTS =====
     path('enrollments/', EnrollmentListView.as_view(), name='enrollment-list'),
     path('enrollments/my-courses/', MyEnrollmentsView.as_view(), name='my-courses'),
@@ -84,6 +116,10 @@ urlpatterns = [
     path('certificates/', CertificateListView.as_view(), name='certificate-list'),
     path('certificates/<uuid:uuid>/', CertificateDetailView.as_view(), name='certificate-detail'),
     path('certificates/<uuid:uuid>/verify/', CertificateVerifyView.as_view(), name='certificate-verify'),
+    path('certificates/verify/<str:token>/', CertificateTokenVerifyView.as_view(), name='certificate-token-verify'),
+    path('certificates/jobs/<str:job_id>/', CertificateJobView.as_view(), name='certificate-job'),
+    path('courses/<uuid:uuid>/certificates/reissue/', CourseCertificatesReissueView.as_view(), name='course-certificates-reissue'),
+    path('courses/<uuid:uuid>/certificates/revoke/', CourseCertificatesRevokeView.as_view(), name='course-certificates-revoke'),
 ]
 
 # Alternative URL patterns for different API versions or organization
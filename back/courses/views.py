@@ -1,4 +1,4 @@
-from rest_framework import generics, status
+from rest_framework import generics, serializers, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -8,8 +8,10 @@ from django.shortcuts import get_object_or_404
 from django.db.models import Avg, Count, Q, Prefetch
 from django.utils import timezone
 from django.core.exceptions import ValidationError, PermissionDenied
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.core import signing
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,14 +20,21 @@ User = get_user_model()
 from .models import (
     Category, Course, Enrollment, Module, Lesson, LessonProgress,
     Resource, Quiz, Question, Answer, QuizAttempt, QuestionResponse,
-    Certificate, CourseReview, CourseFavorite
+    Certificate, CourseReview, CourseFavorite, Assignment
 )
 from .serializers import (
     CategorySerializer, CourseSerializer, EnrollmentSerializer,
     ModuleSerializer, LessonSerializer, LessonProgressSerializer,
     ResourceSerializer, QuizSerializer, QuizAttemptSerializer,
-    QuizSubmissionSerializer, CertificateSerializer, CourseReviewSerializer
+    QuizSubmissionSerializer, QuizDraftSerializer, AdaptiveQuestionSerializer, CertificateSerializer, CourseReviewSerializer
 )
+from . import quiz_sessions, leaderboards
+from .grading import grade_attempts, response_outcomes
+from .irt import get_item_bank
+from .importers import detect_format, import_questions
+from . import similarity
+from .gradebook import export_rows, import_grades
+from . import certificates
 from .filters import CourseFilter, LessonFilter, QuizFilter
 from accounts.permissions import (
     IsTeacherOrAdmin, IsCourseInstructor, IsEnrolledStudent,
@@ -34,7 +43,7 @@ from accounts.permissions import (
 from core.utils import (
     send_notification, bulk_notify_enrolled_students,
     track_activity, increment_view_count, update_enrollment_progress,
-    validate_and_get_object, format_api_response
+    validate_and_get_object, format_api_response, is_course_instructor
 )
 
 # Categories
@@ -262,31 +271,32 @@ class CourseEnrollView(APIView):
                         status_code=status.HTTP_400_BAD_REQUEST
                     )
             
-            enrollment, created = Enrollment.objects.get_or_create(
-                student=request.user, course=course,
-                defaults={'status': 'enrolled'}
-            )
-            
-            if not created and enrollment.is_active:
-                return format_api_response(
-                    data=EnrollmentSerializer(enrollment, context={'request': request}).data,
-                    message='You are already enrolled in this course',
-                    status_code=status.HTTP_200_OK
+            with transaction.atomic():
+                enrollment, created = Enrollment.objects.get_or_create(
+                    student=request.user, course=course,
+                    defaults={'status': 'enrolled'}
                 )
-            
-            if not created:
-                enrollment.is_active = True
-                enrollment.status = 'enrolled'
-                enrollment.save()
-            
-            send_notification(
-                request.user, 'enrollment',
-                f'Enrolled in {course.title}',
-                f'You have successfully enrolled in {course.title}',
-                course=course
-            )
-            
-            track_activity(request.user, 'course_enrollment', course=course)
+                
+                if not created and enrollment.is_active:
+                    return format_api_response(
+                        data=EnrollmentSerializer(enrollment, context={'request': request}).data,
+                        message='You are already enrolled in this course',
+                        status_code=status.HTTP_200_OK
+                    )
+                
+                if not created:
+                    enrollment.is_active = True
+                    enrollment.status = 'enrolled'
+                    enrollment.save()
+                
+                send_notification(
+                    request.user, 'enrollment',
+                    f'Enrolled in {course.title}',
+                    f'You have successfully enrolled in {course.title}',
+                    course=course
+                )
+                
+                track_activity(request.user, 'course_enrollment', course=course)
             
             return format_api_response(
                 data=EnrollmentSerializer(enrollment, context={'request': request}).data,
@@ -311,13 +321,14 @@ class CoursePublishView(APIView):
         
         course.publish()
         
-        bulk_notify_enrolled_students(
+        job_id = bulk_notify_enrolled_students(
             course, 'course_update',
             f'{course.title} is now published',
             'The course you enrolled in is now available'
         )
         
         return format_api_response(
+            data={'notification_job': job_id},
             message='Course published successfully',
             status_code=status.HTTP_200_OK
         )
@@ -564,12 +575,20 @@ class LessonCompleteView(APIView):
         )
         
         if not progress.is_completed:
-            progress.is_completed = True
-            progress.completed_at = timezone.now()
-            progress.save()
-            
-            update_enrollment_progress(enrollment)
-            track_activity(request.user, 'lesson_complete', lesson=lesson, course=course)
+            with transaction.atomic():
+                # Re-read under lock so concurrent completions award the lesson's points once
+                progress = LessonProgress.objects.select_for_update().get(pk=progress.pk)
+                if not progress.is_completed:
+                    progress.is_completed = True
+                    progress.completed_at = timezone.now()
+                    progress.save()
+
+                    update_enrollment_progress(enrollment)
+                    track_activity(
+                        request.user, 'lesson_complete', lesson=lesson, course=course,
+                        metadata={'seconds': progress.time_spent_seconds}
+                    )
+                    transaction.on_commit(lambda: leaderboards.record_lesson_completion(enrollment, lesson))
         
         return format_api_response(
             data={
@@ -579,6 +598,29 @@ class LessonCompleteView(APIView):
             message='Lesson completed successfully'
         )
 
+class ResourceAccessView(APIView):
+    """POST /api/courses/{course_uuid}/resources/{uuid}/access/ - Record resource access and return its link"""
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, course_uuid, uuid):
+        course = validate_and_get_object(Course, course_uuid)
+        resource = validate_and_get_object(
+            Resource, uuid, queryset=Resource.objects.filter(lesson__module__course=course).select_related('lesson')
+        )
+        
+        if not request.user.is_staff and request.user != course.instructor:
+            get_object_or_404(Enrollment, student=request.user, course=course, is_active=True)
+            track_activity(
+                request.user, 'resource_download',
+                lesson=resource.lesson, course=course,
+                metadata={'resource': str(resource.uuid)}
+            )
+        
+        return format_api_response(
+            data={'url': resource.file.url if resource.file else resource.url},
+            message='Resource access recorded'
+        )
+
 class LessonNotesView(APIView):
     """
     GET /api/courses/{course_uuid}/lessons/{uuid}/notes/ - Get notes
@@ -622,6 +664,364 @@ class LessonNotesView(APIView):
             message='Notes saved successfully'
         )
 
+# Quiz Question Import
+class QuizQuestionImportView(APIView):
+    """POST /api/quizzes/{uuid}/import-questions/ - Import questions from CSV, GIFT or QTI XML"""
+    permission_classes = [IsAuthenticated, IsCourseInstructor]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request, uuid):
+        quiz = validate_and_get_object(Quiz, uuid)
+        self.check_object_permissions(request, quiz)
+
+        file = request.FILES.get('file')
+        if not file:
+            return format_api_response(
+                errors={'file': ['No file provided']},
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        if file.size > 20 * 1024 * 1024:  # 20MB limit
+            return format_api_response(
+                errors={'file': ['File too large. Maximum size is 20MB']},
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            file_format = detect_format(file.name, request.data.get('format'))
+        except ValidationError as e:
+            return format_api_response(
+                errors={'format': e.messages},
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        report = import_questions(quiz, file, file_format, dry_run=dry_run)
+
+        if report['errors']:
+            return format_api_response(
+                errors={'questions': report['errors']},
+                message='Import failed validation; nothing was saved',
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        if dry_run:
+            return format_api_response(data=report, message='Dry run passed validation')
+
+        return format_api_response(
+            data=report,
+            message=f"Imported {report['questions']} questions",
+            status_code=status.HTTP_201_CREATED
+        )
+
+# Quiz Sessions
+def _attempt_session_data(attempt, request):
+    return {
+        'attempt': QuizAttemptSerializer(attempt, context={'request': request}).data,
+        'time_limit_minutes': attempt.quiz.time_limit_minutes,
+        'remaining_seconds': quiz_sessions.remaining_seconds(attempt),
+        'draft': quiz_sessions.load_draft(attempt),
+    }
+
+class QuizStartView(APIView):
+    """POST /api/quizzes/{uuid}/start/ - Start or resume a quiz attempt"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, uuid):
+        quiz = validate_and_get_object(Quiz, uuid)
+
+        enrollment = get_object_or_404(
+            Enrollment, student=request.user, course=quiz.course, is_active=True
+        )
+
+        now = timezone.now()
+        if not quiz.is_published or (quiz.available_from and now < quiz.available_from) or \
+                (quiz.available_until and now > quiz.available_until):
+            return format_api_response(
+                errors={'quiz': ['Quiz is not available']},
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        # The enrollment row lock serialises concurrent starts, so the attempt count and number hold
+        with transaction.atomic():
+            Enrollment.objects.select_for_update().get(pk=enrollment.pk)
+            attempts = QuizAttempt.objects.filter(quiz=quiz, student=request.user).select_related('quiz')
+
+            open_attempt = attempts.filter(completed_at__isnull=True).first()
+            if open_attempt and not quiz_sessions.is_expired(open_attempt):
+                return format_api_response(
+                    data=_attempt_session_data(open_attempt, request),
+                    message='Resumed quiz attempt'
+                )
+
+            attempt_count = attempts.count()
+            if attempt_count >= quiz.max_attempts:
+                return format_api_response(
+                    errors={'quiz': ['Maximum number of attempts reached']},
+                    status_code=status.HTTP_400_BAD_REQUEST
+                )
+
+            attempt = QuizAttempt.objects.create(
+                quiz=quiz, student=request.user, enrollment=enrollment,
+                attempt_number=attempt_count + 1
+            )
+            quiz_sessions.start_session(attempt)
+        track_activity(request.user, 'quiz_start', quiz=quiz, course=quiz.course)
+
+        return format_api_response(
+            data=_attempt_session_data(attempt, request),
+            message='Quiz attempt started',
+            status_code=status.HTTP_201_CREATED
+        )
+
+class QuizAttemptDraftView(APIView):
+    """
+    GET /api/quiz-attempts/{uuid}/draft/ - Get autosaved responses and remaining time
+    PATCH /api/quiz-attempts/{uuid}/draft/ - Autosave responses
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_attempt(self, request, uuid):
+        return get_object_or_404(
+            QuizAttempt.objects.select_related('quiz'), uuid=uuid, student=request.user
+        )
+
+    def get(self, request, uuid):
+        attempt = self.get_attempt(request, uuid)
+        return format_api_response(data=_attempt_session_data(attempt, request))
+
+    def patch(self, request, uuid):
+        attempt = self.get_attempt(request, uuid)
+
+        if attempt.completed_at or quiz_sessions.is_expired(attempt):
+            return format_api_response(
+                errors={'attempt': ['This attempt is closed']},
+                status_code=status.HTTP_409_CONFLICT
+            )
+
+        serializer = QuizDraftSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        quiz_sessions.save_draft(attempt, quiz_sessions.parse_responses(serializer.validated_data['responses']))
+
+        return format_api_response(data={
+            'remaining_seconds': quiz_sessions.remaining_seconds(attempt)
+        })
+
+class QuizAttemptNextQuestionView(APIView):
+    """GET /api/quiz-attempts/{uuid}/next-question/ - Next adaptive question for the current ability estimate"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, uuid):
+        attempt = get_object_or_404(
+            QuizAttempt.objects.select_related('quiz'), uuid=uuid, student=request.user
+        )
+        quiz = attempt.quiz
+
+        if not quiz.is_adaptive:
+            return format_api_response(
+                errors={'quiz': ['Quiz is not adaptive']},
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        if attempt.completed_at or quiz_sessions.is_expired(attempt):
+            return format_api_response(
+                errors={'attempt': ['This attempt is closed']},
+                status_code=status.HTTP_409_CONFLICT
+            )
+
+        draft = quiz_sessions.load_draft(attempt)
+        served = quiz_sessions.load_served([attempt]).get(attempt.id, set())
+        answered = list(
+            Question.objects.filter(quiz=quiz, uuid__in=[q for q in draft if q in served]).prefetch_related('answers')
+        )
+        outcomes = response_outcomes(answered, draft)
+
+        bank = get_item_bank(quiz.id)
+        theta, standard_error = bank.estimate_ability(
+            [qid for qid, _ in outcomes], [correct for _, correct in outcomes]
+        )
+
+        question = None
+        if len(answered) < (quiz.adaptive_question_count or len(bank)):
+            next_id = bank.next_question_id(theta, exclude=[q.id for q in answered])
+            if next_id is not None:
+                question = Question.objects.prefetch_related('answers').get(id=next_id)
+                quiz_sessions.mark_served(attempt, question.uuid)
+
+        return format_api_response(data={
+            'question': AdaptiveQuestionSerializer(question).data if question else None,
+            'answered_count': len(answered),
+            'ability_estimate': round(theta, 3),
+            'standard_error': round(standard_error, 3),
+            'remaining_seconds': quiz_sessions.remaining_seconds(attempt),
+        })
+
+class QuizAttemptSubmitView(APIView):
+    """POST /api/quiz-attempts/{uuid}/submit/ - Submit and grade a quiz attempt"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, uuid):
+        serializer = QuizDraftSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            attempt = get_object_or_404(
+                QuizAttempt.objects.select_for_update(of=('self',)).select_related('quiz'),
+                uuid=uuid, student=request.user
+            )
+
+            if attempt.completed_at:
+                return format_api_response(
+                    data=QuizAttemptSerializer(attempt, context={'request': request}).data,
+                    message='Attempt already submitted'
+                )
+
+            responses = quiz_sessions.load_draft(attempt)
+            # Answers sent after the clock ran out are ignored; the last draft counts
+            if not quiz_sessions.is_expired(attempt):
+                responses.update(quiz_sessions.parse_responses(serializer.validated_data['responses']))
+
+            grade_attempts([attempt], {attempt.id: responses})
+
+        quiz_sessions.clear_sessions([attempt])
+        track_activity(
+            request.user, 'quiz_submit', quiz=attempt.quiz, course=attempt.quiz.course,
+            metadata={
+                'seconds': attempt.time_taken_seconds or 0,
+                'score': float(attempt.score) if attempt.score is not None else None,
+                'passed': attempt.passed,
+            }
+        )
+
+        return format_api_response(
+            data=QuizAttemptSerializer(attempt, context={'request': request}).data,
+            message='Quiz submitted successfully'
+        )
+
+# Leaderboards
+def _leaderboard_limit(request):
+    try:
+        return max(1, min(int(request.query_params.get('limit', 10)), 100))
+    except ValueError:
+        return 10
+
+def _check_leaderboard_access(user, course):
+    """Leaderboards list names and scores, so only the course's students and staff may read them"""
+    if not (is_course_instructor(user, course) or
+            Enrollment.objects.filter(student=user, course=course, is_active=True).exists()):
+        raise PermissionDenied('Only students enrolled in this course can view its leaderboard')
+
+class QuizLeaderboardView(APIView):
+    """GET /api/quizzes/{uuid}/leaderboard/ - Top scores and the user's rank for a quiz"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, uuid):
+        quiz = validate_and_get_object(Quiz, uuid)
+        _check_leaderboard_access(request.user, quiz.course)
+        entries, me = leaderboards.leaderboard_entries(
+            leaderboards.quiz_board(quiz.id), request.user, _leaderboard_limit(request)
+        )
+
+        for row in entries + [me]:
+            if row['score'] is not None:
+                row['score'], row['time_taken_seconds'] = leaderboards.decode_quiz_score(row['score'])
+
+        return format_api_response(data={'leaderboard': entries, 'me': me})
+
+class CourseLeaderboardView(APIView):
+    """GET /api/courses/{uuid}/leaderboard/ - Top points and the user's rank for a course"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, uuid):
+        course = validate_and_get_object(Course, uuid)
+        _check_leaderboard_access(request.user, course)
+        entries, me = leaderboards.leaderboard_entries(
+            leaderboards.course_board(course.id), request.user, _leaderboard_limit(request)
+        )
+
+        for row in entries + [me]:
+            if row['score'] is not None:
+                row['score'] = int(row['score'])
+
+        return format_api_response(data={'leaderboard': entries, 'me': me})
+
+# Assignments
+def _get_instructed_assignment(request, uuid):
+    assignment = get_object_or_404(
+        Assignment.objects.select_related('lesson__module__course'), uuid=uuid
+    )
+    if not is_course_instructor(request.user, assignment.lesson.module.course):
+        raise PermissionDenied('Only course instructors can manage this assignment')
+    return assignment
+
+class AssignmentGradebookExportView(APIView):
+    """GET /api/assignments/{uuid}/gradebook/ - Download submissions and grades as CSV"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, uuid):
+        assignment = _get_instructed_assignment(request, uuid)
+
+        response = StreamingHttpResponse(export_rows(assignment), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="gradebook-{assignment.uuid}.csv"'
+        return response
+
+class AssignmentGradebookImportView(APIView):
+    """POST /api/assignments/{uuid}/gradebook/import/ - Apply grades and feedback from CSV"""
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request, uuid):
+        assignment = _get_instructed_assignment(request, uuid)
+
+        file = request.FILES.get('file')
+        if not file:
+            return format_api_response(
+                errors={'file': ['No file provided']},
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        report = import_grades(assignment, request.user, file, dry_run=dry_run)
+
+        if report['errors']:
+            return format_api_response(
+                errors={'rows': report['errors']},
+                message='Gradebook failed validation; nothing was saved',
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        return format_api_response(
+            data=report,
+            message='Dry run passed validation' if dry_run else f"Graded {report['graded']} submissions"
+        )
+
+class AssignmentSimilarityReportView(APIView):
+    """
+    GET /api/assignments/{uuid}/similarity-report/ - Flagged near-duplicate submissions
+    POST /api/assignments/{uuid}/similarity-report/ - Rebuild the report in the background
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, uuid):
+        assignment = _get_instructed_assignment(request, uuid)
+        return format_api_response(data={
+            'job': similarity.get_report_status(assignment.id),
+            'threshold': similarity.similarity_threshold(),
+            'pairs': similarity.similarity_report(assignment),
+        })
+
+    def post(self, request, uuid):
+        from .tasks import build_similarity_report_task
+
+        assignment = _get_instructed_assignment(request, uuid)
+        similarity.set_report_status(assignment.id, 'queued')
+        build_similarity_report_task.delay(assignment.id)
+
+        return format_api_response(
+            data={'job': similarity.get_report_status(assignment.id)},
+            message='Similarity report queued',
+            status_code=status.HTTP_202_ACCEPTED
+        )
+
 # Enrollments
 class EnrollmentListView(generics.ListAPIView):
     """GET /api/enrollments/ - List user enrollments"""
@@ -841,4 +1241,94 @@ class CertificateVerifyView(APIView):
             'course_title': certificate.course.title,
             'issue_date': certificate.issue_date,
             'completion_date': certificate.completion_date,
-        })
\ No newline at end of file
+        })
+
+class CertificateTokenVerifyView(APIView):
+    """GET /api/certificates/verify/{token}/ - Verify a signed certificate link without a database lookup"""
+    permission_classes = [AllowAny]
+    
+    def get(self, request, token):
+        try:
+            result = certificates.verify_token(token)
+        except signing.BadSignature:
+            return format_api_response(
+                message='Invalid certificate link',
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return format_api_response(data=result)
+
+class CourseCertificatesReissueView(APIView):
+    """POST /api/courses/{uuid}/certificates/reissue/ - Re-sign and re-render every certificate of a course"""
+    permission_classes = [IsAuthenticated, IsCourseInstructor]
+    
+    def post(self, request, uuid):
+        course = validate_and_get_object(Course, uuid)
+        self.check_object_permissions(request, course)
+        
+        job_id = certificates.queue_reissue(request.user, course_id=course.id)
+        return format_api_response(
+            data={'job': certificates.get_job(job_id)},
+            message='Certificate reissue queued',
+            status_code=status.HTTP_202_ACCEPTED
+        )
+
+class CourseCertificatesRevokeView(APIView):
+    """POST /api/courses/{uuid}/certificates/revoke/ - Revoke (or restore) certificates of a course"""
+    permission_classes = [IsAuthenticated, IsCourseInstructor]
+    
+    def post(self, request, uuid):
+        course = validate_and_get_object(Course, uuid)
+        self.check_object_permissions(request, course)
+        
+        certificate_uuids = request.data.get('certificate_uuids')
+        if not isinstance(certificate_uuids, list) or not certificate_uuids:
+            return format_api_response(
+                message='certificate_uuids must be a non-empty list',
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            certificate_ids = list(Certificate.objects.filter(
+                course=course, uuid__in=certificate_uuids
+            ).values_list('id', flat=True))
+        except ValidationError:
+            return format_api_response(
+                message='certificate_uuids contains an invalid UUID',
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        if len(certificate_ids) != len(set(certificate_uuids)):
+            return format_api_response(
+                message='Some certificates were not found in this course',
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            is_valid = serializers.BooleanField().to_internal_value(request.data.get('restore', False))
+        except serializers.ValidationError:
+            return format_api_response(
+                message='restore must be a boolean',
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        job_id = certificates.queue_validity_change(
+            request.user, is_valid, course_id=course.id, certificate_ids=certificate_ids
+        )
+        return format_api_response(
+            data={'job': certificates.get_job(job_id)},
+            message='Certificate restore queued' if is_valid else 'Certificate revocation queued',
+            status_code=status.HTTP_202_ACCEPTED
+        )
+
+class CertificateJobView(APIView):
+    """GET /api/certificates/jobs/{job_id}/ - Progress of a bulk certificate job"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, job_id):
+        job = certificates.get_job(job_id)
+        if not job or not (request.user.is_staff or job['user_id'] == request.user.id):
+            return format_api_response(
+                message='Job not found',
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+        
+        return format_api_response(data=job)
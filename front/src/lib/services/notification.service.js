@@ -10,13 +10,16 @@ class NotificationService {
 		this.wsConnection = null;
 		this.reconnectAttempts = 0;
 		this.maxReconnectAttempts = 5;
+		this.lastCursor = null;
 	}
 
 	// WebSocket Management
 	async connect(userId) {
 		if (!browser || this.wsConnection) return;
 
-		const wsUrl = `${import.meta.env.VITE_WS_URL || 'ws://localhost:8000'}/ws/notifications/`;
+		// Resume from the last notification seen so the server replays only what was missed
+		const cursor = this.lastCursor ? `?cursor=${encodeURIComponent(this.lastCursor)}` : '';
+		const wsUrl = `${import.meta.env.VITE_WS_URL || 'ws://localhost:8000'}/ws/notifications/${cursor}`;
 
 		try {
 			this.wsConnection = new WebSocket(wsUrl);
@@ -83,19 +86,36 @@ class NotificationService {
 	handleWebSocketMessage(data) {
 		switch (data.type) {
 			case 'notification':
+				this.trackCursor(data.notification.cursor);
 				this.addNotification(data.notification);
 				break;
+			case 'notifications':
+				// Replay frames sent on (re)connect, oldest first
+				data.notifications.forEach((notification) => this.addNotification(notification));
+				this.trackCursor(data.cursor);
+				if (data.has_more) this.fetchNotifications();
+				break;
 			case 'notification_read':
 				this.markAsRead(data.notification_id);
 				break;
 			case 'bulk_read':
 				this.markAllAsRead();
 				break;
+			case 'unread_count':
+				this.unreadCount = data.unread_count;
+				this.notifySubscribers();
+				break;
 			default:
 				console.log('Unknown WebSocket message type:', data.type);
 		}
 	}
 
+	trackCursor(cursor) {
+		if (cursor && (!this.lastCursor || Number(cursor) > Number(this.lastCursor))) {
+			this.lastCursor = cursor;
+		}
+	}
+
 	// Notification Management
 	async fetchNotifications(params = {}) {
 		try {
@@ -126,6 +146,9 @@ class NotificationService {
 	}
 
 	addNotification(notification) {
+		// A notification pushed while the replay was being read can arrive twice
+		if (this.notifications.some((n) => n.id === notification.id)) return;
+
 		// Add to beginning of array
 		this.notifications.unshift(notification);
 